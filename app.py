@@ -1,28 +1,23 @@
 import streamlit as st
-import pickle
-import string
-from nltk.corpus import stopwords
-import nltk
-from nltk.stem.porter import PorterStemmer
 import numpy as np
+import pandas as pd
+import hashlib
+import io
 import os
+import time
 
-# Download required NLTK data if not already present
-try:
-    nltk.data.find('tokenizers/punkt_tab')
-except LookupError:
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        with st.spinner('Downloading required language data...'):
-            nltk.download('punkt_tab', quiet=True)
-            nltk.download('punkt', quiet=True)
+# NLTK and the model are loaded by load_scorer() after the page is drawn;
+# NLTK data is installed ahead of time (`python nltk_setup.py`)
+from preprocessing import TEXT_COLUMNS, load_resources, transform_text
+from caching import LRUCache, message_key
+from artifact import ARTIFACT_DIR, load_artifact, load_models as load_model_files
+from model_registry import RegistryError, current_version, verify, version_dir
+from scoring import make_scorer
 
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    with st.spinner('Downloading stopwords data...'):
-        nltk.download('stopwords', quiet=True)
+# Messages per scoring call (and progress-bar step) in the upload tab
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 2000))
+# Rows shown in the results table; the download always has every row
+UPLOAD_PREVIEW_ROWS = 1000
 
 # Page configuration
 st.set_page_config(
@@ -64,138 +59,244 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-ps = PorterStemmer()
-
-@st.cache_resource
-def load_models():
+# Resources are cached per model registry version (None when there is no
+# registry): activating a new version (python train_model.py) loads it on
+# the next rerun, without restarting Streamlit. The previous version stays
+# cached until then, so sessions mid-rerun are not interrupted.
+@st.cache_resource(max_entries=2)
+def load_models(version):
     """Load and cache the model and vectorizer"""
-    tfidf = pickle.load(open('vectorizer.pkl','rb'))
-    model = pickle.load(open('model.pkl','rb'))
-    return tfidf, model
+    if version is not None:
+        verify(version)
+        return load_artifact(version_dir(version))
+    # The memory-mapped artifact loads without sklearn and works for both
+    # TF-IDF and hashing vectorizers; falls back to the pickles
+    return load_model_files(ARTIFACT_DIR)
 
-def transform_text(text):
-    """Preprocess and transform text"""
-    text = text.lower()
-    text = nltk.word_tokenize(text)
+@st.cache_resource(show_spinner="Loading model...", max_entries=2)
+def load_scorer(version):
+    """Fused NumPy scorer built once per model version, warmed up with one message"""
+    load_resources()
+    scorer = make_scorer(*load_models(version))
+    scorer.score([transform_text("warm up")])
+    return scorer
 
-    y = []
-    for i in text:
-        if i.isalnum():
-            y.append(i)
+@st.cache_resource(max_entries=2)
+def get_result_cache(version):
+    """Cache of normalized message hash -> (prediction, confidence), shared across sessions"""
+    return LRUCache(
+        maxsize=int(os.environ.get('RESULT_CACHE_SIZE', 10000)),
+        ttl=float(os.environ.get('RESULT_CACHE_TTL', 3600))
+    )
 
-    text = y[:]
-    y.clear()
+@st.cache_data(show_spinner="Reading file...", max_entries=16)
+def read_upload(file_hash, _data):
+    """Parse an uploaded CSV, once per file content (_data is not hashed)"""
+    try:
+        return pd.read_csv(io.BytesIO(_data), dtype=str, keep_default_na=False)
+    except UnicodeDecodeError:
+        # Exports such as spam.csv are latin-1
+        return pd.read_csv(io.BytesIO(_data), dtype=str, keep_default_na=False, encoding='latin-1')
 
-    for i in text:
-        if i not in stopwords.words('english') and i not in string.punctuation:
-            y.append(i)
+@st.cache_data(show_spinner=False, max_entries=16)
+def score_upload(file_hash, text_column, model_version, _df):
+    """
+    Score one column of an uploaded file in chunks of UPLOAD_CHUNK_SIZE.
+    Cached per (file hash, column, model version): reruns triggered by other widgets get
+    the stored results back without rescoring. Repeated messages are scored
+    once. Returns the results table and the same table as CSV bytes.
+    """
+    scorer = load_scorer(model_version)
+    texts = [text.strip() for text in _df[text_column].astype(str)]
+    unique = [text for text in dict.fromkeys(texts) if text]
 
-    text = y[:]
-    y.clear()
+    # Created inside the cached function: on a cache hit Streamlit replays
+    # it in its final state
+    progress = st.progress(0.0, text=f"Scoring {len(unique):,} unique messages...")
+    start_time = time.perf_counter()
+    scored = {}
+    for start in range(0, len(unique), UPLOAD_CHUNK_SIZE):
+        chunk = unique[start:start + UPLOAD_CHUNK_SIZE]
+        labels, probabilities = scorer.score([transform_text(text) for text in chunk])
+        confidences = (probabilities * 100).round(2)
+        scored.update(zip(chunk, zip(labels.tolist(), confidences.tolist())))
+        done = start + len(chunk)
+        progress.progress(done / len(unique), text=f"Scoring... {done:,} of {len(unique):,} unique messages")
+    progress.progress(1.0, text=f"✅ Scored {len(unique):,} unique messages in "
+                                f"{time.perf_counter() - start_time:.1f}s")
 
-    for i in text:
-        y.append(ps.stem(i))
+    results = _df.copy()
+    # Blank messages are left unscored
+    results['prediction'] = [
+        ('spam' if scored[text][0] == 1 else 'ham') if text else '' for text in texts
+    ]
+    results['confidence'] = [scored[text][1] if text else None for text in texts]
+    return results, results.to_csv(index=False).encode('utf-8')
 
-    return " ".join(y)
+def use_example(message):
+    """Example button callback: put the message in the text area"""
+    st.session_state.input_sms = message
 
-# Load models
-tfidf, model = load_models()
+model_version = current_version()
+result_cache = get_result_cache(model_version)
 
 # Header
 st.markdown("# 📨 SMS Spam Detector")
 st.markdown("*Powered by Machine Learning | Detect spam messages instantly*")
 st.markdown("---")
 
-# Two column layout
-col1, col2 = st.columns([2, 1], gap="large")
+tab_single, tab_upload = st.tabs(["🔍 Single Message", "📁 Batch Upload"])
 
-with col1:
-    st.subheader("🔍 Check Your Message")
-    input_sms = st.text_area(
-        "Paste or type your SMS message here:",
-        placeholder="Enter the message you want to check...",
-        height=150,
-        label_visibility="collapsed"
-    )
+with tab_single:
+    # Two column layout
+    col1, col2 = st.columns([2, 1], gap="large")
 
-with col2:
-    st.subheader("📚 Quick Tips")
-    st.info("""
-    **Spam Messages Often Contain:**
-    - Urgent requests
-    - Links and URLs
-    - Special offers
-    - Free prizes/money
-    - Requests for personal info
-    """)
+    with col1:
+        st.subheader("🔍 Check Your Message")
+        input_sms = st.text_area(
+            "Paste or type your SMS message here:",
+            placeholder="Enter the message you want to check...",
+            height=150,
+            label_visibility="collapsed",
+            key="input_sms"
+        )
 
-st.markdown("---")
+    with col2:
+        st.subheader("📚 Quick Tips")
+        st.info("""
+        **Spam Messages Often Contain:**
+        - Urgent requests
+        - Links and URLs
+        - Special offers
+        - Free prizes/money
+        - Requests for personal info
+        """)
 
-# Check button
-col1, col2, col3 = st.columns([1, 1, 1])
-with col2:
-    check_button = st.button('🚀 Check Message', use_container_width=True, type="primary")
-
-if check_button:
-    if not input_sms.strip():
-        st.warning("⚠️ Please enter a message to check!")
-    else:
-        with st.spinner('Analyzing message...'):
-            # 1. preprocess
-            transformed_sms = transform_text(input_sms)
-            # 2. vectorize
-            vector_input = tfidf.transform([transformed_sms])
-            # 3. predict
-            result = model.predict(vector_input)[0]
-            
-            # Get confidence score if available
-            try:
-                confidence = model.predict_proba(vector_input)[0]
-                confidence_score = max(confidence) * 100
-            except:
-                confidence_score = None
-        
-        st.markdown("---")
-        st.markdown("### 📊 Result")
-        
-        # 4. Display with enhanced styling
-        if result == 1:
-            st.markdown('<div class="result-spam">🚨 SPAM DETECTED</div>', unsafe_allow_html=True)
-            st.error("⚠️ This message appears to be **SPAM**")
-            if confidence_score:
-                st.metric("Confidence Level", f"{confidence_score:.1f}%", delta="High Risk")
-            st.warning("**Recommendation:** Do not click any links or respond to this message. Consider reporting it to your carrier.")
-        else:
-            st.markdown('<div class="result-ham">✅ LEGITIMATE MESSAGE</div>', unsafe_allow_html=True)
-            st.success("✓ This message appears to be **LEGITIMATE**")
-            if confidence_score:
-                st.metric("Confidence Level", f"{confidence_score:.1f}%", delta="Safe")
-
-# Footer with example messages
-with st.expander("📝 Try Example Messages"):
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.subheader("Example Spam Messages:")
-        spam_examples = [
-            "Congratulations! You won a FREE iPhone. Click here: bit.ly/winner",
-            "URGENT: Your account has been suspended. Verify now: malicious-site.com",
-            "Claim your FREE £50 voucher NOW! Limited offer!"
-        ]
-        for example in spam_examples:
-            if st.button(f"Try: {example[:40]}...", key=f"spam_{example}"):
-                st.session_state.example_input = example
-    
+    st.markdown("---")
+
+    # Check button
+    col1, col2, col3 = st.columns([1, 1, 1])
     with col2:
-        st.subheader("Example Legitimate Messages:")
-        ham_examples = [
-            "Hi, are you available for lunch tomorrow?",
-            "Your package has been delivered. Thank you for shopping!",
-            "Meeting is scheduled for 2 PM. See you then!"
-        ]
-        for example in ham_examples:
-            if st.button(f"Try: {example[:40]}...", key=f"ham_{example}"):
-                st.session_state.example_input = example
+        check_button = st.button('🚀 Check Message', use_container_width=True, type="primary")
+
+with tab_upload:
+    st.subheader("📁 Score a CSV File")
+    st.caption("Upload a CSV with one message per row. Results are cached per file, "
+               "so changing other settings does not rescore it.")
+    uploaded = st.file_uploader("CSV file", type=["csv"], label_visibility="collapsed")
+
+# Load NLTK and the model once per server process, after the page above is
+# already shown
+try:
+    scorer = load_scorer(model_version)
+except (RuntimeError, RegistryError) as e:
+    st.error(f"❌ {e}")
+    st.stop()
+
+with tab_single:
+    if check_button:
+        if not input_sms.strip():
+            st.warning("⚠️ Please enter a message to check!")
+        else:
+            with st.spinner('Analyzing message...'):
+                key = message_key(input_sms)
+                cached = result_cache.get(key)
+                if cached is not None:
+                    result, confidence_score = cached
+                else:
+                    # 1. preprocess
+                    transformed_sms = transform_text(input_sms)
+                    # 2. vectorize + 3. predict, label and confidence in one pass
+                    labels, probabilities = scorer.score([transformed_sms])
+                    result = labels[0]
+                    confidence_score = probabilities[0] * 100
+
+                    result_cache.put(key, (result, confidence_score))
+
+            st.markdown("---")
+            st.markdown("### 📊 Result")
+
+            # 4. Display with enhanced styling
+            if result == 1:
+                st.markdown('<div class="result-spam">🚨 SPAM DETECTED</div>', unsafe_allow_html=True)
+                st.error("⚠️ This message appears to be **SPAM**")
+                if confidence_score:
+                    st.metric("Confidence Level", f"{confidence_score:.1f}%", delta="High Risk")
+                st.warning("**Recommendation:** Do not click any links or respond to this message. Consider reporting it to your carrier.")
+            else:
+                st.markdown('<div class="result-ham">✅ LEGITIMATE MESSAGE</div>', unsafe_allow_html=True)
+                st.success("✓ This message appears to be **LEGITIMATE**")
+                if confidence_score:
+                    st.metric("Confidence Level", f"{confidence_score:.1f}%", delta="Safe")
+
+    # Footer with example messages
+    with st.expander("📝 Try Example Messages"):
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.subheader("Example Spam Messages:")
+            spam_examples = [
+                "Congratulations! You won a FREE iPhone. Click here: bit.ly/winner",
+                "URGENT: Your account has been suspended. Verify now: malicious-site.com",
+                "Claim your FREE £50 voucher NOW! Limited offer!"
+            ]
+            for example in spam_examples:
+                st.button(f"Try: {example[:40]}...", key=f"spam_{example}",
+                          on_click=use_example, args=(example,))
+
+        with col2:
+            st.subheader("Example Legitimate Messages:")
+            ham_examples = [
+                "Hi, are you available for lunch tomorrow?",
+                "Your package has been delivered. Thank you for shopping!",
+                "Meeting is scheduled for 2 PM. See you then!"
+            ]
+            for example in ham_examples:
+                st.button(f"Try: {example[:40]}...", key=f"ham_{example}",
+                          on_click=use_example, args=(example,))
+
+with tab_upload:
+    if uploaded is not None:
+        # Hash each upload once; reruns reuse it as the cache key
+        upload_hashes = st.session_state.setdefault('upload_hashes', {})
+        if uploaded.file_id not in upload_hashes:
+            upload_hashes[uploaded.file_id] = hashlib.sha256(uploaded.getvalue()).hexdigest()
+        file_hash = upload_hashes[uploaded.file_id]
+
+        try:
+            df = read_upload(file_hash, uploaded.getvalue())
+        except (ValueError, pd.errors.ParserError) as e:
+            st.error(f"❌ Could not read {uploaded.name} as CSV: {e}")
+            st.stop()
+
+        columns = df.columns.tolist()
+        default = next((i for i, c in enumerate(columns) if c in TEXT_COLUMNS), 0)
+        text_column = st.selectbox("Message column", columns, index=default)
+
+        results, results_csv = score_upload(file_hash, text_column, model_version, df)
+
+        scored = results[results['prediction'] != '']
+        spam_count = int((scored['prediction'] == 'spam').sum())
+        st.markdown("### 📊 Label Distribution")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Messages", f"{len(scored):,}")
+        col2.metric("Spam", f"{spam_count:,}",
+                    f"{spam_count / len(scored):.1%}" if len(scored) else None, delta_color="off")
+        col3.metric("Legitimate", f"{len(scored) - spam_count:,}")
+        if len(scored):
+            st.bar_chart(scored['prediction'].value_counts())
+        if len(scored) < len(results):
+            st.caption(f"{len(results) - len(scored):,} blank row(s) were not scored.")
+
+        st.download_button(
+            "⬇️ Download results (CSV)",
+            data=results_csv,
+            file_name=f"{os.path.splitext(uploaded.name)[0]}_scored.csv",
+            mime="text/csv"
+        )
+        if len(results) > UPLOAD_PREVIEW_ROWS:
+            st.caption(f"Showing the first {UPLOAD_PREVIEW_ROWS:,} of {len(results):,} rows.")
+        st.dataframe(results.head(UPLOAD_PREVIEW_ROWS))
 
 # Sidebar information
 with st.sidebar:
@@ -214,8 +315,9 @@ with st.sidebar:
     """)
     
     st.markdown("## ⚙️ Technical Details")
-    st.markdown("""
+    st.markdown(f"""
     - **Model Type:** Machine Learning Classifier
+    - **Model Version:** {model_version or 'unversioned'}
     - **Vectorization:** TF-IDF
     - **Text Processing:** NLTK
     - **Framework:** Streamlit
@@ -0,0 +1,366 @@
+"""
+Fast-Start Model Artifact for SMS Spam Detector
+A compact, memory-mappable alternative to vectorizer.pkl + model.pkl.
+
+The artifact is a directory of raw .npy arrays plus a small meta.json:
+  vocabulary.npy        sorted string table of the TF-IDF vocabulary
+                        (absent for hashing vectorizers, which need none)
+  idf.npy               idf weight per feature
+  feature_log_prob.npy  MultinomialNB feature_log_prob_ (classes x features)
+  class_log_prior.npy   MultinomialNB class_log_prior_
+  classes.npy           class labels
+
+A quantized artifact (export_artifact(..., quantize='float16' or 'int8'),
+train_model.py --quantize) stores idf as float16 and feature_log_prob
+as float16, or as int8 with a per-class affine map in
+feature_log_prob_scale.npy / feature_log_prob_offset.npy
+(log-prob ~= value * scale + offset). It is scored by
+scoring.QuantizedNBScorer without dequantizing the whole matrix.
+
+Loading needs only numpy (no sklearn import, no Python dict vocabulary),
+and the arrays are opened with numpy.load(mmap_mode='r') so worker
+processes share the same pages.
+
+Usage: python artifact.py [float16|int8]   (exports the artifact from the
+       existing pickles; with a dtype, the quantized variant to
+       model_artifact_<dtype>/)
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+
+import numpy as np
+
+from scoring import HashingIndex, VocabularyIndex, feature_parameters, row_norms, term_counts
+
+ARTIFACT_DIR = 'model_artifact'
+ARTIFACT_FORMAT_VERSION = 1
+# Quantized artifacts get their own format version, so loaders that
+# predate quantization do not read int8 values as log-probabilities
+QUANTIZED_FORMAT_VERSION = 2
+QUANTIZATIONS = ('float16', 'int8')
+SOURCE_FILES = ('vectorizer.pkl', 'model.pkl')
+_SCALE_FILES = ('feature_log_prob_scale.npy', 'feature_log_prob_offset.npy')
+
+
+def file_checksum(path):
+    """Return the sha256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def quantized_dir(quantize, path=ARTIFACT_DIR):
+    """Default directory of a quantized artifact, e.g. model_artifact_int8"""
+    return f"{path}_{quantize}"
+
+
+def quantize_log_prob(feature_log_prob, quantize):
+    """
+    Quantize a (classes x features) log-probability matrix.
+    Returns (values, scale, offset) with
+    feature_log_prob ~= values * scale[:, None] + offset[:, None].
+    int8 maps each class row's [min, max] onto the 256 levels, so the
+    error is at most half a step, (max - min) / 510.
+    """
+    n_classes = feature_log_prob.shape[0]
+    if quantize == 'float16':
+        return feature_log_prob.astype(np.float16), np.ones(n_classes), np.zeros(n_classes)
+    if quantize != 'int8':
+        raise ValueError(f"quantize must be one of {QUANTIZATIONS}, not {quantize!r}")
+    low, high = feature_log_prob.min(axis=1), feature_log_prob.max(axis=1)
+    scale = (high - low) / 255
+    scale[scale == 0] = 1
+    values = np.round((feature_log_prob - low[:, None]) / scale[:, None]) - 128
+    return values.astype(np.int8), scale, low + 128 * scale
+
+
+def export_artifact(vectorizer, model, path=ARTIFACT_DIR, source_files=SOURCE_FILES, model_version=1,
+                    quantize=None):
+    """
+    Write a fitted vectorizer + MultinomialNB pair as an artifact directory.
+    The vectorizer is a TfidfVectorizer or a HashingVectorizer +
+    TfidfTransformer pipeline (see scoring.feature_parameters).
+    model_version is recorded in meta.json; it is bumped by every full or
+    incremental training run (see next_model_version).
+    quantize ('float16' or 'int8') writes the quantized variant.
+    """
+    from preprocessing import PREPROCESSING_VERSION
+
+    features = feature_parameters(vectorizer)
+    index, order = features['index'], features['order']
+    feature_log_prob = model.feature_log_prob_ if order is None else model.feature_log_prob_[:, order]
+
+    os.makedirs(path, exist_ok=True)
+    vocabulary_path = os.path.join(path, 'vocabulary.npy')
+    if index.kind == 'vocabulary':
+        np.save(vocabulary_path, index.terms)
+    elif os.path.exists(vocabulary_path):
+        os.remove(vocabulary_path)
+    if quantize:
+        values, scale, offset = quantize_log_prob(np.asarray(feature_log_prob, dtype=np.float64), quantize)
+        np.save(os.path.join(path, 'idf.npy'), np.ascontiguousarray(features['idf'], dtype=np.float16))
+        np.save(os.path.join(path, 'feature_log_prob.npy'), np.ascontiguousarray(values))
+        for name, array in zip(_SCALE_FILES, (scale, offset)):
+            np.save(os.path.join(path, name), array)
+    else:
+        np.save(os.path.join(path, 'idf.npy'), np.ascontiguousarray(features['idf'], dtype=np.float64))
+        np.save(os.path.join(path, 'feature_log_prob.npy'),
+                np.ascontiguousarray(feature_log_prob, dtype=np.float64))
+        for name in _SCALE_FILES:
+            if os.path.exists(os.path.join(path, name)):
+                os.remove(os.path.join(path, name))
+    np.save(os.path.join(path, 'class_log_prior.npy'),
+            np.ascontiguousarray(model.class_log_prior_, dtype=np.float64))
+    np.save(os.path.join(path, 'classes.npy'), np.asarray(model.classes_))
+
+    meta = {
+        'format_version': QUANTIZED_FORMAT_VERSION if quantize else ARTIFACT_FORMAT_VERSION,
+        'quantize': quantize,
+        'model_version': model_version,
+        'preprocessing_version': PREPROCESSING_VERSION,
+        'vectorizer': index.kind,
+        'n_features': index.n_features,
+        'lowercase': features['lowercase'],
+        'token_pattern': features['token_pattern'],
+        'norm': features['norm'],
+        'sublinear_tf': features['sublinear_tf'],
+        'source_checksums': {
+            os.path.basename(f): file_checksum(f) for f in source_files if os.path.exists(f)
+        }
+    }
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+
+def read_meta(path=ARTIFACT_DIR):
+    """Return the artifact's meta.json as a dict, or None if there is no artifact"""
+    meta_path = os.path.join(path, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def next_model_version(path=ARTIFACT_DIR):
+    """Version number for the next model written to path"""
+    meta = read_meta(path)
+    return (meta or {}).get('model_version', 0) + 1
+
+
+def artifact_is_current(path=ARTIFACT_DIR, source_files=SOURCE_FILES):
+    """
+    True if the artifact exists and was exported from the current pickles.
+    Pickles that are absent (artifact-only deployments) are not checked.
+    """
+    meta = read_meta(path)
+    if meta is None or meta.get('format_version') not in (ARTIFACT_FORMAT_VERSION, QUANTIZED_FORMAT_VERSION):
+        return False
+
+    checksums = meta.get('source_checksums', {})
+    for source in source_files:
+        name = os.path.basename(source)
+        if os.path.exists(source) and checksums.get(name) != file_checksum(source):
+            return False
+    return True
+
+
+class SparseRows:
+    """Minimal CSR matrix: row i holds indices/data[indptr[i]:indptr[i + 1]]"""
+
+    def __init__(self, indptr, indices, data, shape):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.shape = shape
+
+    def row_ids(self):
+        """Row number of every stored entry"""
+        return np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+
+
+class ArtifactVectorizer:
+    """TF-IDF transform over the artifact's vocabulary or hashed features (unigram word analyzer)"""
+
+    def __init__(self, index, idf, meta):
+        self.index = index
+        self.idf = idf
+        self.meta = meta
+        self.n_features = index.n_features
+        self._token_re = re.compile(meta['token_pattern'])
+
+    def transform(self, texts):
+        """Vectorize preprocessed texts into a SparseRows matrix"""
+        n_docs = len(texts)
+        rows, indices, counts = term_counts(
+            texts, self.index, self._token_re, self.meta['lowercase']
+        )
+        data = counts.astype(np.float64)
+        if self.meta['sublinear_tf']:
+            data = np.log(data) + 1
+        data *= self.idf[indices]
+        if self.meta['norm']:
+            data /= row_norms(rows, data, n_docs, self.meta['norm'])[rows]
+
+        indptr = np.zeros(n_docs + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_docs), out=indptr[1:])
+        return SparseRows(indptr, indices, data, (n_docs, self.n_features))
+
+
+class ArtifactClassifier:
+    """
+    MultinomialNB prediction from the artifact arrays. For a quantized
+    artifact, feature_log_prob_ holds the quantized values and
+    log_prob_scale / log_prob_offset map them back per class.
+    """
+
+    def __init__(self, feature_log_prob, class_log_prior, classes, log_prob_scale=None, log_prob_offset=None):
+        self.feature_log_prob_ = feature_log_prob
+        self.class_log_prior_ = class_log_prior
+        self.classes_ = classes
+        self.log_prob_scale = log_prob_scale
+        self.log_prob_offset = log_prob_offset
+
+    @property
+    def quantized(self):
+        return self.feature_log_prob_.dtype != np.float64
+
+    def joint_log_likelihood(self, X):
+        """Unnormalized class log-probabilities for each row of X"""
+        rows = X.row_ids()
+        jll = np.tile(self.class_log_prior_, (X.shape[0], 1))
+        for c in range(len(self.classes_)):
+            log_prob = self.feature_log_prob_[c, X.indices]
+            if self.quantized:
+                log_prob = log_prob * self.log_prob_scale[c] + self.log_prob_offset[c]
+            weights = X.data * log_prob
+            jll[:, c] += np.bincount(rows, weights=weights, minlength=X.shape[0])
+        return jll
+
+    def predict(self, X):
+        return self.classes_[self.joint_log_likelihood(X).argmax(axis=1)]
+
+    def predict_proba(self, X):
+        jll = self.joint_log_likelihood(X)
+        jll -= jll.max(axis=1, keepdims=True)
+        proba = np.exp(jll)
+        proba /= proba.sum(axis=1, keepdims=True)
+        return proba
+
+
+def load_artifact(path=ARTIFACT_DIR, mmap_mode='r'):
+    """
+    Load an artifact directory, returning (vectorizer, classifier). Warns
+    on stderr when it was trained with another PREPROCESSING_VERSION.
+    """
+    from preprocessing import PREPROCESSING_VERSION
+
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    if meta.get('preprocessing_version') != PREPROCESSING_VERSION:
+        print(f"⚠️  {path}/ was trained with preprocessing version {meta.get('preprocessing_version')}, "
+              f"not {PREPROCESSING_VERSION}; its predictions may be off (retrain with python train_model.py)",
+              file=sys.stderr)
+
+    def load(name):
+        return np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+
+    if meta.get('vectorizer', 'vocabulary') == 'hashing':
+        index = HashingIndex(meta['n_features'])
+    else:
+        index = VocabularyIndex(load('vocabulary.npy'))
+    vectorizer = ArtifactVectorizer(index, load('idf.npy'), meta)
+    scale_offset = [load(name) for name in _SCALE_FILES] if meta.get('quantize') else []
+    classifier = ArtifactClassifier(
+        load('feature_log_prob.npy'), load('class_log_prior.npy'), load('classes.npy'), *scale_offset
+    )
+    return vectorizer, classifier
+
+
+def quantization_report(reference, quantized, texts, labels, singles=200, repeats=3):
+    """
+    Compare a float64 scorer with a quantized one on preprocessed texts and
+    0/1 labels. Returns a dict with per-scorer metrics, array bytes and
+    latency (microseconds per message, one message per call and in one
+    batch, best of repeats), plus the label agreement and the largest
+    probability difference between the two.
+    """
+    import time
+
+    labels = np.asarray(labels)
+    report, outputs = {}, {}
+    for name, scorer in (('float64', reference), ('quantized', quantized)):
+        predicted, probabilities = outputs[name] = scorer.score(texts)
+        caught = (predicted == 1) & (labels == 1)
+        precision = caught.sum() / max((predicted == 1).sum(), 1)
+        recall = caught.sum() / max((labels == 1).sum(), 1)
+        single = batch = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for text in texts[:singles]:
+                scorer.score([text])
+            single = min(single, (time.perf_counter() - start) / len(texts[:singles]))
+            start = time.perf_counter()
+            scorer.score(texts)
+            batch = min(batch, (time.perf_counter() - start) / len(texts))
+        report[name] = {
+            'accuracy': float((predicted == labels).mean()), 'precision': float(precision),
+            'recall': float(recall), 'f1': float(2 * precision * recall / max(precision + recall, 1e-12)),
+            'bytes': scorer.nbytes(), 'single_us': single * 1e6, 'batch_us': batch * 1e6,
+        }
+    (reference_labels, reference_probabilities), (quantized_labels, quantized_probabilities) = outputs.values()
+    report['agreement'] = float((reference_labels == quantized_labels).mean())
+    report['max_probability_delta'] = float(np.abs(reference_probabilities - quantized_probabilities).max())
+    return report
+
+
+def print_quantization_report(report, quantize):
+    """Print a quantization_report() as a small table"""
+    print(f"   {'':<9} {'accuracy':>8} {'precision':>9} {'recall':>7} {'f1':>7} {'weights':>9} "
+          f"{'µs/msg':>7} {'µs/msg@batch':>12}")
+    for name, label in (('float64', 'float64'), ('quantized', quantize)):
+        row = report[name]
+        print(f"   {label:<9} {row['accuracy']:>8.4f} {row['precision']:>9.4f} {row['recall']:>7.4f} "
+              f"{row['f1']:>7.4f} {row['bytes'] / 1024:>7.1f}KB {row['single_us']:>7.1f} {row['batch_us']:>12.2f}")
+    print(f"   Label agreement {report['agreement']:.2%}, "
+          f"largest confidence difference {report['max_probability_delta'] * 100:.3f} points")
+
+
+def load_models(path=ARTIFACT_DIR, source_files=SOURCE_FILES):
+    """
+    Load (vectorizer, model), preferring the artifact when it matches the
+    pickles and falling back to vectorizer.pkl / model.pkl otherwise.
+    """
+    if artifact_is_current(path, source_files):
+        return load_artifact(path)
+
+    import pickle
+
+    vectorizer_path, model_path = source_files
+    with open(vectorizer_path, 'rb') as f:
+        vectorizer = pickle.load(f)
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    return vectorizer, model
+
+
+if __name__ == '__main__':
+    import pickle
+
+    # python artifact.py [float16|int8] exports the quantized variant instead
+    quantize = sys.argv[1] if len(sys.argv) > 1 else None
+    if quantize not in (None,) + QUANTIZATIONS:
+        raise SystemExit(f"usage: python artifact.py [{'|'.join(QUANTIZATIONS)}]")
+    path = quantized_dir(quantize) if quantize else ARTIFACT_DIR
+    print(f"💾 Exporting {quantize + ' ' if quantize else ''}model artifact from vectorizer.pkl & model.pkl...")
+    vectorizer = pickle.load(open('vectorizer.pkl', 'rb'))
+    model = pickle.load(open('model.pkl', 'rb'))
+    # Re-exporting does not change the model, so it keeps its version
+    export_artifact(vectorizer, model, path=path, model_version=(read_meta() or {}).get('model_version', 1),
+                    quantize=quantize)
+    print(f"✅ Artifact written to {path}/")
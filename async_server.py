@@ -0,0 +1,279 @@
+"""
+Async Micro-Batching Server for SMS Spam Detector
+An ASGI app with the same JSON API as flask_app.py (/api/predict,
+/api/predict/batch, /api/stats, /api/health, /metrics). Concurrent /api/predict
+requests are collected by a micro-batcher for up to MICROBATCH_WAIT_MS
+milliseconds or MICROBATCH_MAX_SIZE messages, scored in one vectorized
+call, and the results are fanned back out to the waiting requests.
+
+Usage: python async_server.py   (needs uvicorn: pip install uvicorn)
+   or: uvicorn async_server:app --host 0.0.0.0 --port 8000
+"""
+
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+# Shares model loading, caching, scoring and metrics with the Flask app
+from flask_app import (MAX_BATCH_SIZE, REQUEST_ERRORS, REQUEST_SECONDS, active_model_version, audit_log,
+                       build_result, campaign_index, cascade_stats, explain_many, explain_options,
+                       metrics_registry, model_info, predict_many, record_predictions, result_cache, shadow,
+                       start_model_watcher, stem_cache_stats, warm_up)
+
+# Batching window (override with environment variables)
+MICROBATCH_WAIT_MS = float(os.environ.get('MICROBATCH_WAIT_MS', 0))
+MICROBATCH_MAX_SIZE = int(os.environ.get('MICROBATCH_MAX_SIZE', 64))
+
+
+class MicroBatcher:
+    """
+    Collects messages submitted by concurrent requests and scores them together.
+    A batch closes when it reaches max_batch_size or max_wait_ms after its
+    first message arrived. Scoring runs on a single background thread, so
+    the event loop keeps accepting (and batching) requests meanwhile.
+    """
+
+    def __init__(self, score_batch, max_batch_size=MICROBATCH_MAX_SIZE, max_wait_ms=MICROBATCH_WAIT_MS):
+        self.score_batch = score_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='microbatch')
+        self._queue = None
+        self._task = None
+        self.batches = 0
+        self.messages = 0
+        self.largest_batch = 0
+
+    async def submit(self, message):
+        """Score one message as part of the next batch"""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((message, future))
+        return await future
+
+    async def run_exclusive(self, func, *args):
+        """Run func on the scoring thread, between batches"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def _collect(self):
+        """Wait for one message, then gather more until the window closes"""
+        loop = asyncio.get_running_loop()
+        items = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(items) < self.max_batch_size:
+            # Take whatever is already queued without waiting
+            if not self._queue.empty():
+                items.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return items
+
+    async def _run(self):
+        while True:
+            items = await self._collect()
+            try:
+                results = await self.run_exclusive(self.score_batch, [m for m, _ in items])
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.messages += len(items)
+            self.largest_batch = max(self.largest_batch, len(items))
+            for (_, future), result in zip(items, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        """Return the batching counters as a JSON-serializable dict"""
+        return {
+            'max_wait_ms': self.max_wait * 1000,
+            'max_batch_size': self.max_batch_size,
+            'batches': self.batches,
+            'messages': self.messages,
+            'largest_batch': self.largest_batch,
+            'mean_batch_size': round(self.messages / self.batches, 2) if self.batches else None
+        }
+
+
+batcher = MicroBatcher(predict_many)
+
+
+async def predict(data, args):
+    """Same contract as flask_app /api/predict, scored through the micro-batcher"""
+    started = time.perf_counter()
+    message = data.get('message', '') if isinstance(data, dict) else ''
+    message = message.strip() if isinstance(message, str) else ''
+    if not message:
+        return 400, {'error': 'No message provided', 'prediction': None, 'confidence': None}
+    try:
+        top_k = explain_options(data, args)
+    except ValueError as e:
+        return 400, {'error': str(e), 'prediction': None, 'confidence': None}
+
+    if top_k:
+        # Explanations need the sparse row, so they bypass the micro-batcher
+        scored = (await batcher.run_exclusive(explain_many, [message], top_k))[0]
+    else:
+        scored = await batcher.submit(message)
+    # Never wait on a full audit queue here: it would stall the event loop
+    record_predictions([message], [scored], 'predict', started, block=False)
+    return 200, build_result(*scored)
+
+
+async def predict_batch(data, args):
+    """Same contract as flask_app /api/predict/batch"""
+    started = time.perf_counter()
+    messages = data.get('messages') if isinstance(data, dict) else None
+    if not isinstance(messages, list) or not messages:
+        return 400, {'error': 'No messages provided', 'results': None}
+    if len(messages) > MAX_BATCH_SIZE:
+        return 413, {'error': f'Too many messages (max {MAX_BATCH_SIZE} per batch)', 'results': None}
+    try:
+        top_k = explain_options(data, args)
+    except ValueError as e:
+        return 400, {'error': str(e), 'results': None}
+
+    messages = [m.strip() if isinstance(m, str) else '' for m in messages]
+    valid = [i for i, m in enumerate(messages) if m]
+    # Already a batch: score it directly on the scoring thread
+    if top_k:
+        scored = await batcher.run_exclusive(explain_many, [messages[i] for i in valid], top_k)
+    else:
+        scored = await batcher.run_exclusive(predict_many, [messages[i] for i in valid])
+    record_predictions([messages[i] for i in valid], scored, 'predict_batch', started, block=False)
+
+    results = [{'error': 'No message provided', 'prediction': None, 'confidence': None} for _ in messages]
+    for i, result in zip(valid, scored):
+        results[i] = build_result(*result)
+    return 200, {'results': results, 'count': len(results), 'message': 'success'}
+
+
+async def health(data, args):
+    """Health check endpoint, with the model version being served"""
+    return 200, {'status': 'healthy', 'service': 'SMS Spam Detector', 'version': '1.0', 'model': model_info}
+
+
+async def stats(data, args):
+    """Cache, campaign index, cascade, audit, shadow model and micro-batching counters"""
+    return 200, {
+        'cache': {'stems': stem_cache_stats(), 'results': result_cache.stats()},
+        'campaigns': campaign_index.stats(),
+        'cascade': cascade_stats(),
+        'audit': audit_log.stats(),
+        'shadow': {**shadow.stats(), 'primary': active_model_version()},
+        'microbatch': batcher.stats()
+    }
+
+
+async def metrics(data, args):
+    """Prometheus metrics (same series as flask_app /metrics)"""
+    return 200, metrics_registry.render()
+
+
+ROUTES = {
+    ('POST', '/api/predict'): predict,
+    ('POST', '/api/predict/batch'): predict_batch,
+    ('GET', '/api/health'): health,
+    ('GET', '/api/stats'): stats,
+    ('GET', '/metrics'): metrics,
+}
+
+
+async def read_body(receive):
+    body = b''
+    while True:
+        event = await receive()
+        body += event.get('body', b'')
+        if not event.get('more_body'):
+            return body
+
+
+async def send_json(send, status, payload):
+    """Send payload as JSON, or as plain text if it is already a string"""
+    if isinstance(payload, str):
+        body, content_type = payload.encode('utf-8'), metrics_registry.content_type.encode()
+    else:
+        body, content_type = json.dumps(payload).encode('utf-8'), b'application/json'
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type), (b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def app(scope, receive, send):
+    """ASGI entry point"""
+    if scope['type'] == 'lifespan':
+        while True:
+            event = await receive()
+            if event['type'] == 'lifespan.startup':
+                # Load NLTK and the model on the scoring thread before accepting requests
+                try:
+                    await batcher.run_exclusive(warm_up)
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                # New registry versions are swapped in off the scoring thread
+                start_model_watcher()
+                shadow.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif event['type'] == 'lifespan.shutdown':
+                batcher.executor.shutdown(wait=False)
+                audit_log.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    start = time.perf_counter()
+    handler = ROUTES.get((scope['method'], scope['path']))
+    endpoint = handler.__name__ if handler is not None else 'unknown'
+    if handler is None:
+        status, payload = 404, {'error': 'Endpoint not found'}
+    else:
+        try:
+            body = await read_body(receive)
+            data = json.loads(body) if body else {}
+        except ValueError:
+            status, payload = 400, {'error': 'Invalid JSON'}
+        else:
+            try:
+                args = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+                status, payload = await handler(data, args)
+            except Exception as e:
+                status, payload = 500, {'error': str(e), 'prediction': None, 'confidence': None}
+    await send_json(send, status, payload)
+
+    REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint)
+    if status >= 400:
+        REQUEST_ERRORS.inc(endpoint, str(status))
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("❌ uvicorn is required: pip install uvicorn")
+
+    print(f"""
+    ╔══════════════════════════════════════════╗
+    ║   SMS Spam Detector - Async Server       ║
+    ║   Micro-batching: {MICROBATCH_WAIT_MS:>5.1f} ms / {MICROBATCH_MAX_SIZE:<5d} msgs   ║
+    ╚══════════════════════════════════════════╝
+    """)
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 8000)), log_level='warning')
@@ -0,0 +1,356 @@
+"""
+Prediction Audit Log for SMS Spam Detector
+Optional, local-only record of every verdict served by flask_app.py and
+async_server.py (enable with AUDIT_LOG=path). A row holds the timestamp, a
+hash of the normalized message (never the text), the verdict and its
+confidence, the campaign cluster, the model version, the endpoint, the
+request's batch size and its latency.
+
+The request path only appends one item per request to a bounded queue. A
+background thread per process hashes the messages and writes rows in bulk:
+one SQLite transaction, or one append to a JSON-lines file, per batch of
+up to AUDIT_BATCH_SIZE rows, at least every AUDIT_FLUSH_INTERVAL
+seconds. When the queue is full, a request waits up to
+AUDIT_BLOCK_TIMEOUT seconds for the writer to catch up (backpressure). The
+record is then dropped and counted, so a stalled disk cannot stall serving.
+async_server.py records on its event loop, where any wait would hold up
+every request, so it drops at once instead (record(..., block=False)).
+
+Paths ending in .jsonl are written as append-only JSON lines; anything
+else is a SQLite database (WAL mode, safe for several gunicorn workers).
+
+Usage: python audit.py [--log audit.db] [--since 24h] [--by hour|day|model|endpoint]
+       (aggregate stats; works on both formats)
+"""
+
+import argparse
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+from caching import message_key
+
+AUDIT_LOG = os.environ.get('AUDIT_LOG')
+AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', 10000))
+AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', 1000))
+AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 1.0))
+AUDIT_BLOCK_TIMEOUT = float(os.environ.get('AUDIT_BLOCK_TIMEOUT', 1.0))
+
+COLUMNS = ('ts', 'message_hash', 'label', 'confidence', 'cluster_id', 'model_version', 'endpoint',
+           'batch_size', 'latency_ms')
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    ts REAL NOT NULL,
+    message_hash TEXT NOT NULL,
+    label TEXT NOT NULL,
+    confidence REAL,
+    cluster_id TEXT,
+    model_version TEXT,
+    endpoint TEXT,
+    batch_size INTEGER,
+    latency_ms REAL
+);
+CREATE INDEX IF NOT EXISTS predictions_ts ON predictions (ts);
+"""
+
+
+class SQLiteSink:
+    """Rows appended to a SQLite table, one transaction per batch"""
+
+    def __init__(self, path):
+        self.path = path
+        # Opened on the writer thread; sqlite3 connections stay on their thread
+        self._connection = None
+
+    def write(self, rows):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, timeout=30)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.executescript(SCHEMA)
+        with self._connection:
+            self._connection.executemany(
+                f"INSERT INTO predictions VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class JsonlSink:
+    """Rows appended to a JSON-lines file, one write() per batch"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, rows):
+        lines = ''.join(json.dumps(dict(zip(COLUMNS, row))) + '\n' for row in rows)
+        # O_APPEND: each batch lands whole at the end, even with several writers
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+
+    def close(self):
+        pass
+
+
+def open_sink(path):
+    return JsonlSink(path) if path.endswith('.jsonl') else SQLiteSink(path)
+
+
+class AuditLog:
+    """
+    Write-behind audit log. record() never does I/O: it enqueues one item
+    per request, and a daemon thread (started lazily in each process, so it
+    survives gunicorn's fork) turns items into rows and writes them in bulk.
+    path=None disables it.
+    """
+
+    def __init__(self, path, queue_size=AUDIT_QUEUE_SIZE, batch_size=AUDIT_BATCH_SIZE,
+                 flush_interval=AUDIT_FLUSH_INTERVAL, block_timeout=AUDIT_BLOCK_TIMEOUT):
+        self.path = path
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        # Guards writer start-up and the counters below
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.blocked = 0
+        self.last_error = None
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+            atexit.register(self.close)
+
+    def record(self, messages, scored, model_version, endpoint, latency, block=True):
+        """
+        Queue one request's verdicts: messages and their (prediction,
+        confidence, cluster_id, ...) tuples. Returns False if the record was
+        dropped because the queue stayed full for block_timeout seconds, or
+        was full at all with block=False.
+        """
+        if not self.enabled:
+            return True
+        self._ensure_started()
+        item = (time.time(), messages, scored, model_version, endpoint, latency)
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            if not block:
+                with self._lock:
+                    self.dropped += len(messages)
+                return False
+            with self._lock:
+                self.blocked += 1
+        try:
+            # Backpressure: wait for the writer, but never indefinitely
+            self._queue.put(item, timeout=self.block_timeout)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += len(messages)
+            return False
+
+    def _rows(self, item):
+        ts, messages, scored, model_version, endpoint, latency = item
+        latency_ms = round(latency * 1000, 3) if latency is not None else None
+        return [
+            (ts, message_key(message).hex(), 'spam' if prediction == 1 else 'ham',
+             round(confidence, 4) if confidence is not None else None, cluster_id,
+             model_version, endpoint, len(messages), latency_ms)
+            for message, (prediction, confidence, cluster_id, *_) in zip(messages, scored)
+        ]
+
+    def _collect(self):
+        """
+        Wait for one item, then keep collecting until batch_size rows are
+        queued, flush_interval has passed since the first, or close() was called
+        """
+        items = [self._queue.get()]
+        rows = 0 if items[0] is None else len(items[0][1])
+        deadline = time.monotonic() + self.flush_interval
+        while rows < self.batch_size and items[-1] is not None:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            items.append(item)
+            rows += 0 if item is None else len(item[1])
+        return items
+
+    def _run(self):
+        sink = open_sink(self.path)
+        closing = False
+        while not closing:
+            items = self._collect()
+            closing = items[-1] is None
+            batch = [row for item in items if item is not None for row in self._rows(item)]
+            if batch:
+                try:
+                    sink.write(batch)
+                    with self._lock:
+                        self.written += len(batch)
+                        self.batches += 1
+                except Exception as e:
+                    with self._lock:
+                        self.failed += len(batch)
+                    if str(e) != self.last_error:
+                        print(f"❌ Audit log write to {self.path} failed: {e}")
+                    self.last_error = str(e)
+            for _ in items:
+                self._queue.task_done()
+        sink.close()
+
+    def flush(self):
+        """Block until everything queued so far is written"""
+        if self.enabled and self._pid == os.getpid():
+            self._queue.join()
+
+    def close(self):
+        """Write what is queued and stop the writer thread"""
+        if self.enabled and self._pid == os.getpid() and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+
+    def stats(self):
+        """Queue and writer counters, as a JSON-serializable dict"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'path': self.path,
+                'queued': self._queue.qsize() if self._queue is not None and self._pid == os.getpid() else 0,
+                'queue_size': self.queue_size,
+                'written': self.written,
+                'batches': self.batches,
+                'blocked_requests': self.blocked,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'last_error': self.last_error
+            }
+
+
+def open_for_query(path):
+    """A SQLite connection over the audit log; JSON-lines logs are loaded into memory"""
+    if not os.path.exists(path):
+        raise SystemExit(f"❌ {path} not found")
+    if not path.endswith('.jsonl'):
+        return sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    connection = sqlite3.connect(':memory:')
+    connection.executescript(SCHEMA)
+    with open(path, encoding='utf-8') as f:
+        rows = (tuple(json.loads(line).get(c) for c in COLUMNS) for line in f if line.strip())
+        connection.executemany(f"INSERT INTO predictions VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+    return connection
+
+
+def parse_since(value):
+    """'30m', '24h', '7d' -> seconds"""
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    try:
+        return float(value[:-1]) * units[value[-1]]
+    except (KeyError, ValueError, IndexError):
+        raise argparse.ArgumentTypeError(f"expected a duration like 30m, 24h or 7d, not {value!r}") from None
+
+
+def request_latency_percentiles(connection, where, params, fractions):
+    """
+    Latency percentiles over requests rather than verdicts: the rows of one
+    request share its timestamp, so a large batch counts once
+    """
+    requests = (f"(SELECT MAX(latency_ms) AS latency_ms FROM predictions WHERE {where} AND latency_ms IS NOT NULL "
+                f"GROUP BY ts, endpoint)")
+    count = connection.execute(f"SELECT COUNT(*) FROM {requests}", params).fetchone()[0]
+    if not count:
+        return count, [None] * len(fractions)
+    return count, [connection.execute(f"SELECT latency_ms FROM {requests} ORDER BY latency_ms LIMIT 1 OFFSET ?",
+                                      params + [min(int(count * fraction), count - 1)]).fetchone()[0]
+                   for fraction in fractions]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate stats from the prediction audit log")
+    parser.add_argument('--log', default=AUDIT_LOG or 'audit.db',
+                        help='audit log path (default: $AUDIT_LOG or audit.db)')
+    parser.add_argument('--since', type=parse_since, help='only records newer than this, e.g. 30m, 24h, 7d')
+    parser.add_argument('--by', choices=['hour', 'day', 'model', 'endpoint'], default='model',
+                        help='breakdown rows (default: model)')
+    parser.add_argument('--top', type=int, default=5, help='most repeated messages and campaigns to list')
+    args = parser.parse_args()
+
+    connection = open_for_query(args.log)
+    where, params = ('ts >= ?', [time.time() - args.since]) if args.since else ('1', [])
+    total, spam, confidence, first, last, unique = connection.execute(
+        f"SELECT COUNT(*), SUM(label = 'spam'), AVG(confidence), MIN(ts), MAX(ts), COUNT(DISTINCT message_hash) "
+        f"FROM predictions WHERE {where}", params).fetchone()
+    if not total:
+        print(f"No audit records in {args.log}" + (" for that period" if args.since else ""))
+        return 0
+
+    def when(ts):
+        return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))
+
+    print(f"📋 {args.log}: {total:,} verdicts from {when(first)} to {when(last)}")
+    print(f"   Spam: {spam:,} ({spam / total:.1%}), ham: {total - spam:,}")
+    print(f"   Unique messages: {unique:,} ({1 - unique / total:.1%} repeats)")
+    print(f"   Mean confidence: {confidence:.2f}%")
+    requests, latencies = request_latency_percentiles(connection, where, params, (0.5, 0.95, 0.99))
+    if requests:
+        print(f"   Request latency ({requests:,} requests): "
+              f"p50 {latencies[0]:.2f} ms, p95 {latencies[1]:.2f} ms, p99 {latencies[2]:.2f} ms")
+
+    group = {
+        'hour': "strftime('%Y-%m-%d %H:00', ts, 'unixepoch', 'localtime')",
+        'day': "strftime('%Y-%m-%d', ts, 'unixepoch', 'localtime')",
+        'model': "COALESCE(model_version, '-')",
+        'endpoint': "COALESCE(endpoint, '-')",
+    }[args.by]
+    # mean ms: request latency, averaged over verdicts
+    print(f"\n  {args.by:<22} {'verdicts':>9} {'spam %':>7} {'mean conf':>9} {'mean ms':>8}")
+    for key, count, spam_share, mean_confidence, mean_latency in connection.execute(
+            f"SELECT {group} AS k, COUNT(*), AVG(label = 'spam') * 100, AVG(confidence), AVG(latency_ms) "
+            f"FROM predictions WHERE {where} GROUP BY k ORDER BY k", params):
+        print(f"  {key:<22} {count:>9,} {spam_share:>7.1f} {mean_confidence or 0:>9.2f} {mean_latency or 0:>8.2f}")
+
+    print("\n  Most repeated messages (hash, verdicts, spam %):")
+    for message_hash, count, spam_share in connection.execute(
+            f"SELECT message_hash, COUNT(*) AS n, AVG(label = 'spam') * 100 FROM predictions WHERE {where} "
+            f"GROUP BY message_hash HAVING n > 1 ORDER BY n DESC LIMIT ?", params + [args.top]):
+        print(f"  {message_hash}  {count:>7,}  {spam_share:>5.1f}")
+    campaigns = connection.execute(
+        f"SELECT cluster_id, COUNT(*) AS n FROM predictions WHERE {where} AND cluster_id IS NOT NULL "
+        f"GROUP BY cluster_id ORDER BY n DESC LIMIT ?", params + [args.top]).fetchall()
+    if campaigns:
+        print("\n  Largest spam campaigns (cluster id, verdicts):")
+        for cluster_id, count in campaigns:
+            print(f"  {cluster_id}  {count:>7,}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Flask Dev Server vs Async Micro-Batching Server
+Starts each server in a subprocess, drives /api/predict with concurrent
+keep-alive clients (benchmarks/load_test.py) and reports throughput and
+p50/p99 latency. The async server is run with several batching windows.
+The result cache is disabled so every request is scored.
+
+Usage: python benchmarks/bench_async_server.py [--concurrency 1 16 64] [--requests 2000]
+Needs uvicorn for the async server.
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import HEADER, format_result, load_messages, run_load, wait_until_ready
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PORT = 8765
+
+FLASK = f"from flask_app import app, warm_up; warm_up(); app.run(host='127.0.0.1', port={PORT}, threaded=True)"
+ASYNC = f"import uvicorn; uvicorn.run('async_server:app', host='127.0.0.1', port={PORT}, log_level='error')"
+
+
+@contextmanager
+def server(code, **env):
+    """Run a server subprocess with extra environment variables"""
+    environment = dict(os.environ, RESULT_CACHE_SIZE='0', PYTHONWARNINGS='ignore', **env)
+    process = subprocess.Popen([sys.executable, '-c', code], cwd=ROOT, env=environment,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        asyncio.run(wait_until_ready(f'http://127.0.0.1:{PORT}'))
+        yield
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--windows', type=float, nargs='+', default=[0, 2, 5],
+                        help='MICROBATCH_WAIT_MS values to test')
+    args = parser.parse_args()
+
+    messages = load_messages()
+    url = f'http://127.0.0.1:{PORT}'
+    configs = [('flask dev server', FLASK, {})] + [
+        (f'async, window {window:g} ms', ASYNC, {'MICROBATCH_WAIT_MS': str(window)})
+        for window in args.windows
+    ]
+
+    print(f"⏱️  /api/predict, {args.requests} requests per run ({os.cpu_count()} CPU(s))\n")
+    print(HEADER)
+    for name, code, env in configs:
+        with server(code, **env):
+            # Warm up stem memo and code paths before measuring
+            asyncio.run(run_load(url, messages, 4, 200))
+            for concurrency in args.concurrency:
+                result = asyncio.run(run_load(url, messages, concurrency, args.requests))
+                print(format_result(name, result))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+Audit Log Overhead Benchmark
+Sends spam.csv messages to /api/predict (Flask test client, one at a time)
+and reports request latency with the audit log off, with the write-behind
+audit log (SQLite and JSON lines), and with a synchronous SQLite insert +
+commit per request, which is what the write-behind log replaces.
+
+A second run points the log at a sink that stalls, with a small queue, to
+show backpressure: requests wait at most AUDIT_BLOCK_TIMEOUT, then drop the
+record, and serving continues. A third sends concurrent requests to the
+async server (in process, over ASGI) with the same stalled sink: its event
+loop must never wait on the audit queue, so no request should slow down.
+
+Usage: python benchmarks/bench_audit.py [--messages 3000] [--repeats 2]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+warnings.filterwarnings('ignore')
+
+import audit
+import flask_app
+from audit import AuditLog
+
+
+class SynchronousAudit:
+    """One INSERT + COMMIT on the request thread, per request"""
+
+    enabled = True
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(audit.SCHEMA)
+        self.log = AuditLog(path)
+
+    def record(self, messages, scored, model_version, endpoint, latency):
+        rows = self.log._rows((time.time(), messages, scored, model_version, endpoint, latency))
+        with self.connection:
+            self.connection.executemany(f"INSERT INTO predictions VALUES ({', '.join('?' * len(audit.COLUMNS))})",
+                                        rows)
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.connection.close()
+
+
+class StalledSink:
+    """A sink whose writes take a long time, like a disk that stopped responding"""
+
+    def __init__(self, path):
+        pass
+
+    def write(self, rows):
+        time.sleep(2)
+
+    def close(self):
+        pass
+
+
+def run(client, messages):
+    """Per-request latencies in microseconds"""
+    latencies = []
+    for message in messages:
+        start = time.perf_counter()
+        client.post('/api/predict', json={'message': message})
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies
+
+
+async def asgi_post(app, path, payload):
+    """One POST through an ASGI app; returns (status, latency in seconds)"""
+    body = json.dumps(payload).encode()
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(event):
+        sent.append(event)
+
+    start = time.perf_counter()
+    await app({'type': 'http', 'method': 'POST', 'path': path, 'query_string': b''}, receive, send)
+    return sent[0]['status'], time.perf_counter() - start
+
+
+async def asgi_load(app, messages, concurrency):
+    """Send messages to /api/predict with concurrency requests in flight; returns latencies"""
+    pending = iter(messages)
+    latencies = []
+
+    async def client():
+        for message in pending:
+            status, seconds = await asgi_post(app, '/api/predict', {'message': message})
+            assert status == 200, status
+            latencies.append(seconds)
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=3000)
+    parser.add_argument('--repeats', type=int, default=2, help='runs per configuration (fastest p50 kept)')
+    args = parser.parse_args()
+
+    df = pd.read_csv(os.path.join(ROOT, 'spam.csv'), encoding='latin-1')
+    messages = df['v2'].astype(str).tolist()[:args.messages]
+    flask_app.warm_up()
+    # Every request is scored, so the audit cost is measured next to a full prediction
+    flask_app.result_cache.maxsize = 0
+    client = flask_app.app.test_client()
+    run(client, messages[:200])
+
+    print(f"\n🧾 /api/predict, {len(messages)} messages one at a time, result cache off:\n")
+    print(f"  {'audit':<24} {'p50 µs':>8} {'p99 µs':>8} {'mean µs':>8} {'rows':>7} {'writes':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        configurations = [
+            ('off', lambda: AuditLog(None)),
+            ('write-behind SQLite', lambda: AuditLog(os.path.join(directory, f'{time.time_ns()}.db'))),
+            ('write-behind JSON lines', lambda: AuditLog(os.path.join(directory, f'{time.time_ns()}.jsonl'))),
+            ('synchronous SQLite', lambda: SynchronousAudit(os.path.join(directory, f'{time.time_ns()}.db'))),
+        ]
+        for name, make in configurations:
+            best = None
+            for _ in range(args.repeats):
+                flask_app.audit_log = log = make()
+                latencies = run(client, messages)
+                log.flush()
+                if best is None or statistics.median(latencies) < statistics.median(best[0]):
+                    best = (latencies, log)
+                log.close()
+            latencies, log = best
+            if isinstance(log, AuditLog) and log.enabled:
+                rows, writes = log.written, log.batches
+            elif isinstance(log, SynchronousAudit):
+                rows = writes = len(messages)
+            else:
+                rows = writes = 0
+            print(f"  {name:<24} {statistics.median(latencies):>8.0f} "
+                  f"{statistics.quantiles(latencies, n=100)[98]:>8.0f} {statistics.fmean(latencies):>8.0f} "
+                  f"{rows:>7} {writes:>7}")
+
+        # Backpressure: a sink that takes 2 s per write, 20-row batches and a 50-request queue
+        audit.open_sink = StalledSink
+        flask_app.audit_log = log = AuditLog('stalled', queue_size=50, batch_size=20, block_timeout=0.05)
+        start = time.perf_counter()
+        latencies = run(client, messages[:500])
+        seconds = time.perf_counter() - start
+        stats = log.stats()
+        print(f"\n  Stalled sink, 20-row batches, 50-request queue, {log.block_timeout * 1000:.0f} ms block timeout: "
+              f"{len(latencies)} requests served in {seconds:.1f}s, "
+              f"max latency {max(latencies) / 1000:.0f} ms, {stats['blocked_requests']} blocked, "
+              f"{stats['dropped']} records dropped")
+
+        # The same stalled sink behind the async server, 8 requests in flight
+        import async_server
+        async_server.audit_log = flask_app.audit_log = log = AuditLog(
+            'stalled', queue_size=50, batch_size=20, block_timeout=0.05)
+        start = time.perf_counter()
+        latencies = asyncio.run(asgi_load(async_server.app, messages[:500], 8))
+        seconds = time.perf_counter() - start
+        stats = log.stats()
+        print(f"  Async server, same sink, 8 concurrent requests: {len(latencies)} requests served in "
+              f"{seconds:.1f}s, max latency {max(latencies) * 1000:.0f} ms, {stats['blocked_requests']} blocked, "
+              f"{stats['dropped']} records dropped")
+        # Nothing on the event loop may wait for the audit writer
+        if stats['blocked_requests'] or max(latencies) >= log.block_timeout:
+            print("❌ The async server waited on the audit queue")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Campaign Index Replay Benchmark
+Replays a synthetic, campaign-heavy message stream built from spam.csv
+through flask_app.predict_many, with and without the MinHash campaign
+index, and reports throughput, the share of messages answered from a
+campaign cluster and how often that verdict differs from the model's.
+
+The stream mixes spam.csv rows with variants of a few spam "campaign"
+templates. Each variant gets fresh digits (numbers, prices, codes), a
+swapped name and sometimes a reference suffix, so nearly all of them miss
+the exact-match result cache.
+
+Usage: python benchmarks/bench_campaigns.py [--messages 20000] [--campaigns 40] [--campaign-share 0.7]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import warnings
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+warnings.filterwarnings('ignore')
+
+import flask_app
+from campaigns import CampaignIndex
+
+NAMES = ['John', 'Sarah', 'Mike', 'Emma', 'Dave', 'Lucy', 'Tom', 'Anna']
+DIGITS = re.compile(r'\d+')
+
+
+def mutate(template, rng):
+    """A campaign variant: new digits, maybe a name and a reference code"""
+    message = DIGITS.sub(lambda m: ''.join(rng.choice('0123456789') for _ in m.group()), template)
+    if rng.random() < 0.5:
+        message = f"{rng.choice(NAMES)}, {message}"
+    if rng.random() < 0.3:
+        message += f" Ref:{rng.randrange(16 ** 6):06X}"
+    return message
+
+
+def build_stream(df, n, campaigns, campaign_share, seed):
+    """
+    n messages: campaign variants (templates drawn Zipf-like) mixed with
+    spam.csv rows. Returns (messages, labels), 1 for spam.
+    """
+    rng = random.Random(seed)
+    spam = df.loc[df['v1'] == 'spam', 'v2'].astype(str).tolist()
+    rows = list(zip(df['v2'].astype(str), (df['v1'] == 'spam').astype(int)))
+    templates = rng.sample(spam, campaigns)
+    weights = [1 / (rank + 1) for rank in range(campaigns)]
+    stream, labels = [], []
+    for _ in range(n):
+        if rng.random() < campaign_share:
+            message, label = mutate(rng.choices(templates, weights)[0], rng), 1
+        else:
+            message, label = rng.choice(rows)
+        stream.append(message)
+        labels.append(label)
+    return stream, labels
+
+
+def replay(stream, batch_size):
+    """Score the stream in batches of batch_size; returns (seconds, results)"""
+    results = []
+    start = time.perf_counter()
+    for i in range(0, len(stream), batch_size):
+        results.extend(flask_app.predict_many(stream[i:i + batch_size]))
+    return time.perf_counter() - start, results
+
+
+def reset(index_size):
+    flask_app.result_cache.clear()
+    flask_app.campaign_index = CampaignIndex(
+        index_size, threshold=flask_app.campaign_index.threshold, ttl=flask_app.campaign_index.ttl)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--campaigns', type=int, default=40, help='spam templates to vary')
+    parser.add_argument('--campaign-share', type=float, default=0.7,
+                        help='fraction of the stream that is campaign variants')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 64])
+    parser.add_argument('--index-size', type=int, default=5000)
+    parser.add_argument('--min-confidence', type=float, default=flask_app.CAMPAIGN_MIN_CONFIDENCE,
+                        help='spam confidence (%%) needed to start a cluster')
+    parser.add_argument('--repeats', type=int, default=2, help='replays per configuration (fastest kept)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    df = pd.read_csv(os.path.join(ROOT, 'spam.csv'), encoding='latin-1')
+    stream, labels = build_stream(df, args.messages, args.campaigns, args.campaign_share, args.seed)
+    flask_app.warm_up()
+    flask_app.CAMPAIGN_MIN_CONFIDENCE = args.min_confidence
+
+    # The model's own verdict for every message, to count changed verdicts
+    # (this pass also warms the stem cache for the timed runs)
+    reset(0)
+    model_results = [prediction for prediction, *_ in replay(stream, 512)[1]]
+
+    print(f"\n🔁 Replaying {len(stream)} messages ({args.campaign_share:.0%} variants of "
+          f"{args.campaigns} campaigns), exact-match result cache on, "
+          f"clusters from spam at >= {args.min_confidence:.0f}% confidence:\n")
+    # changed: verdicts that differ from the model's; new FP: of those, messages labelled ham
+    print(f"  {'batch':>5}  {'index':<6} {'msg/s':>9} {'µs/msg':>8} {'matched':>8} {'changed':>8} "
+          f"{'new FP':>7} {'clusters':>8}")
+    for batch_size in args.batch_sizes:
+        for index_size in (0, args.index_size):
+            runs = []
+            for _ in range(args.repeats):
+                reset(index_size)
+                runs.append(replay(stream, batch_size) + (flask_app.campaign_index,))
+            seconds, results, index = min(runs, key=lambda run: run[0])
+            matched = index.hits / len(stream)
+            changed = [label for (prediction, *_), expected, label in zip(results, model_results, labels)
+                       if prediction != expected]
+            print(f"  {batch_size:>5}  {'on' if index_size else 'off':<6} {len(stream) / seconds:>9.0f} "
+                  f"{seconds / len(stream) * 1e6:>8.1f} {matched:>8.1%} {len(changed):>8} "
+                  f"{changed.count(0):>7} {index.stats()['clusters']:>8}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Cold Start Benchmark: pickle vs fast-start artifact
+Launches fresh interpreters that load the model and score one message,
+and reports time-to-first-prediction and peak RSS for each loading path.
+
+Usage: python benchmarks/bench_cold_start.py [--runs 5]
+Run `python artifact.py` first if model_artifact/ does not exist.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MESSAGE = "Congratulations! You won a FREE iPhone. Click here: bit.ly/winner"
+
+CHILD = r'''
+import time
+start = time.perf_counter()
+import json, resource, sys, warnings
+warnings.filterwarnings('ignore')
+{load}
+load_seconds = time.perf_counter() - start
+load_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+sklearn_imported = 'sklearn' in sys.modules
+from preprocessing import transform_text
+vector_input = tfidf.transform([transform_text({message!r})])
+model.predict_proba(vector_input)
+print(json.dumps({{
+    'load_seconds': load_seconds,
+    'load_rss_mb': load_rss,
+    'sklearn_imported': sklearn_imported,
+    'seconds': time.perf_counter() - start,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+}}))
+'''
+
+LOADERS = {
+    'pickle': (
+        "import pickle\n"
+        "tfidf = pickle.load(open('vectorizer.pkl', 'rb'))\n"
+        "model = pickle.load(open('model.pkl', 'rb'))"
+    ),
+    'artifact': (
+        "from artifact import load_artifact\n"
+        "tfidf, model = load_artifact()"
+    ),
+}
+
+
+def run_once(name):
+    code = CHILD.format(load=LOADERS[name], message=MESSAGE)
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', code], cwd=ROOT, check=True,
+        capture_output=True, text=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process_seconds'] = time.perf_counter() - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='fresh processes per path')
+    args = parser.parse_args()
+
+    def median(runs, key):
+        return statistics.median(r[key] for r in runs)
+
+    print(f"⏱️  Cold start, median of {args.runs} fresh processes:\n")
+    print(f"  {'path':<10} {'model load':>11} {'RSS':>9} {'sklearn':>8}"
+          f" {'first prediction':>17} {'peak RSS':>9} {'process':>9}")
+    for name in LOADERS:
+        runs = [run_once(name) for _ in range(args.runs)]
+        print(
+            f"  {name:<10}"
+            f" {median(runs, 'load_seconds') * 1000:>8.0f} ms"
+            f" {median(runs, 'load_rss_mb'):>6.1f} MB"
+            f" {str(runs[0]['sklearn_imported']):>8}"
+            f" {median(runs, 'seconds') * 1000:>14.0f} ms"
+            f" {median(runs, 'max_rss_mb'):>6.1f} MB"
+            f" {median(runs, 'process_seconds') * 1000:>6.0f} ms"
+        )
+    print("\n  'model load' stops before preprocessing is imported; "
+          "'first prediction' includes importing NLTK and scoring one message.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Gunicorn Worker Scaling & Shared-Memory Benchmark
+Starts gunicorn with gunicorn.conf.py for several worker counts, with and
+without preload_app. For each it drives /api/predict with concurrent
+clients (benchmarks/load_test.py) and then reads /proc smaps_rollup of the
+master and workers to show how much memory is really per worker.
+
+Usage: python benchmarks/bench_gunicorn.py [--workers 1 2 4] [--concurrency 32] [--requests 3000]
+Linux only (reads /proc).
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import load_messages, run_load, wait_until_ready
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PORT = 8766
+
+
+def memory_kb(pid):
+    """Rss, Pss and private (unshared) memory of a process from smaps_rollup, in KB"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'private': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    }
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(p) for p in f.read().split()]
+
+
+def run(workers, preload, concurrency, total_requests, messages):
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PRELOAD_APP='1' if preload else '0',
+               PORT=str(PORT), RESULT_CACHE_SIZE='0', PYTHONWARNINGS='ignore')
+    process = subprocess.Popen(['gunicorn', '-c', 'gunicorn.conf.py'], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{PORT}'
+    try:
+        asyncio.run(wait_until_ready(url, timeout=120))
+        # Wait for every worker to boot (without preload each loads the model itself)
+        while len(children(process.pid)) < workers:
+            time.sleep(0.2)
+        asyncio.run(run_load(url, messages, concurrency, 200 * workers))
+        result = asyncio.run(run_load(url, messages, concurrency, total_requests))
+
+        worker_memory = [memory_kb(pid) for pid in children(process.pid)]
+        master = memory_kb(process.pid)
+        result['total_pss_mb'] = (master['pss'] + sum(m['pss'] for m in worker_memory)) / 1024
+        result['worker_rss_mb'] = sum(m['rss'] for m in worker_memory) / len(worker_memory) / 1024
+        result['worker_private_mb'] = sum(m['private'] for m in worker_memory) / len(worker_memory) / 1024
+        return result
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=3000)
+    args = parser.parse_args()
+
+    messages = load_messages()
+    print(f"⏱️  gunicorn sync workers, {args.concurrency} clients, {args.requests} requests"
+          f" ({os.cpu_count()} CPU(s))\n")
+    print(f"  {'workers':>7} {'preload':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}"
+          f" {'worker RSS':>11} {'private':>9} {'total PSS':>10}")
+    for preload in (True, False):
+        for workers in args.workers:
+            r = run(workers, preload, args.concurrency, args.requests, messages)
+            print(f"  {workers:>7} {'yes' if preload else 'no':>8} {r['throughput']:>8,.0f}"
+                  f" {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['worker_rss_mb']:>8.1f} MB"
+                  f" {r['worker_private_mb']:>6.1f} MB {r['total_pss_mb']:>7.1f} MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Import-Time Breakdown
+Imports each entry-point module in a fresh interpreter under
+`python -X importtime` and reports its total import time and the
+heaviest top-level packages it pulls in. It also times flask_app.warm_up(),
+which loads what the imports deferred (NLTK, the model).
+
+Usage: python benchmarks/bench_import_time.py [--modules flask_app preprocessing] [--top 6] [--runs 3]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ['preprocessing', 'flask_app', 'async_server', 'train_model', 'classify']
+
+WARM_UP = ("import time; import flask_app; start = time.perf_counter(); flask_app.warm_up(); "
+           "print(f'WARMUP {time.perf_counter() - start}')")
+
+
+def import_times(module):
+    """
+    Parse -X importtime output for `import module`.
+    Returns (total seconds, {top-level package: cumulative seconds}).
+    """
+    env = dict(os.environ, PYTHONWARNINGS='ignore')
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True).stderr
+    packages = {}
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        seconds = int(cumulative) / 1e6
+        if name == module:
+            total = seconds
+        elif depth <= 1:
+            # Direct imports of the module (or of site at startup)
+            top = name.split('.')[0]
+            packages[top] = packages.get(top, 0) + seconds
+    return total, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--modules', nargs='+', default=MODULES)
+    parser.add_argument('--top', type=int, default=6, help='heaviest imports to list per module')
+    parser.add_argument('--runs', type=int, default=3, help='fresh interpreters per module (median)')
+    args = parser.parse_args()
+
+    print(f"⏱️  Import time, median of {args.runs} fresh interpreters:\n")
+    for module in args.modules:
+        runs = [import_times(module) for _ in range(args.runs)]
+        total = statistics.median(r[0] for r in runs)
+        packages = {name: statistics.median(r[1].get(name, 0) for r in runs) for name in runs[0][1]}
+        heaviest = sorted(packages.items(), key=lambda item: -item[1])[:args.top]
+        print(f"  {module:<14} {total * 1000:>8.0f} ms   "
+              + ', '.join(f"{name} {seconds * 1000:.0f}" for name, seconds in heaviest))
+
+    output = subprocess.run([sys.executable, '-c', WARM_UP], cwd=ROOT, capture_output=True, text=True,
+                            env=dict(os.environ, PYTHONWARNINGS='ignore'), check=True).stdout
+    warm_up = float(output.split('WARMUP')[-1])
+    print(f"\n  flask_app.warm_up() {warm_up * 1000:>8.0f} ms   (NLTK import + data, model load, one prediction)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Parallel Preprocessing Scaling Benchmark
+Times preprocessing.transform_many over spam.csv (repeated to make a larger
+corpus) with 1, 2, 4 and 8 worker processes and checks that every run
+returns exactly the serial output, in the same order.
+
+Usage: python benchmarks/bench_parallel_preprocess.py [--repeat 10] [--workers 1 2 4 8]
+Exits with status 1 if any parallel run differs from the serial one.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import preprocessing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10, help='copies of spam.csv in the corpus')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--chunk-size', type=int, default=preprocessing.PREPROCESS_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    df = pd.read_csv(os.path.join(ROOT, 'spam.csv'), encoding='latin-1')
+    messages = df['v2'].astype(str).tolist() * args.repeat
+
+    print(f"⏱️  transform_many over {len(messages):,} messages, chunks of {args.chunk_size}"
+          f" ({os.cpu_count()} CPU(s) available):\n")
+    print(f"  {'workers':>7} {'seconds':>9} {'msg/s':>9} {'speedup':>8} {'identical':>10}")
+    baseline = None
+    expected = None
+    failed = False
+    for workers in args.workers:
+        # Every run starts with a cold stem memo; forked workers would inherit a warm one
+        preprocessing.stem.cache_clear()
+        start = time.perf_counter()
+        output = preprocessing.transform_many(messages, workers, args.chunk_size)
+        seconds = time.perf_counter() - start
+
+        if expected is None:
+            expected, baseline = output, seconds
+        identical = output == expected
+        failed |= not identical
+        print(f"  {workers:>7} {seconds:>9.2f} {len(messages) / seconds:>9,.0f}"
+              f" {baseline / seconds:>7.2f}x {'✅' if identical else '❌':>9}")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
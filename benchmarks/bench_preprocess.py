@@ -0,0 +1,195 @@
+"""
+Preprocessing Parity Check & Microbenchmark
+Compares preprocessing.transform_text against the original NLTK-based
+implementation on every message in spam.csv. Both sides read the installed
+English Punkt tables; with empty or missing tables that check does not cover
+the abbreviation, collocation and orthographic rules. A second check runs
+both tokenizers on the checked-in tables in benchmarks/fixtures/nltk_data
+(trained on spam.csv with nltk's PunktTrainer, plus common English
+abbreviations), over spam.csv and generated punctuation-heavy messages.
+
+Usage: python benchmarks/bench_preprocess.py
+Exits with status 1 if any message tokenizes differently.
+"""
+
+import os
+import random
+import string
+import sys
+import time
+
+import nltk
+import pandas as pd
+from nltk.corpus import stopwords
+from nltk.stem.porter import PorterStemmer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import preprocessing
+
+ps = PorterStemmer()
+
+FIXTURE_NLTK_DATA = os.path.join(ROOT, 'benchmarks', 'fixtures', 'nltk_data')
+# Generated messages checked against the fixture tables
+FUZZ_MESSAGES = 20000
+FUZZ_PUNCTUATION = ['.', '!', '?', ',', ';', ':', '...', '..', '. . .', '--', '-', '"', "''", "'",
+                    '(', ')', '[', ']', '#', '*', '!?', ',.', '.)', '“', '”']
+FUZZ_SPACES = [' ', ' ', ' ', '  ', '\n', ' \n ', '\t']
+
+
+def legacy_tokenize(text):
+    """Tokenization used by the original transform_text"""
+    return [token for token in nltk.word_tokenize(text.lower()) if token.isalnum()]
+
+
+def legacy_transform_text(text):
+    """The original transform_text from app.py / flask_app.py"""
+    text = text.lower()
+    text = nltk.word_tokenize(text)
+
+    y = []
+    for i in text:
+        if i.isalnum():
+            y.append(i)
+
+    text = y[:]
+    y.clear()
+
+    for i in text:
+        if i not in stopwords.words('english') and i not in string.punctuation:
+            y.append(i)
+
+    text = y[:]
+    y.clear()
+
+    for i in text:
+        y.append(ps.stem(i))
+
+    return " ".join(y)
+
+
+def fuzz_messages(tables, count, seed=0):
+    """Random messages mixing table entries, initials, numbers, punctuation and whitespace"""
+    abbreviations, collocations, starters = (sorted(table) for table in tables)
+    words = ['call', 'free', 'now', 'ok', 'txt', 'ur', 'i', 'u', 'x'] + starters[:30]
+    rng = random.Random(seed)
+
+    def token():
+        r = rng.random()
+        if r < 0.25:
+            return rng.choice(words)
+        if r < 0.4:
+            return rng.choice(abbreviations) + '.'
+        if r < 0.47:
+            return ' '.join(rng.choice(collocations))
+        if r < 0.55:
+            return rng.choice('abcdefghijxyz') + '.'
+        if r < 0.65:
+            return str(rng.randint(0, 99)) + rng.choice(['.', '', '.,', '.5'])
+        if r < 0.75:
+            return rng.choice(words + abbreviations) + rng.choice(FUZZ_PUNCTUATION)
+        if r < 0.8:
+            return rng.choice(FUZZ_PUNCTUATION) + rng.choice(words)
+        return rng.choice(FUZZ_PUNCTUATION)
+
+    messages = []
+    for _ in range(count):
+        message = ''.join(token() + rng.choice(FUZZ_SPACES) for _ in range(rng.randint(2, 12)))
+        r = rng.random()
+        messages.append(message.upper() if r < 0.2 else message.title() if r < 0.4 else message)
+    return messages
+
+
+def fixture_parity(messages):
+    """
+    Run preprocessing.tokenize and nltk.word_tokenize + isalnum, both on the
+    fixture Punkt tables. Returns (tables, mismatches, reference tokenize).
+    """
+    from nltk.tokenize.destructive import NLTKWordTokenizer
+    from nltk.tokenize.punkt import PunktSentenceTokenizer, load_punkt_params
+
+    # nltk only opens data files under nltk.data.path
+    nltk.data.path.append(FIXTURE_NLTK_DATA)
+    lang_dir = nltk.data.find('tokenizers/punkt_tab/english/', paths=[FIXTURE_NLTK_DATA])
+    sentences = PunktSentenceTokenizer(load_punkt_params(lang_dir))
+    words = NLTKWordTokenizer()
+
+    def reference(text):
+        """nltk.word_tokenize with the fixture tables"""
+        return [token for sentence in sentences.tokenize(text.lower())
+                for token in words.tokenize(sentence) if token.isalnum()]
+
+    installed = preprocessing.ABBREVIATIONS, preprocessing.COLLOCATIONS, preprocessing.LOWERCASE_STARTERS
+    tables = preprocessing._load_punkt_params(lang_dir)
+    preprocessing.ABBREVIATIONS, preprocessing.COLLOCATIONS, preprocessing.LOWERCASE_STARTERS = tables
+    try:
+        messages = messages + fuzz_messages(tables, FUZZ_MESSAGES)
+        mismatches = [m for m in messages if preprocessing.tokenize(m) != reference(m)]
+    finally:
+        preprocessing.ABBREVIATIONS, preprocessing.COLLOCATIONS, preprocessing.LOWERCASE_STARTERS = installed
+    return tables, len(messages), mismatches, reference
+
+
+def time_per_message(func, messages):
+    """Return the mean latency of func over messages in microseconds"""
+    start = time.perf_counter()
+    for message in messages:
+        func(message)
+    return (time.perf_counter() - start) / len(messages) * 1e6
+
+
+def main():
+    df = pd.read_csv(os.path.join(ROOT, 'spam.csv'), encoding='latin-1')
+    messages = df['v2'].astype(str).tolist()
+
+    preprocessing.load_resources()
+    tables = {
+        'abbreviations': len(preprocessing.ABBREVIATIONS),
+        'collocations': len(preprocessing.COLLOCATIONS),
+        'lowercase starters': len(preprocessing.LOWERCASE_STARTERS),
+    }
+    print(f"📚 Punkt tables {preprocessing.punkt_tables_version()}: "
+          + ', '.join(f"{count} {name}" for name, count in tables.items()))
+    if not any(tables.values()):
+        print("⚠️  Punkt tables are empty; only the fixture check below covers the table-driven rules "
+              "(reinstall them with python nltk_setup.py)")
+
+    print(f"🔍 Checking parity on {len(messages)} messages...")
+    mismatches = [
+        m for m in messages
+        if preprocessing.tokenize(m) != legacy_tokenize(m)
+        or preprocessing.transform_text(m) != legacy_transform_text(m)
+    ]
+    for message in mismatches[:10]:
+        print(f"  ❌ {message!r}")
+        print(f"     nltk: {legacy_tokenize(message)}")
+        print(f"     fast: {preprocessing.tokenize(message)}")
+    print(f"{'✅' if not mismatches else '❌'} {len(messages) - len(mismatches)}/{len(messages)} messages identical\n")
+
+    tables, checked, fixture_mismatches, reference = fixture_parity(messages)
+    print(f"🔍 Checking parity with the fixture Punkt tables ({len(tables[0])} abbreviations, "
+          f"{len(tables[1])} collocations, {len(tables[2])} lowercase starters) "
+          f"on spam.csv and {FUZZ_MESSAGES} generated messages...")
+    for message in fixture_mismatches[:10]:
+        print(f"  ❌ {message!r}")
+        print(f"     nltk: {reference(message)}")
+    print(f"{'✅' if not fixture_mismatches else '❌'} {checked - len(fixture_mismatches)}/{checked} "
+          f"messages identical\n")
+
+    print("⏱️  Per-message latency (mean over spam.csv):")
+    results = [
+        ('tokenize (nltk.word_tokenize + isalnum)', time_per_message(legacy_tokenize, messages)),
+        ('tokenize (preprocessing.tokenize)', time_per_message(preprocessing.tokenize, messages)),
+        ('transform_text (original)', time_per_message(legacy_transform_text, messages)),
+        ('transform_text (preprocessing)', time_per_message(preprocessing.transform_text, messages)),
+    ]
+    for name, micros in results:
+        print(f"  {name:<42} {micros:>9.1f} µs")
+    print(f"\n  Speedup: {results[2][1] / results[3][1]:.1f}x")
+
+    return 1 if mismatches or fixture_mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Scoring Kernel Parity Check & Microbenchmark
+Compares scoring.NBScorer against sklearn's tfidf.transform +
+model.predict + model.predict_proba on the train_model.py test split of
+spam.csv, then reports per-message and per-batch latency.
+
+Usage: python benchmarks/bench_scoring.py [--tolerance 1e-9]
+Exits with status 1 if any label differs or a probability is off by more
+than the tolerance.
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+warnings.filterwarnings('ignore', module='sklearn')
+
+from artifact import ARTIFACT_DIR, load_artifact
+from preprocessing import transform_text
+from scoring import NBScorer
+
+
+def test_split():
+    """The held-out messages and labels used by train_model.py"""
+    df = pd.read_csv(os.path.join(ROOT, 'spam.csv'), encoding='latin-1')
+    labels = (df['v1'] == 'spam').astype(int)
+    _, X_test, _, y_test = train_test_split(
+        df['v2'].astype(str), labels, test_size=0.2, random_state=42, stratify=labels
+    )
+    return X_test.tolist(), y_test.to_numpy()
+
+
+def time_call(func, batches):
+    """Return the mean latency per message of func over batches in microseconds"""
+    start = time.perf_counter()
+    for batch in batches:
+        func(batch)
+    return (time.perf_counter() - start) / sum(len(b) for b in batches) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tolerance', type=float, default=1e-9,
+                        help='maximum absolute probability difference')
+    parser.add_argument('--batch-size', type=int, default=512)
+    args = parser.parse_args()
+
+    tfidf = pickle.load(open(os.path.join(ROOT, 'vectorizer.pkl'), 'rb'))
+    model = pickle.load(open(os.path.join(ROOT, 'model.pkl'), 'rb'))
+    messages, y_test = test_split()
+    texts = [transform_text(m) for m in messages]
+
+    def sklearn_score(batch):
+        vector_input = tfidf.transform(batch)
+        return model.predict(vector_input), model.predict_proba(vector_input).max(axis=1)
+
+    expected_labels, expected_proba = sklearn_score(texts)
+    scorers = [('NBScorer (pickles)', NBScorer.from_sklearn(tfidf, model))]
+    if os.path.exists(os.path.join(ROOT, ARTIFACT_DIR)):
+        artifact_scorer = NBScorer.from_artifact(*load_artifact(os.path.join(ROOT, ARTIFACT_DIR)))
+        scorers.append(('NBScorer (artifact)', artifact_scorer))
+
+    print(f"🔍 Checking parity on {len(texts)} test-split messages...")
+    failed = False
+    for name, scorer in scorers:
+        labels, proba = scorer.score(texts)
+        label_mismatches = int((labels != expected_labels).sum())
+        max_diff = float(np.abs(proba - expected_proba).max())
+        ok = label_mismatches == 0 and max_diff <= args.tolerance
+        failed |= not ok
+        print(f"  {'✅' if ok else '❌'} {name:<22} label mismatches: {label_mismatches}"
+              f"   max |Δp|: {max_diff:.2e}   accuracy: {(labels == y_test).mean():.4f}")
+
+    scorer = scorers[0][1]
+    singles = [[t] for t in texts]
+    batches = [texts[i:i + args.batch_size] for i in range(0, len(texts), args.batch_size)]
+
+    print("\n⏱️  Vectorize + predict latency per message (preprocessing excluded):")
+    results = [
+        ('sklearn, one message', time_call(sklearn_score, singles)),
+        ('NBScorer, one message', time_call(scorer.score, singles)),
+        (f'sklearn, batches of {args.batch_size}', time_call(sklearn_score, batches)),
+        (f'NBScorer, batches of {args.batch_size}', time_call(scorer.score, batches)),
+    ]
+    for name, micros in results:
+        print(f"  {name:<32} {micros:>9.1f} µs   ({1e6 / micros:>9,.0f} msg/s)")
+    print(f"\n  Speedup: {results[0][1] / results[1][1]:.1f}x per message,"
+          f" {results[2][1] / results[3][1]:.1f}x per batch")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
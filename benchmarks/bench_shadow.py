@@ -0,0 +1,126 @@
+"""
+Shadow Model Overhead Benchmark
+Sends spam.csv messages to /api/predict (Flask test client, one at a time,
+result cache off) and reports the served request latency with shadow
+evaluation off and on, plus the comparison the shadow model collected.
+
+The candidate is MultinomialNB(alpha=0.1) over the full TF-IDF vocabulary,
+trained on the train_model.py split and exported to a temporary artifact,
+so it genuinely disagrees with the served model now and then. A last run
+wraps the candidate in a 20 ms sleep with a 50-call queue, to show that a
+slow candidate drops samples instead of slowing responses.
+
+Usage: python benchmarks/bench_shadow.py [--messages 3000] [--repeats 2]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+warnings.filterwarnings('ignore')
+
+import flask_app
+from shadow import ShadowEvaluator, load_candidate
+
+
+class SlowScorer:
+    """A candidate that takes 20 ms longer per call"""
+
+    def __init__(self, scorer):
+        self.scorer = scorer
+
+    def score(self, texts):
+        time.sleep(0.02)
+        return self.scorer.score(texts)
+
+
+def load_slow_candidate(path):
+    # Module level, so the spawned shadow process can unpickle it
+    return SlowScorer(load_candidate(path))
+
+
+def export_candidate(path):
+    """Train the candidate model and export it as an artifact at path"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.naive_bayes import MultinomialNB
+    from artifact import export_artifact
+    from bench_quantized import load_split
+
+    X_train, _, y_train, _ = load_split()
+    vectorizer = TfidfVectorizer()
+    model = MultinomialNB(alpha=0.1).fit(vectorizer.fit_transform(X_train), y_train)
+    export_artifact(vectorizer, model, path=path, source_files=())
+
+
+def run(client, messages):
+    """Per-request latencies in microseconds"""
+    latencies = []
+    for message in messages:
+        start = time.perf_counter()
+        client.post('/api/predict', json={'message': message})
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=3000)
+    parser.add_argument('--repeats', type=int, default=2, help='runs per configuration (fastest p50 kept)')
+    args = parser.parse_args()
+
+    df = pd.read_csv(os.path.join(ROOT, 'spam.csv'), encoding='latin-1')
+    messages = df['v2'].astype(str).tolist()[:args.messages]
+    flask_app.warm_up()
+    # Every request is scored by the served model, so every one can be shadowed
+    flask_app.result_cache.maxsize = 0
+    flask_app.campaign_index.maxsize = 0
+    client = flask_app.app.test_client()
+    run(client, messages[:200])
+
+    with tempfile.TemporaryDirectory() as directory:
+        candidate = os.path.join(directory, 'candidate')
+        export_candidate(candidate)
+        configurations = [
+            ('off', lambda: ShadowEvaluator(None)),
+            ('shadow 10%', lambda: ShadowEvaluator(candidate, 0.1)),
+            ('shadow 100%', lambda: ShadowEvaluator(candidate, 1.0)),
+            ('shadow 100%, slow', lambda: ShadowEvaluator(candidate, 1.0, queue_size=50, load=load_slow_candidate)),
+        ]
+        print(f"\n👥 /api/predict, {len(messages)} messages one at a time, result cache off:\n")
+        print(f"  {'shadow':<18} {'p50 µs':>8} {'p99 µs':>8} {'compared':>9} {'dropped':>8} {'disagree':>9} "
+              f"{'primary cpu':>12} {'candidate cpu':>14}")
+        for name, make in configurations:
+            best = None
+            for _ in range(args.repeats):
+                flask_app.shadow = evaluator = make()
+                # As the servers do at startup: the shadow process is up before traffic
+                evaluator.start()
+                while evaluator.status == 'pending':
+                    time.sleep(0.05)
+                latencies = run(client, messages)
+                evaluator.flush()
+                if best is None or statistics.median(latencies) < statistics.median(best[0]):
+                    best = (latencies, evaluator.stats())
+            latencies, stats = best
+            timing = stats.get('cpu_us_per_message')
+            rate = stats['disagreement_rate']
+            print(f"  {name:<18} {statistics.median(latencies):>8.0f} "
+                  f"{statistics.quantiles(latencies, n=100)[98]:>8.0f} {stats['compared']:>9} {stats['dropped']:>8} "
+                  f"{'' if rate is None else format(rate, '.2%'):>9} "
+                  f"{'' if timing is None else format(timing['primary']['p50'], '.0f') + ' µs':>12} "
+                  f"{'' if timing is None else format(timing['candidate']['p50'], '.0f') + ' µs':>14}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
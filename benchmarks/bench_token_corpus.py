@@ -0,0 +1,126 @@
+"""
+Token Corpus Training Memory Benchmark
+Builds a token corpus from spam.csv (token_corpus.py), tiles it N times
+into a larger corpus, and trains TF-IDF + MultinomialNB on it two ways,
+each in a fresh interpreter:
+
+  in-memory   the train_model.py path: every message as text in a list,
+              vectorizer.fit_transform + model.fit on the whole split
+  streaming   the train_model.py --corpus path: fit_vectorizer +
+              partial_fit over memory-mapped chunks
+
+and reports peak resident memory and training time. The processed text is
+rebuilt from the corpus for the in-memory path, so neither side pays for
+preprocessing. The streaming path's RSS includes the corpus pages it has
+touched through the memory map; those are file-backed and the OS can drop
+them under pressure, unlike the in-memory path's heap.
+
+Usage: python benchmarks/bench_token_corpus.py [--scales 1 10 50] [--chunk-size 50000]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+warnings.filterwarnings('ignore')
+
+
+def tile_corpus(source, path, scale):
+    """Write source's corpus repeated scale times to path"""
+    import json
+    import numpy as np
+    from token_corpus import TokenCorpus
+
+    corpus = TokenCorpus(source)
+    os.makedirs(path, exist_ok=True)
+    shutil.copyfile(os.path.join(source, 'vocabulary.txt'), os.path.join(path, 'vocabulary.txt'))
+    with open(os.path.join(path, 'token_ids.bin'), 'wb') as f:
+        for _ in range(scale):
+            np.asarray(corpus.token_ids).tofile(f)
+    with open(os.path.join(path, 'labels.bin'), 'wb') as f:
+        for _ in range(scale):
+            np.asarray(corpus.labels).tofile(f)
+    with open(os.path.join(path, 'offsets.bin'), 'wb') as f:
+        corpus.offsets[:1].tofile(f)
+        for i in range(scale):
+            (corpus.offsets[1:] + i * corpus.meta['n_tokens']).tofile(f)
+    meta = dict(corpus.meta)
+    for key in ('n_messages', 'n_spam', 'n_tokens'):
+        meta[key] *= scale
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+
+def train(mode, path, chunk_size):
+    """Train once in this process; prints seconds"""
+    import numpy as np
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.naive_bayes import MultinomialNB
+    from token_corpus import TokenCorpus, fit_vectorizer, iter_split, test_rows
+
+    start = time.perf_counter()
+    corpus = TokenCorpus(path)
+    vectorizer = TfidfVectorizer(max_features=3000)
+    model = MultinomialNB()
+    if mode == 'streaming':
+        columns = fit_vectorizer(vectorizer, corpus, 0.2, chunk_size)
+        for X, y in iter_split(vectorizer, columns, corpus, 0.2, False, chunk_size):
+            model.partial_fit(X, y, classes=[0, 1])
+    else:
+        stems = np.array(corpus.stems(), dtype=object)
+        words = stems[np.asarray(corpus.token_ids)].tolist()
+        offsets = np.asarray(corpus.offsets).tolist()
+        texts = [' '.join(words[a:b]) for a, b in zip(offsets[:-1], offsets[1:])]
+        del words
+        train_rows = ~test_rows(0, len(corpus), 0.2)
+        model.fit(vectorizer.fit_transform([t for t, keep in zip(texts, train_rows) if keep]),
+                  np.asarray(corpus.labels)[train_rows])
+    print(time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--train', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.train:
+        train(*args.train, args.chunk_size)
+        return 0
+
+    from token_corpus import build_corpus
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'spam')
+        n_messages = build_corpus(os.path.join(ROOT, 'spam.csv'), source)['n_messages']
+        print(f"\n📚 Training TF-IDF(3000) + MultinomialNB on spam.csv tiled N times "
+              f"(streaming chunks of {args.chunk_size:,}):\n")
+        print(f"  {'scale':>5} {'messages':>10} {'mode':<10} {'seconds':>8} {'peak RSS':>10}")
+        for scale in args.scales:
+            path = os.path.join(directory, f'x{scale}')
+            tile_corpus(source, path, scale)
+            for mode in ('in-memory', 'streaming'):
+                # RUSAGE_CHILDREN reports the largest child so far, so run each
+                # measurement from its own parent process
+                out = subprocess.run([sys.executable, '-c',
+                                      'import resource, subprocess, sys; '
+                                      'out = subprocess.run(sys.argv[1:], capture_output=True, text=True, '
+                                      'check=True).stdout; print(out.split()[-1], '
+                                      'resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024)',
+                                      sys.executable, __file__, '--train', mode, path,
+                                      '--chunk-size', str(args.chunk_size)],
+                                     capture_output=True, text=True, check=True).stdout.split()
+                seconds, peak = float(out[0]), float(out[1])
+                print(f"  {scale:>5} {scale * n_messages:>10,} {mode:<10} {seconds:>8.1f} {peak:>8.0f}MB")
+            shutil.rmtree(path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+TF-IDF vs Hashing Vectorizer Comparison
+Trains both train_model.py feature pipelines on the same split of spam.csv
+and reports accuracy/F1, the memory a serving worker needs to hold the
+model (pickles and artifact), and per-message scoring latency.
+
+Nothing in the repository is overwritten; models are written to a
+temporary directory.
+
+Usage: python benchmarks/bench_vectorizers.py [--hash-features 16384] [--alpha 0.1]
+"""
+
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import make_pipeline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+warnings.filterwarnings('ignore', module='sklearn')
+
+from artifact import export_artifact
+from preprocessing import transform_text
+from scoring import NBScorer
+
+# Loads one model in a fresh interpreter and reports the RSS it added.
+# sklearn is imported before the baseline so only the model itself is counted.
+CHILD = r'''
+import json, pickle, sys, warnings
+warnings.filterwarnings('ignore')
+sys.path.insert(0, {root!r})
+import numpy, sklearn.naive_bayes, sklearn.feature_extraction.text, sklearn.pipeline
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * 4096 / 2 ** 20
+
+before = rss_mb()
+if {kind!r} == 'pickle':
+    tfidf = pickle.load(open({vectorizer!r}, 'rb'))
+    model = pickle.load(open({model!r}, 'rb'))
+else:
+    from artifact import load_artifact
+    tfidf, model = load_artifact({artifact!r})
+from scoring import make_scorer
+make_scorer(tfidf, model).score(['free prize call now'])
+print(json.dumps({{'rss_mb': rss_mb() - before}}))
+'''
+
+
+def worker_rss(kind, directory):
+    """RSS (MB) added by loading a model in a fresh process"""
+    code = CHILD.format(
+        root=ROOT, kind=kind, artifact=os.path.join(directory, 'artifact'),
+        vectorizer=os.path.join(directory, 'vectorizer.pkl'),
+        model=os.path.join(directory, 'model.pkl')
+    )
+    output = subprocess.run([sys.executable, '-c', code], check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])['rss_mb']
+
+
+def latency_us(scorer, texts):
+    """Mean NBScorer.score latency for one message at a time, in microseconds"""
+    start = time.perf_counter()
+    for text in texts:
+        scorer.score([text])
+    return (time.perf_counter() - start) / len(texts) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--hash-features', type=int, default=2 ** 14)
+    parser.add_argument('--alpha', type=float, default=0.1, help='MultinomialNB alpha for hashing')
+    args = parser.parse_args()
+
+    df = pd.read_csv(os.path.join(ROOT, 'spam.csv'), encoding='latin-1')
+    texts = [transform_text(m) for m in df['v2'].astype(str)]
+    labels = (df['v1'] == 'spam').astype(int)
+    X_train, X_test, y_train, y_test = train_test_split(
+        texts, labels, test_size=0.2, random_state=42, stratify=labels
+    )
+
+    pipelines = [
+        ('tfidf', TfidfVectorizer(max_features=3000), 1.0),
+        (f'hashing 2^{args.hash_features.bit_length() - 1}', make_pipeline(
+            HashingVectorizer(n_features=args.hash_features, alternate_sign=False, norm=None),
+            TfidfTransformer()
+        ), args.alpha),
+    ]
+
+    print(f"📊 {len(X_train)} training / {len(X_test)} test messages\n")
+    print(f"  {'vectorizer':<13} {'alpha':>5} {'accuracy':>9} {'F1':>7} {'pickle RSS':>11}"
+          f" {'artifact RSS':>13} {'latency':>10}")
+    for name, vectorizer, alpha in pipelines:
+        model = MultinomialNB(alpha=alpha).fit(vectorizer.fit_transform(X_train), y_train)
+        predictions = model.predict(vectorizer.transform(X_test))
+
+        with tempfile.TemporaryDirectory() as directory:
+            pickle.dump(vectorizer, open(os.path.join(directory, 'vectorizer.pkl'), 'wb'))
+            pickle.dump(model, open(os.path.join(directory, 'model.pkl'), 'wb'))
+            export_artifact(vectorizer, model, os.path.join(directory, 'artifact'), source_files=())
+            pickle_rss = worker_rss('pickle', directory)
+            artifact_rss = worker_rss('artifact', directory)
+
+        scorer = NBScorer.from_sklearn(vectorizer, model)
+        scorer.score(X_test)  # warm the hash memo, as a long-running worker would be
+        print(f"  {name:<13} {alpha:>5} {accuracy_score(y_test, predictions):>9.4f}"
+              f" {f1_score(y_test, predictions):>7.4f} {pickle_rss:>8.1f} MB {artifact_rss:>10.1f} MB"
+              f" {latency_us(scorer, X_test):>7.1f} µs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+HTTP Load Test for the SMS Spam Detector API
+Sends /api/predict requests from N concurrent keep-alive clients (asyncio,
+standard library only) and reports throughput and latency percentiles.
+Messages are taken from spam.csv in order, so with the default request
+count most of them are distinct.
+
+Usage: python benchmarks/load_test.py [--url http://127.0.0.1:5000] [--concurrency 16] [--requests 2000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_messages():
+    df = pd.read_csv(os.path.join(ROOT, 'spam.csv'), encoding='latin-1')
+    return df['v2'].astype(str).tolist()
+
+
+def percentile(values, q):
+    """q-th percentile (0-100) of a list, nearest-rank"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+class Connection:
+    """Minimal HTTP/1.1 keep-alive client over asyncio streams"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, payload=None):
+        """Send one request and return (status, parsed JSON body)"""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n")
+        self.writer.write(head.encode('latin-1') + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('Server closed the connection')
+        version, status = status_line.split()[:2]
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if 'content-length' in headers:
+            data = await self.reader.readexactly(int(headers['content-length']))
+        else:
+            data = await self.reader.read()
+        # HTTP/1.0 servers (e.g. the Flask dev server) close after each response
+        if version == b'HTTP/1.0' or headers.get('connection', '').lower() == 'close' \
+                or 'content-length' not in headers:
+            self.close()
+        return int(status), json.loads(data) if data else None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+async def run_load(url, messages, concurrency=16, total_requests=2000, path='/api/predict'):
+    """
+    Send total_requests single-message requests from `concurrency` clients.
+    Returns a dict with throughput, latency percentiles (ms) and error count.
+    """
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    next_index = 0
+    latencies = []
+    errors = 0
+
+    async def client():
+        nonlocal next_index, errors
+        connection = Connection(host, port)
+        try:
+            while next_index < total_requests:
+                message = messages[next_index % len(messages)]
+                next_index += 1
+                start = time.perf_counter()
+                try:
+                    status, _ = await connection.request('POST', path, {'message': message})
+                except (ConnectionError, asyncio.IncompleteReadError, OSError):
+                    connection.close()
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    errors += 1
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': elapsed,
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000 if latencies else None,
+        'p99_ms': percentile(latencies, 99) * 1000 if latencies else None,
+    }
+
+
+async def wait_until_ready(url, timeout=60):
+    """Poll /api/health until the server answers"""
+    parts = urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        connection = Connection(parts.hostname, parts.port or 80)
+        try:
+            status, _ = await connection.request('GET', '/api/health')
+            if status == 200:
+                return
+        except (ConnectionError, OSError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            connection.close()
+        await asyncio.sleep(0.2)
+    raise TimeoutError(f"{url} did not become healthy within {timeout}s")
+
+
+def format_result(name, result):
+    return (f"  {name:<28} {result['concurrency']:>4} {result['throughput']:>9,.0f}"
+            f" {result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['errors']:>7}")
+
+
+HEADER = f"  {'server':<28} {'conc':>4} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[16])
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    messages = load_messages()
+    asyncio.run(wait_until_ready(args.url))
+    print(HEADER)
+    for concurrency in args.concurrency:
+        result = asyncio.run(run_load(args.url, messages, concurrency, args.requests))
+        print(format_result(args.url, result))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
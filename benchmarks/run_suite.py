@@ -0,0 +1,262 @@
+"""
+Benchmark Suite for SMS Spam Detector
+Runs the performance benchmarks against spam.csv and writes one JSON
+document of metrics. It can compare the results against a stored baseline
+and fail when any metric regresses by more than a threshold.
+
+Groups:
+  preprocess  transform_text per message
+  score       vectorize + predict per message and per batch (serving kernel)
+  cold_start  fresh interpreter: imports + model load, time to first prediction
+  streamlit   app.py script run and "Check Message" rerun (streamlit.testing)
+  http        /api/predict p50/p99 and throughput under N concurrent clients
+
+Usage:
+  python benchmarks/run_suite.py --output results.json
+  python benchmarks/run_suite.py --compare benchmarks/baseline.json --threshold 0.25
+  python benchmarks/run_suite.py --results results.json --compare benchmarks/baseline.json
+  python benchmarks/run_suite.py --only preprocess score
+
+Exits with status 1 if --compare finds a regression past the threshold.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+warnings.filterwarnings('ignore')
+
+GROUPS = ('preprocess', 'score', 'cold_start', 'streamlit', 'http')
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+
+def metric(value, unit, better='lower'):
+    return {'value': round(value, 4), 'unit': unit, 'better': better}
+
+
+def load_messages():
+    import pandas as pd
+
+    df = pd.read_csv(os.path.join(ROOT, 'spam.csv'), encoding='latin-1')
+    return df['v2'].astype(str).tolist()
+
+
+def best_of(repeats, func):
+    """Smallest wall time (seconds) of func over several repeats"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def bench_preprocess(messages, args):
+    import preprocessing
+
+    def run():
+        for message in messages:
+            preprocessing.transform_text(message)
+
+    # Cold means an empty stem memo, not the one-off NLTK load
+    preprocessing.load_resources()
+    preprocessing.stem.cache_clear()
+    cold = best_of(1, run)
+    warm = best_of(args.repeats, run)
+    return {
+        'preprocess.transform_text_cold_us': metric(cold / len(messages) * 1e6, 'us/msg'),
+        'preprocess.transform_text_us': metric(warm / len(messages) * 1e6, 'us/msg'),
+    }
+
+
+def bench_score(messages, args):
+    from artifact import ARTIFACT_DIR, load_models
+    from preprocessing import transform_text
+    from scoring import make_scorer
+
+    scorer = make_scorer(*load_models(os.path.join(ROOT, ARTIFACT_DIR),
+                                      (os.path.join(ROOT, 'vectorizer.pkl'), os.path.join(ROOT, 'model.pkl'))))
+    texts = [transform_text(m) for m in messages]
+    singles = texts[:2000]
+    batches = [texts[i:i + 512] for i in range(0, len(texts), 512)]
+
+    single = best_of(args.repeats, lambda: [scorer.score([t]) for t in singles])
+    batch = best_of(args.repeats, lambda: [scorer.score(b) for b in batches])
+    return {
+        'score.single_us': metric(single / len(singles) * 1e6, 'us/msg'),
+        'score.batch512_us': metric(batch / len(texts) * 1e6, 'us/msg'),
+    }
+
+
+def bench_cold_start(messages, args):
+    from bench_cold_start import LOADERS, run_once
+
+    results = {}
+    for name in LOADERS:
+        runs = [run_once(name) for _ in range(args.cold_runs)]
+        results[f'cold_start.{name}_load_ms'] = metric(
+            statistics.median(r['load_seconds'] for r in runs) * 1000, 'ms')
+        results[f'cold_start.{name}_first_prediction_ms'] = metric(
+            statistics.median(r['seconds'] for r in runs) * 1000, 'ms')
+        results[f'cold_start.{name}_peak_rss_mb'] = metric(
+            statistics.median(r['max_rss_mb'] for r in runs), 'MB')
+    return results
+
+
+STREAMLIT_CHILD = r'''
+import json, logging, time, warnings
+warnings.filterwarnings('ignore')
+logging.disable(logging.WARNING)
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file('app.py', default_timeout=120)
+at.run()
+first_run = time.perf_counter() - start
+checks = []
+for message in {messages!r}:
+    at.text_area[0].input(message)
+    start = time.perf_counter()
+    at.button[0].click().run()
+    checks.append(time.perf_counter() - start)
+    assert not at.exception, at.exception
+checks.sort()
+print(json.dumps({{'first_run': first_run, 'check': checks[len(checks) // 2]}}))
+'''
+
+
+def bench_streamlit(messages, args):
+    code = STREAMLIT_CHILD.format(messages=messages[:20])
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    return {
+        'streamlit.first_run_ms': metric(result['first_run'] * 1000, 'ms'),
+        'streamlit.check_message_ms': metric(result['check'] * 1000, 'ms'),
+    }
+
+
+def bench_http(messages, args):
+    from bench_async_server import FLASK, PORT, server
+    from load_test import run_load
+
+    url = f'http://127.0.0.1:{PORT}'
+    results = {}
+    with server(FLASK):
+        asyncio.run(run_load(url, messages, 4, 200))
+        for concurrency in args.concurrency:
+            r = asyncio.run(run_load(url, messages, concurrency, args.requests))
+            prefix = f'http.flask.c{concurrency}'
+            results[f'{prefix}.p50_ms'] = metric(r['p50_ms'], 'ms')
+            results[f'{prefix}.p99_ms'] = metric(r['p99_ms'], 'ms')
+            results[f'{prefix}.throughput'] = metric(r['throughput'], 'req/s', better='higher')
+            results[f'{prefix}.errors'] = metric(r['errors'], 'count')
+    return results
+
+
+def environment():
+    import numpy
+    import sklearn
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'sklearn': sklearn.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Print old/new values for every metric present in both documents.
+    A metric regresses when it moves in the wrong direction by more than
+    threshold (relative). Returns the names of regressed metrics.
+    """
+    regressions = []
+    print(f"\n📊 Comparison against baseline (threshold {threshold:.0%}):\n")
+    print(f"  {'metric':<42} {'baseline':>11} {'current':>11} {'change':>8}")
+    for name, current in results['metrics'].items():
+        old = baseline['metrics'].get(name)
+        if old is None:
+            continue
+        before, after = old['value'], current['value']
+        if before == 0:
+            change = 0.0 if after == 0 else float('inf')
+        else:
+            change = (after - before) / abs(before)
+        worse = change if current['better'] == 'lower' else -change
+        regressed = worse > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"  {'❌' if regressed else '  '}{name:<40} {before:>11.2f} {after:>11.2f} {change:>+7.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--only', nargs='+', choices=GROUPS, help='run only these groups')
+    parser.add_argument('--skip', nargs='+', choices=GROUPS, default=[], help='skip these groups')
+    parser.add_argument('--output', help='write results JSON here (default: stdout)')
+    parser.add_argument('--results', help='compare an existing results file instead of running')
+    parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE, metavar='BASELINE',
+                        help=f'baseline JSON to compare against (default: {os.path.relpath(DEFAULT_BASELINE, ROOT)})')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='relative regression that fails the comparison (default: 0.25)')
+    parser.add_argument('--repeats', type=int, default=3, help='repeats for in-process timings (best of)')
+    parser.add_argument('--cold-runs', type=int, default=3, help='fresh processes per cold-start path')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16])
+    parser.add_argument('--requests', type=int, default=1000, help='HTTP requests per concurrency level')
+    args = parser.parse_args()
+
+    if args.results:
+        with open(args.results) as f:
+            results = json.load(f)
+    else:
+        groups = [g for g in (args.only or GROUPS) if g not in args.skip]
+        messages = load_messages()
+        runners = {'preprocess': bench_preprocess, 'score': bench_score, 'cold_start': bench_cold_start,
+                   'streamlit': bench_streamlit, 'http': bench_http}
+        results = {'environment': environment(), 'metrics': {}}
+        for group in groups:
+            print(f"⏱️  Running {group}...", file=sys.stderr)
+            results['metrics'].update(runners[group](messages, args))
+
+        document = json.dumps(results, indent=2)
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(document + '\n')
+            print(f"✅ Results written to {args.output}", file=sys.stderr)
+        elif not args.compare:
+            print(document)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} metric(s) regressed: {', '.join(regressions)}")
+            return 1
+        print("\n✅ No regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
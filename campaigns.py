@@ -0,0 +1,190 @@
+"""
+Spam Campaign Index for SMS Spam Detector
+In-memory MinHash + LSH index of recent spam "campaigns": clusters of
+near-identical messages that differ in a phone number, a name, a price or
+a few words. A message that matches a known cluster can reuse the
+cluster's verdict without being preprocessed and scored, and the cluster
+id lets callers group a campaign's messages.
+
+Messages are shingled into word bigrams after lowercasing and collapsing
+digit runs, so shingling needs two regex passes and no NLTK. Signatures
+have num_perm minimums of random multiply-add hash functions (mod 2**64).
+They are split into bands for LSH. Candidates that share a band are confirmed when the
+estimated Jaccard similarity reaches the threshold.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+_DIGITS = re.compile(r"\d+")
+_WORD = re.compile(r"[^\W_]+")
+
+
+def shingles(message):
+    """Word bigrams of a message (unigrams for one-word messages); digit runs become '0'"""
+    words = _WORD.findall(_DIGITS.sub('0', message.lower()))
+    if len(words) < 2:
+        return set(words)
+    return set(zip(words, words[1:]))
+
+
+class CampaignIndex:
+    """
+    Thread-safe, size-bounded MinHash LSH index of message clusters.
+    Each cluster keeps the signature of its first message, a verdict and
+    counters. Clusters are evicted least-recently-matched first, or when
+    unmatched for ttl seconds. maxsize=0 disables the index.
+    """
+
+    def __init__(self, maxsize, ttl=None, threshold=0.7, num_perm=64, bands=16, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.RandomState(seed)
+        # Odd multipliers; uint64 arithmetic wraps, giving the mod 2**64 family
+        self._a = rng.randint(0, 1 << 62, size=num_perm, dtype=np.int64).astype(np.uint64) * 2 + 1
+        self._b = rng.randint(0, 1 << 62, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._clusters = OrderedDict()
+        self._buckets = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    def signature(self, message):
+        """MinHash signature of a message (num_perm uint64s), or None if it has no words"""
+        grams = shingles(message)
+        if not grams:
+            return None
+        # hash() is randomized per process, which is fine for an in-memory index
+        x = np.fromiter(map(hash, grams), dtype=np.int64, count=len(grams)).view(np.uint64)
+        return (x[:, None] * self._a + self._b).min(axis=0)
+
+    def _band_keys(self, signature):
+        raw = signature.tobytes()
+        width = len(raw) // self.bands
+        return [raw[i:i + width] for i in range(0, len(raw), width)]
+
+    def _closest(self, keys, signature, now):
+        """Most similar live cluster sharing a band with signature, at or above the threshold"""
+        candidates = set()
+        for bucket, key in zip(self._buckets, keys):
+            candidates.update(bucket.get(key, ()))
+
+        best, best_similarity = None, self.threshold
+        for cluster_id in candidates:
+            cluster = self._clusters[cluster_id]
+            if self.ttl and cluster['last_seen'] + self.ttl <= now:
+                self._remove(cluster_id)
+                self.expirations += 1
+                continue
+            similarity = np.count_nonzero(cluster['signature'] == signature) / self.num_perm
+            if similarity >= best_similarity:
+                best, best_similarity = cluster_id, similarity
+        return best
+
+    def _join(self, cluster_id, now):
+        cluster = self._clusters[cluster_id]
+        cluster['size'] += 1
+        cluster['last_seen'] = now
+        self._clusters.move_to_end(cluster_id)
+        return cluster
+
+    def match(self, signature, accept=None):
+        """
+        Return (cluster_id, verdict) of the most similar live cluster at or
+        above the threshold, or None. A match counts towards the cluster's
+        size; one whose verdict accept(verdict) rejects is a miss and does not.
+        """
+        if signature is None or not self.enabled:
+            return None
+        keys = self._band_keys(signature)
+        now = time.monotonic()
+        with self._lock:
+            cluster_id = self._closest(keys, signature, now)
+            if cluster_id is None or (accept is not None and not accept(self._clusters[cluster_id]['verdict'])):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return cluster_id, self._join(cluster_id, now)['verdict']
+
+    def add(self, signature, cluster_id, verdict):
+        """
+        Add a scored message: it joins the closest matching cluster, or starts
+        cluster_id with its verdict, evicting the least recently matched
+        cluster if full. Returns the id of the cluster it ended up in.
+        """
+        if signature is None or not self.enabled:
+            return None
+        keys = self._band_keys(signature)
+        now = time.monotonic()
+        with self._lock:
+            closest = self._closest(keys, signature, now)
+            if closest is not None:
+                self._join(closest, now)
+                return closest
+            if cluster_id in self._clusters:
+                self._join(cluster_id, now)
+                return cluster_id
+            self._clusters[cluster_id] = {
+                'signature': signature, 'keys': keys, 'verdict': verdict,
+                'size': 1, 'last_seen': now, 'created': time.time()
+            }
+            for bucket, key in zip(self._buckets, keys):
+                bucket.setdefault(key, set()).add(cluster_id)
+            while len(self._clusters) > self.maxsize:
+                self._remove(next(iter(self._clusters)))
+                self.evictions += 1
+        return cluster_id
+
+    def _remove(self, cluster_id):
+        cluster = self._clusters.pop(cluster_id)
+        for bucket, key in zip(self._buckets, cluster['keys']):
+            members = bucket.get(key)
+            if members is not None:
+                members.discard(cluster_id)
+                if not members:
+                    del bucket[key]
+
+    def clear(self):
+        """Drop all clusters (counters are kept)"""
+        with self._lock:
+            self._clusters.clear()
+            for bucket in self._buckets:
+                bucket.clear()
+
+    def stats(self, top=5):
+        """Counters and the largest clusters, as a JSON-serializable dict"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            largest = sorted(self._clusters.items(), key=lambda item: -item[1]['size'])[:top]
+            return {
+                'clusters': len(self._clusters),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'threshold': self.threshold,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'largest': [
+                    {'cluster_id': cluster_id, 'size': cluster['size'],
+                     'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(cluster['created']))}
+                    for cluster_id, cluster in largest
+                ]
+            }
@@ -0,0 +1,230 @@
+"""
+Bulk Classification CLI for SMS Spam Detector
+Streams a CSV or JSONL message file through the model in fixed-size chunks
+and writes one result per input record, so memory stays bounded no matter
+how large the input is.
+
+Usage:
+  python classify.py messages.csv -o results.jsonl
+  python classify.py dump.jsonl.gz --text-column body --id-column msg_id -o results.csv
+  python classify.py dump.jsonl.gz -o results.csv --resume-from 2500000
+
+Results are written and flushed after every chunk. Progress goes to stderr
+and includes the record offset to pass to --resume-from after an
+interruption; resuming appends to the existing output file.
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import itertools
+import json
+import os
+import sys
+import time
+
+from nltk_setup import ensure_nltk_data
+from preprocessing import PREPROCESS_WORKERS, TEXT_COLUMNS, PreprocessPool, load_resources
+from artifact import load_models
+from model_registry import load_active_models
+from scoring import make_scorer
+
+OUTPUT_FIELDS = ('offset', 'id', 'prediction', 'is_spam', 'confidence', 'error')
+# Largest CSV field size accepted; sys.maxsize overflows a C long on Windows
+CSV_FIELD_SIZE_LIMIT = 2 ** 31 - 1
+
+
+def open_text(path, mode, encoding):
+    """Open a file, stdin/stdout ('-') or a .gz file in text mode"""
+    if path == '-':
+        stream = sys.stdin if 'r' in mode else sys.stdout
+        return io.TextIOWrapper(stream.buffer, encoding=encoding, errors='replace', newline='')
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding=encoding, errors='replace', newline='')
+    return open(path, mode, encoding=encoding, errors='replace', newline='')
+
+
+def detect_format(path):
+    """'jsonl' for .jsonl/.ndjson/.json files (optionally gzipped), else 'csv'"""
+    name = path[:-3] if path.endswith('.gz') else path
+    return 'jsonl' if name.endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def read_csv_records(f, text_column, id_column):
+    """Yield (id, text, error) for each CSV row"""
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return
+    if text_column is None:
+        text_column = next((c for c in TEXT_COLUMNS if c in header), None)
+    if text_column not in header:
+        raise SystemExit(f"❌ Text column {text_column!r} not found in CSV header {header}")
+    if id_column is not None and id_column not in header:
+        raise SystemExit(f"❌ Id column {id_column!r} not found in CSV header {header}")
+
+    text_index = header.index(text_column)
+    id_index = header.index(id_column) if id_column else None
+    for row in reader:
+        if len(row) <= text_index:
+            yield None, None, 'Missing text column'
+            continue
+        record_id = row[id_index] if id_index is not None and id_index < len(row) else None
+        yield record_id, row[text_index], None
+
+
+def read_jsonl_records(f, text_column, id_column):
+    """Yield (id, text, error) for each JSON line"""
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield None, None, 'Invalid JSON'
+            continue
+        if not isinstance(record, dict):
+            yield None, None, 'Record is not a JSON object'
+            continue
+        if text_column is None:
+            column = next((c for c in TEXT_COLUMNS if c in record), None)
+        else:
+            column = text_column
+        text = record.get(column)
+        if not isinstance(text, str):
+            yield record.get(id_column), None, f'Missing text field {column!r}'
+            continue
+        yield record.get(id_column), text, None
+
+
+def score_chunk(scorer, pool, records):
+    """
+    Score one chunk of (id, text, error) records.
+    Valid texts are preprocessed on the PreprocessPool and go through one
+    scorer.score call.
+    Returns a list of result dicts in input order (offset not set).
+    """
+    results = []
+    valid = []
+    for record_id, text, error in records:
+        text = text.strip() if text else ''
+        if error is None and not text:
+            error = 'No message provided'
+        results.append({'id': record_id, 'error': error})
+        if error is None:
+            valid.append((len(results) - 1, text))
+
+    if valid:
+        labels, probabilities = scorer.score(pool.map(text for _, text in valid))
+        for (i, _), label, probability in zip(valid, labels.tolist(), probabilities.tolist()):
+            results[i].update({
+                'prediction': 'spam' if label == 1 else 'ham',
+                'is_spam': label == 1,
+                'confidence': round(probability * 100, 2)
+            })
+    return results
+
+
+class ResultWriter:
+    """Writes result dicts as JSONL or CSV, flushing after each chunk"""
+
+    def __init__(self, f, output_format, include_id, write_header):
+        self.f = f
+        self.fields = [name for name in OUTPUT_FIELDS if include_id or name != 'id']
+        self.csv = None
+        if output_format == 'csv':
+            self.csv = csv.DictWriter(f, fieldnames=self.fields, extrasaction='ignore')
+            if write_header:
+                self.csv.writeheader()
+
+    def write(self, results):
+        for result in results:
+            row = {name: result.get(name) for name in self.fields}
+            if self.csv is not None:
+                self.csv.writerow(row)
+            else:
+                self.f.write(json.dumps(row) + '\n')
+        self.f.flush()
+
+
+def report_progress(done, total_scored, started):
+    """Print records processed, throughput and the resume offset to stderr"""
+    elapsed = time.perf_counter() - started
+    rate = total_scored / elapsed if elapsed else 0.0
+    line = f"\r  📨 {total_scored:,} scored | {rate:,.0f} msg/s | offset {done:,}"
+    print(line, end='', file=sys.stderr, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('input', help="CSV or JSONL file ('.gz' allowed, '-' for stdin)")
+    parser.add_argument('-o', '--output', default='-',
+                        help="output file, '.csv' for CSV else JSONL (default: stdout)")
+    parser.add_argument('--format', choices=['csv', 'jsonl'],
+                        help='input format (default: from the file extension)')
+    parser.add_argument('--text-column', help=f'text field (default: first of {", ".join(TEXT_COLUMNS)})')
+    parser.add_argument('--id-column', help='field copied to the output to identify records')
+    parser.add_argument('--encoding', default='utf-8', help='input encoding (spam.csv is latin-1)')
+    parser.add_argument('--chunk-size', type=int, default=int(os.environ.get('CLASSIFY_CHUNK_SIZE', 5000)),
+                        help='records scored per chunk (default: 5000)')
+    parser.add_argument('--workers', type=int, default=PREPROCESS_WORKERS,
+                        help='preprocessing worker processes (0 = all CPUs, default: 1)')
+    parser.add_argument('--resume-from', type=int, default=0, metavar='OFFSET',
+                        help='skip the first OFFSET records and append to the output')
+    parser.add_argument('--artifact',
+                        help='model artifact directory (default: the active registry version, '
+                             'else model_artifact/)')
+    parser.add_argument('--quiet', action='store_true', help='no progress output')
+    args = parser.parse_args()
+    csv.field_size_limit(CSV_FIELD_SIZE_LIMIT)
+
+    input_format = args.format or detect_format(args.input)
+    output_format = 'csv' if args.output.endswith(('.csv', '.csv.gz')) else 'jsonl'
+    resuming = args.resume_from > 0
+    append = resuming and args.output != '-' and os.path.exists(args.output)
+
+    # Download required NLTK data if not already present, then load it
+    # before PreprocessPool forks its workers
+    ensure_nltk_data()
+    load_resources()
+    if args.artifact:
+        scorer = make_scorer(*load_models(args.artifact))
+    else:
+        scorer = make_scorer(*load_active_models())
+
+    reader = read_jsonl_records if input_format == 'jsonl' else read_csv_records
+    with PreprocessPool(args.workers) as pool, \
+            open_text(args.input, 'r', args.encoding) as fin, \
+            open_text(args.output, 'a' if append else 'w', 'utf-8') as fout:
+        records = reader(fin, args.text_column, args.id_column)
+        # Skipped records are parsed but not scored
+        records = itertools.islice(records, args.resume_from, None)
+        writer = ResultWriter(fout, output_format, args.id_column is not None, not append)
+
+        done = args.resume_from
+        scored = 0
+        spam = 0
+        started = time.perf_counter()
+        while True:
+            chunk = list(itertools.islice(records, args.chunk_size))
+            if not chunk:
+                break
+            results = score_chunk(scorer, pool, chunk)
+            for offset, result in enumerate(results, start=done):
+                result['offset'] = offset
+            writer.write(results)
+
+            done += len(chunk)
+            scored += sum(1 for r in results if r['error'] is None)
+            spam += sum(1 for r in results if r.get('is_spam'))
+            if not args.quiet:
+                report_progress(done, scored, started)
+
+    if not args.quiet:
+        print(f"\n✅ {done - args.resume_from:,} records processed, {scored:,} scored, "
+              f"{spam:,} spam ({spam / scored * 100 if scored else 0:.1f}%)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Preprocessed-Corpus Cache for SMS Spam Detector
+Stores the output of transform_text for a training file on disk so that
+retraining with different vectorizer/model settings skips tokenization and
+stemming.
+
+Each entry is a directory named after the cache key, which is the sha256 of
+the source file plus PREPROCESSING_VERSION and a digest of the Punkt tables
+the tokenizer reads. Editing the data, changing the preprocessing or
+installing different NLTK data therefore selects a different entry; stale entries for the
+same source file are deleted when a new one is written. The processed text
+is stored as token ids into a shared stem table:
+  vocabulary.txt   every distinct stem, one per line (utf-8)
+  token_ids.npy    int32 index into vocabulary for each token, all messages concatenated
+  offsets.npy      int64 start of each message in token_ids (length n + 1)
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+
+from artifact import file_checksum
+from preprocessing import PREPROCESSING_VERSION, punkt_tables_version
+
+CORPUS_CACHE_DIR = os.environ.get('CORPUS_CACHE_DIR', '.corpus_cache')
+
+
+def cache_key(source_path):
+    """Key of the cache entry for the current contents of source_path"""
+    return f"{file_checksum(source_path)[:32]}-p{PREPROCESSING_VERSION}-k{punkt_tables_version()}"
+
+
+def load_processed(source_path, cache_dir=CORPUS_CACHE_DIR):
+    """Return the cached processed texts for source_path, or None on a miss"""
+    entry = os.path.join(cache_dir, cache_key(source_path))
+    if not os.path.exists(os.path.join(entry, 'meta.json')):
+        return None
+
+    with open(os.path.join(entry, 'vocabulary.txt'), encoding='utf-8') as f:
+        vocabulary = np.array(f.read().split('\n'), dtype=object)
+    token_ids = np.load(os.path.join(entry, 'token_ids.npy'))
+    offsets = np.load(os.path.join(entry, 'offsets.npy')).tolist()
+    words = vocabulary[token_ids].tolist()
+    return [' '.join(words[start:end]) for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def save_processed(source_path, texts, cache_dir=CORPUS_CACHE_DIR):
+    """Write processed texts for source_path and drop stale entries for that file"""
+    key = cache_key(source_path)
+    source_name = os.path.basename(source_path)
+
+    tokens = []
+    lengths = []
+    for text in texts:
+        words = text.split()
+        tokens.extend(words)
+        lengths.append(len(words))
+    vocabulary, token_ids = np.unique(np.array(tokens, dtype=str), return_inverse=True)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    # Write to a temporary directory and rename, so readers never see a partial entry
+    entry = os.path.join(cache_dir, key)
+    staging = entry + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    # Stems never contain whitespace, so newline-separated text is unambiguous
+    with open(os.path.join(staging, 'vocabulary.txt'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(vocabulary.tolist()))
+    np.save(os.path.join(staging, 'token_ids.npy'), token_ids.astype(np.int32))
+    np.save(os.path.join(staging, 'offsets.npy'), offsets)
+    with open(os.path.join(staging, 'meta.json'), 'w') as f:
+        json.dump({
+            'source': source_name,
+            'preprocessing_version': PREPROCESSING_VERSION,
+            'punkt_tables': punkt_tables_version(),
+            'n_messages': len(lengths),
+            'n_tokens': len(tokens)
+        }, f, indent=2)
+    shutil.rmtree(entry, ignore_errors=True)
+    os.rename(staging, entry)
+
+    for name in os.listdir(cache_dir):
+        meta_path = os.path.join(cache_dir, name, 'meta.json')
+        if name == key or not os.path.exists(meta_path):
+            continue
+        with open(meta_path) as f:
+            if json.load(f).get('source') == source_name:
+                shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
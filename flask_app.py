@@ -1,70 +1,545 @@
 """
 Flask Backend for SMS Spam Detector
 Serves HTML frontend and provides API endpoints for spam detection
+
+Importing this module is cheap: NLTK and the model are loaded by warm_up(),
+which the server entry points (python flask_app.py, gunicorn.conf.py,
+async_server.py) run before accepting requests. Without it, the first
+request loads them.
 """
 
-from flask import Flask, render_template, request, jsonify
-import pickle
-import string
-from nltk.corpus import stopwords
-import nltk
-from nltk.stem.porter import PorterStemmer
+from flask import Flask, render_template, request, jsonify, g
+from functools import wraps
+import cProfile
+import itertools
 import os
+import threading
+import time
+
+from preprocessing import load_resources, transform_text, stem_cache_stats
+from caching import LRUCache, message_key
+from campaigns import CampaignIndex
+from audit import AUDIT_LOG, AuditLog
+from shadow import SHADOW_MODEL, ShadowEvaluator
+from prefilter import PREFILTER_PATH, HamPrefilter
+from artifact import ARTIFACT_DIR, artifact_is_current, load_artifact, load_models, read_meta
+from model_registry import PREFILTER_FILE as VERSION_PREFILTER_FILE
+from model_registry import REGISTRY_DIR, ModelWatcher, RegistryError, current_version, verify, version_dir
+from scoring import make_scorer
+from metrics import LENGTH_BUCKETS, MetricsRegistry
+
+app = Flask(__name__)
 
-# Download required NLTK data if not already present
-try:
-    nltk.data.find('tokenizers/punkt_tab')
-except LookupError:
+# Batch scoring limits (override with environment variables)
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 10000))
+BATCH_CHUNK_SIZE = int(os.environ.get('BATCH_CHUNK_SIZE', 512))
+
+# Cache of (model generation, normalized message hash) ->
+# (prediction, confidence, cluster_id); see current_model()
+result_cache = LRUCache(
+    maxsize=int(os.environ.get('RESULT_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('RESULT_CACHE_TTL', 3600))
+)
+
+# Near-duplicate spam campaigns: confident spam verdicts start MinHash
+# clusters, and later messages matching a cluster reuse its verdict
+# without preprocessing or scoring (CAMPAIGN_INDEX_SIZE=0 disables)
+campaign_index = CampaignIndex(
+    maxsize=int(os.environ.get('CAMPAIGN_INDEX_SIZE', 5000)),
+    ttl=float(os.environ.get('CAMPAIGN_TTL', 3600)),
+    threshold=float(os.environ.get('CAMPAIGN_THRESHOLD', 0.7))
+)
+CAMPAIGN_MIN_CONFIDENCE = float(os.environ.get('CAMPAIGN_MIN_CONFIDENCE', 80))
+
+# Two-stage cascade (opt-in): a hashed prefilter over the raw text answers
+# obvious ham before preprocessing; the rest goes through the full pipeline.
+# prefilter.npz is written by train_model.py (or python prefilter.py).
+CASCADE = os.environ.get('CASCADE', '0') == '1'
+PREFILTER_FILE = os.environ.get('PREFILTER_PATH', PREFILTER_PATH)
+
+# Optional audit record of every verdict (message hash, not text), written
+# in bulk by a background thread; AUDIT_LOG=audit.db (or .jsonl) enables it
+audit_log = AuditLog(AUDIT_LOG)
+
+# Shadow evaluation (opt-in): SHADOW_MODEL=<registry version or artifact
+# directory> scores a SHADOW_SAMPLE_RATE share of scoring calls with a
+# candidate model in a lower-priority background process, reusing the
+# preprocessed text, and reports agreement and latency in /api/stats
+shadow = ShadowEvaluator(SHADOW_MODEL)
+
+# Explanations (explain=true): stems listed per message by default, and at most
+EXPLAIN_TOP_K = int(os.environ.get('EXPLAIN_TOP_K', 5))
+MAX_EXPLAIN_TOP_K = 50
+
+# Opt-in request profiling: with PROFILE_DIR set, requests sent with an
+# "X-Profile: 1" header (and every PROFILE_EVERY-th request, if > 0) are
+# run under cProfile and the stats dumped to PROFILE_DIR
+PROFILE_DIR = os.environ.get('PROFILE_DIR')
+PROFILE_EVERY = int(os.environ.get('PROFILE_EVERY', 0))
+
+# Prometheus metrics served at /metrics (per process)
+metrics_registry = MetricsRegistry()
+REQUEST_SECONDS = metrics_registry.histogram(
+    'sms_request_duration_seconds', 'Request latency by endpoint', ['endpoint'])
+STAGE_SECONDS = metrics_registry.histogram(
+    'sms_stage_duration_seconds',
+    'Prediction stage latency; path is single (/api/predict) or batch (one chunk of a batch)',
+    ['path', 'stage'])
+REQUEST_ERRORS = metrics_registry.counter(
+    'sms_request_errors_total', 'Responses with status >= 400 by endpoint', ['endpoint', 'status'])
+PREDICTIONS = metrics_registry.counter(
+    'sms_predictions_total', 'Predictions returned by class (cache hits included)', ['label'])
+MESSAGE_LENGTH = metrics_registry.histogram(
+    'sms_message_length_chars', 'Length of scored messages in characters', buckets=LENGTH_BUCKETS)
+CASCADE_MESSAGES = metrics_registry.counter(
+    'sms_cascade_messages_total',
+    'Messages checked by the cascade prefilter: answered as ham, or passed to the full pipeline',
+    ['decision'])
+CAMPAIGN_MATCHES = metrics_registry.counter(
+    'sms_campaign_matches_total', 'Messages answered from a known spam campaign cluster')
+MODEL_LOAD_SECONDS = metrics_registry.gauge(
+    'sms_model_load_seconds', 'Time taken to load the model at startup', ['source'])
+AUDIT_DROPPED = metrics_registry.counter(
+    'sms_audit_dropped_total', 'Verdicts not audited because the audit queue stayed full')
+SHADOW_DROPPED = metrics_registry.counter(
+    'sms_shadow_dropped_total', 'Sampled messages not shadow-scored because the shadow queue was full')
+MODEL_SWAPS = metrics_registry.counter(
+    'sms_model_swaps_total', 'Background model version swaps by outcome', ['outcome'])
+
+# Model source: the active version of the model registry (written by
+# train_model.py) if there is one, else the memory-mapped artifact, else
+# the pickles. Servers poll the registry every MODEL_RELOAD_INTERVAL seconds
+# and swap in a newly activated version without a restart (0 disables).
+MODEL_ARTIFACT_DIR = os.environ.get('MODEL_ARTIFACT_DIR', ARTIFACT_DIR)
+MODEL_RELOAD_INTERVAL = float(os.environ.get('MODEL_RELOAD_INTERVAL', 5))
+
+# Fused TF-IDF + Naive Bayes kernel: label and probability from one pass.
+# Built by load_scorer() on warm-up (or the first request), with the
+# cascade prefilter when CASCADE is on, and replaced by swap_model().
+scorer = None
+prefilter = None
+# Bumped with every swap. Cached verdicts and campaign clusters are keyed
+# or tagged with the generation of the scorer that produced them, so a
+# request still scoring with the old model cannot leave verdicts that the
+# new one would serve.
+model_generation = 0
+# Which model the scorer was built from, reported by /api/health
+model_info = {'version': None, 'model_version': None, 'quantize': None, 'source': None, 'loaded_at': None,
+              'metrics': None}
+_scorer_lock = threading.Lock()
+_watcher = None
+_watcher_pid = None
+
+
+def load_version(version):
+    """
+    Verify a registry version's checksum and build its scorer.
+    Returns (scorer, prefilter, manifest); prefilter is None unless CASCADE
+    is on and the version has one.
+    """
+    manifest = verify(version, REGISTRY_DIR)
+    path = version_dir(version, REGISTRY_DIR)
+    version_scorer = make_scorer(*load_artifact(path))
+    version_prefilter = None
+    if CASCADE and os.path.exists(os.path.join(path, VERSION_PREFILTER_FILE)):
+        version_prefilter = HamPrefilter.load(os.path.join(path, VERSION_PREFILTER_FILE))
+    return version_scorer, version_prefilter, manifest
+
+
+def set_model_info(source, manifest=None, meta=None):
+    """Record the loaded model from its registry manifest or artifact meta.json"""
+    described = manifest or meta or {}
+    model_info.update({
+        'version': manifest['version'] if manifest else None,
+        'model_version': described.get('model_version'),
+        'quantize': described.get('quantize'),
+        'source': source,
+        'loaded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'metrics': manifest.get('metrics') if manifest else None
+    })
+
+
+def load_scorer():
+    """Load the model and build the scorer (and the cascade prefilter), once"""
+    global scorer, prefilter
+    with _scorer_lock:
+        if scorer is not None:
+            return scorer
+        load_start = time.perf_counter()
+        version = current_version(REGISTRY_DIR)
+        if version is not None:
+            new_scorer, prefilter, manifest = load_version(version)
+            source = 'registry'
+            set_model_info(source, manifest)
+            print(f"✓ Model version {version} loaded from {REGISTRY_DIR}/")
+        else:
+            try:
+                # Either a TF-IDF vocabulary or a hashing + idf vectorizer (train_model.py --vectorizer)
+                from_artifact = artifact_is_current(MODEL_ARTIFACT_DIR)
+                tfidf, model = load_models(MODEL_ARTIFACT_DIR)
+                print(f"✓ Models loaded from {MODEL_ARTIFACT_DIR + '/' if from_artifact else 'pickles'}")
+            except FileNotFoundError:
+                print("❌ Error: model.pkl or vectorizer.pkl not found!")
+                raise
+            new_scorer = make_scorer(tfidf, model)
+            source = 'artifact' if from_artifact else 'pickle'
+            set_model_info(source, meta=read_meta(MODEL_ARTIFACT_DIR) if from_artifact else None)
+
+        if CASCADE and prefilter is None:
+            try:
+                prefilter = HamPrefilter.load(PREFILTER_FILE)
+                print(f"✓ Cascade prefilter loaded from {PREFILTER_FILE}")
+            except FileNotFoundError:
+                print(f"⚠️  {PREFILTER_FILE} not found; cascade disabled (run python prefilter.py)")
+
+        scorer = new_scorer
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - load_start, source)
+        return scorer
+
+
+def swap_model(version):
+    """
+    Load a registry version, check it with a warm-up prediction and make it
+    the active model. Runs on the watcher thread while requests keep being
+    served: each request scores with the model it started with, so none are
+    dropped. Results cached or clustered by the old model are no longer
+    served (see model_generation).
+    """
+    global scorer, prefilter, model_generation
+    if version == model_info['version']:
+        return
+    start = time.perf_counter()
     try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        print("⏳ Downloading required language data...")
-        nltk.download('punkt_tab', quiet=True)
-        nltk.download('punkt', quiet=True)
-
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    print("⏳ Downloading stopwords data...")
-    nltk.download('stopwords', quiet=True)
+        new_scorer, new_prefilter, manifest = load_version(version)
+        labels, probabilities = new_scorer.score([transform_text("warm up")])
+        if len(labels) != 1 or not 0 <= probabilities[0] <= 1:
+            raise RegistryError(f"model version {version} failed its warm-up prediction")
+    except Exception:
+        MODEL_SWAPS.inc('failed')
+        raise
+
+    with _scorer_lock:
+        previous = model_info['version'] or model_info['source']
+        scorer = new_scorer
+        model_generation += 1
+        if new_prefilter is not None:
+            prefilter = new_prefilter
+        set_model_info('registry', manifest)
+    # Old-generation entries can no longer be read; this frees their memory
+    result_cache.clear()
+    campaign_index.clear()
+    shadow.reset(model_generation)
+    MODEL_SWAPS.inc('swapped')
+    print(f"🔄 Swapped model {previous} → {version} in {time.perf_counter() - start:.2f}s")
+
+
+def current_model():
+    """The served scorer and its generation, read together (loads the model on first use)"""
+    if scorer is None:
+        load_scorer()
+    with _scorer_lock:
+        return scorer, model_generation
+
+
+def start_model_watcher():
+    """
+    Poll the registry for a newly activated version in the background.
+    Call after warm_up() in each serving process (threads do not survive a
+    fork, so gunicorn starts one per worker); repeated calls are no-ops.
+    """
+    global _watcher, _watcher_pid
+    if MODEL_RELOAD_INTERVAL <= 0 or _watcher_pid == os.getpid():
+        return
+    _watcher = ModelWatcher(swap_model, REGISTRY_DIR, MODEL_RELOAD_INTERVAL,
+                            version=model_info['version']).start()
+    _watcher_pid = os.getpid()
 
-app = Flask(__name__)
-ps = PorterStemmer()
 
-# Load models at startup
-try:
-    tfidf = pickle.load(open('vectorizer.pkl', 'rb'))
-    model = pickle.load(open('model.pkl', 'rb'))
-    print("✓ Models loaded successfully")
-except FileNotFoundError:
-    print("❌ Error: model.pkl or vectorizer.pkl not found!")
-    raise
+def warm_up():
+    """
+    Load NLTK resources and the model and score one message, so the first
+    request is as fast as any other. Raises if the model or NLTK data is missing.
+    """
+    start = time.perf_counter()
+    load_resources()
+    load_scorer().score([transform_text("warm up")])
+    print(f"✓ Warmed up in {time.perf_counter() - start:.2f}s")
+
+
+def build_result(prediction, confidence, cluster_id=None, explanation=None):
+    """Build the JSON response fields for one prediction"""
+    # Ensure prediction is converted to int/string for JSON serialization
+    prediction_int = int(prediction)
+
+    result = {
+        'prediction': 'spam' if prediction_int == 1 else 'ham',
+        'is_spam': bool(prediction_int == 1),
+        'confidence': round(confidence, 2) if confidence else None,
+        'cluster_id': cluster_id,
+        'message': 'success',
+        'recommendation': (
+            'Do not click any links or respond to this message. '
+            'Consider reporting it to your carrier.'
+        ) if prediction_int == 1 else (
+            'This message is safe to read and respond to.'
+        )
+    }
+    if explanation is not None:
+        result['explanation'] = [{'stem': stem, 'weight': round(weight, 4)} for stem, weight in explanation]
+    return result
+
+
+def explain_options(data, args):
+    """
+    Read explain / top_k from the JSON body or the query string.
+    Returns top_k (0 when no explanation was asked for).
+    Raises ValueError for an invalid top_k.
+    """
+    data = data if isinstance(data, dict) else {}
+    explain = data.get('explain', args.get('explain', False))
+    if isinstance(explain, str):
+        explain = explain.lower() in ('1', 'true', 'yes')
+    if not explain:
+        return 0
+    top_k = data.get('top_k', args.get('top_k', EXPLAIN_TOP_K))
+    try:
+        top_k = int(top_k)
+    except (TypeError, ValueError):
+        raise ValueError('top_k must be an integer') from None
+    if not 1 <= top_k <= MAX_EXPLAIN_TOP_K:
+        raise ValueError(f'top_k must be between 1 and {MAX_EXPLAIN_TOP_K}')
+    return top_k
+
 
+def prefilter_ham(keys, texts, generation):
+    """
+    Run the cascade prefilter over messages, caching and returning
+    {key: (0, confidence, None)} for those it answers as ham. The
+    confidence is each message's calibrated P(ham) from its prefilter score.
+    """
+    scores = prefilter.scores(texts)
+    obvious = scores < prefilter.threshold
+    answered = int(obvious.sum())
+    CASCADE_MESSAGES.inc('ham', amount=answered)
+    CASCADE_MESSAGES.inc('passed', amount=len(keys) - answered)
+    results = {}
+    if not answered:
+        return results
+    confidences = prefilter.ham_confidence(scores[obvious]).tolist()
+    for key, confidence in zip([key for key, ham in zip(keys, obvious.tolist()) if ham], confidences):
+        results[key] = (0, confidence, None)
+        result_cache.put((generation, key), results[key])
+    return results
+
+
+def cascade_stats():
+    """Prefilter settings and how much traffic it answered"""
+    answered, passed = CASCADE_MESSAGES.value('ham'), CASCADE_MESSAGES.value('passed')
+    return {
+        'enabled': prefilter is not None,
+        'threshold': prefilter.threshold if prefilter is not None else None,
+        'max_recall_loss': prefilter.meta.get('max_recall_loss') if prefilter is not None else None,
+        # False for prefilters saved before per-message confidences: every answer reports the same one
+        'calibrated_confidence': prefilter.platt is not None if prefilter is not None else None,
+        'answered': answered,
+        'passed': passed,
+        'short_circuit_rate': round(answered / (answered + passed), 4) if answered + passed else None
+    }
+
+
+def campaign_result(key, signature, prediction, confidence, generation):
+    """
+    Build (prediction, confidence, cluster_id) for a scored message. A
+    confident spam verdict joins or starts a campaign cluster.
+    """
+    cluster_id = None
+    if prediction == 1 and confidence >= CAMPAIGN_MIN_CONFIDENCE:
+        cluster_id = campaign_index.add(signature, key.hex(), (prediction, confidence, generation))
+    return (prediction, confidence, cluster_id)
+
+
+def match_campaign(key, message, generation):
+    """
+    Look a message up in the campaign index.
+    Returns (scored, signature): scored is the cluster's verdict as
+    (prediction, confidence, cluster_id), or None when no cluster matches.
+    The signature can then be passed to campaign_result().
+    """
+    if not campaign_index.enabled:
+        return None, None
+    signature = campaign_index.signature(message)
+    # A cluster started by another model generation is not this model's
+    # verdict; rejecting it inside match() keeps it from counting the message,
+    # which campaign_result() adds again once it is scored
+    match = campaign_index.match(signature, accept=lambda verdict: verdict[2] == generation)
+    if match is None:
+        return None, signature
+    cluster_id, (prediction, confidence, _) = match
+    CAMPAIGN_MATCHES.inc()
+    scored = (prediction, confidence, cluster_id)
+    result_cache.put((generation, key), scored)
+    return scored, signature
+
+
+def shadow_sample(texts, labels, probabilities, seconds, generation):
+    """
+    Offer a scoring call by the given model generation, and its CPU seconds,
+    to the shadow model (never waits; counts drops)
+    """
+    if shadow.enabled and not shadow.submit(texts, labels, probabilities, seconds, generation):
+        SHADOW_DROPPED.inc(amount=len(texts))
+
+
+def predict_many(messages):
+    """
+    Score a list of messages in chunks of BATCH_CHUNK_SIZE.
+    Cached and repeated messages are scored once, obvious ham is answered by
+    the cascade prefilter (CASCADE=1), and messages from a known spam
+    campaign take its verdict. Each chunk of the rest is preprocessed
+    together and goes through a single scorer.score call.
+    Returns a list of (prediction, confidence, cluster_id) tuples in input order.
+    """
+    # One model for the whole batch, even if a new version is swapped in
+    # meanwhile; load_scorer() also loads the prefilter, so it runs first
+    active, generation = current_model()
+    results = [None] * len(messages)
+    pending = {}
+    for i, message in enumerate(messages):
+        key = message_key(message)
+        cached = result_cache.get((generation, key))
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.setdefault(key, []).append(i)
+
+    if pending and prefilter is not None:
+        t0 = time.perf_counter()
+        keys = list(pending)
+        for key, scored in prefilter_ham(keys, [messages[pending[k][0]] for k in keys], generation).items():
+            for i in pending.pop(key):
+                results[i] = scored
+        STAGE_SECONDS.observe(time.perf_counter() - t0, 'batch', 'prefilter')
+
+    signatures = {}
+    if pending and campaign_index.enabled:
+        t0 = time.perf_counter()
+        for key in list(pending):
+            scored, signatures[key] = match_campaign(key, messages[pending[key][0]], generation)
+            if scored is not None:
+                for i in pending.pop(key):
+                    results[i] = scored
+        STAGE_SECONDS.observe(time.perf_counter() - t0, 'batch', 'campaign_lookup')
+
+    keys = list(pending)
+    for start in range(0, len(keys), BATCH_CHUNK_SIZE):
+        chunk = keys[start:start + BATCH_CHUNK_SIZE]
+        t0 = time.perf_counter()
+        texts = [transform_text(messages[pending[k][0]]) for k in chunk]
+        t1, cpu = time.perf_counter(), time.thread_time()
+        predictions, probabilities = active.score(texts)
+        t2 = time.perf_counter()
+        shadow_sample(texts, predictions, probabilities, time.thread_time() - cpu, generation)
+        STAGE_SECONDS.observe(t1 - t0, 'batch', 'preprocess')
+        STAGE_SECONDS.observe(t2 - t1, 'batch', 'score')
+        confidences = probabilities * 100
+        for key, prediction, confidence in zip(chunk, predictions, confidences.tolist()):
+            scored = campaign_result(key, signatures.get(key), int(prediction), confidence, generation)
+            result_cache.put((generation, key), scored)
+            for i in pending[key]:
+                results[i] = scored
+    return results
+
+
+def active_model_version():
+    """Registry version id of the served model, else its artifact version or source"""
+    if model_info['version']:
+        return model_info['version']
+    return f"v{model_info['model_version']}" if model_info['model_version'] else model_info['source']
+
+
+def record_predictions(messages, scored, endpoint, started, block=True):
+    """
+    Count predictions by class, record message lengths, and queue the
+    verdicts for the audit log with the time since started (perf_counter).
+    block=False (the async server's event loop) drops the audit record
+    rather than waiting when the audit queue is full.
+    """
+    for message, (prediction, *_) in zip(messages, scored):
+        PREDICTIONS.inc('spam' if prediction == 1 else 'ham')
+        MESSAGE_LENGTH.observe(len(message))
+    if audit_log.enabled and not audit_log.record(
+            messages, scored, active_model_version(), endpoint, time.perf_counter() - started, block):
+        AUDIT_DROPPED.inc(amount=len(messages))
+
+
+def profiled(view):
+    """Run the view under cProfile when profiling is enabled and requested"""
+    request_counter = itertools.count(1)
+    # One profile at a time; concurrent requests are served unprofiled
+    profile_lock = threading.Lock()
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not PROFILE_DIR:
+            return view(*args, **kwargs)
+        wanted = request.headers.get('X-Profile') == '1' or (
+            PROFILE_EVERY > 0 and next(request_counter) % PROFILE_EVERY == 0)
+        if not wanted or not profile_lock.acquire(blocking=False):
+            return view(*args, **kwargs)
+        try:
+            profiler = cProfile.Profile()
+            response = profiler.runcall(view, *args, **kwargs)
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f'{view.__name__}-{time.time_ns()}.prof')
+            profiler.dump_stats(path)
+        finally:
+            profile_lock.release()
+        print(f"📈 Profile written to {path} (view with: python -m pstats {path})")
+        return response
 
-def transform_text(text):
-    """Preprocess and transform text"""
-    text = text.lower()
-    text = nltk.word_tokenize(text)
+    return wrapper
 
-    y = []
-    for i in text:
-        if i.isalnum():
-            y.append(i)
 
-    text = y[:]
-    y.clear()
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
 
-    for i in text:
-        if i not in stopwords.words('english') and i not in string.punctuation:
-            y.append(i)
 
-    text = y[:]
-    y.clear()
+@app.after_request
+def record_request(response):
+    endpoint = request.endpoint or 'unknown'
+    if 'request_start' in g:
+        REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, endpoint)
+    if response.status_code >= 400:
+        REQUEST_ERRORS.inc(endpoint, str(response.status_code))
+    return response
 
-    for i in text:
-        y.append(ps.stem(i))
 
-    return " ".join(y)
+def explain_many(messages, top_k):
+    """
+    Score messages with per-message explanations, in chunks of BATCH_CHUNK_SIZE.
+    Bypasses the result cache, which stores no explanations, and campaign
+    matching; confident spam still joins or starts a campaign cluster.
+    Returns a list of (prediction, confidence, cluster_id, explanation) tuples.
+    """
+    results = []
+    active, generation = current_model()
+    for start in range(0, len(messages), BATCH_CHUNK_SIZE):
+        chunk = messages[start:start + BATCH_CHUNK_SIZE]
+        t0 = time.perf_counter()
+        texts = [transform_text(message) for message in chunk]
+        t1 = time.perf_counter()
+        predictions, probabilities, explanations = active.explain(texts, top_k)
+        STAGE_SECONDS.observe(t1 - t0, 'batch', 'preprocess')
+        STAGE_SECONDS.observe(time.perf_counter() - t1, 'batch', 'explain')
+        for message, prediction, probability, explanation in zip(
+                chunk, predictions.tolist(), probabilities.tolist(), explanations):
+            key = message_key(message)
+            signature = campaign_index.signature(message) if prediction == 1 and campaign_index.enabled else None
+            scored = campaign_result(key, signature, int(prediction), probability * 100, generation)
+            result_cache.put((generation, key), scored)
+            results.append(scored + (explanation,))
+    return results
 
 
 @app.route('/')
@@ -74,11 +549,14 @@ def home():
 
 
 @app.route('/api/predict', methods=['POST'])
+@profiled
 def predict():
     """
     API endpoint for spam prediction
-    Expects JSON: {"message": "your message here"}
-    Returns: {"prediction": "spam/ham", "confidence": 0.95, "message": "success"}
+    Expects JSON: {"message": "your message here"}, optionally with
+    "explain": true and "top_k": 5 (or ?explain=true&top_k=5)
+    Returns: {"prediction": "spam/ham", "confidence": 0.95, "cluster_id": null, "message": "success"}
+    cluster_id is set when the message belongs to a spam campaign cluster.
     """
     try:
         data = request.get_json()
@@ -91,59 +569,166 @@ def predict():
                 'confidence': None
             }), 400
 
-        # Preprocess
-        transformed_message = transform_text(message)
+        try:
+            top_k = explain_options(data, request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e), 'prediction': None, 'confidence': None}), 400
+        if top_k:
+            scored = explain_many([message], top_k)[0]
+            response = jsonify(build_result(*scored))
+            record_predictions([message], [scored], 'predict', g.request_start)
+            return response, 200
+
+        # The model this request scores with, and the generation its cache entries carry
+        active, generation = current_model()
+        t0 = time.perf_counter()
+        key = message_key(message)
+        scored = result_cache.get((generation, key))
+        t1 = time.perf_counter()
+        STAGE_SECONDS.observe(t1 - t0, 'single', 'cache_lookup')
+
+        if scored is None and prefilter is not None:
+            # Cascade first stage: obvious ham from the raw text
+            scored = prefilter_ham([key], [message], generation).get(key)
+            t2 = time.perf_counter()
+            STAGE_SECONDS.observe(t2 - t1, 'single', 'prefilter')
+            t1 = t2
+
+        if scored is None:
+            # Near-duplicate of a known spam campaign
+            scored, signature = match_campaign(key, message, generation)
+            t2 = time.perf_counter()
+            if campaign_index.enabled:
+                STAGE_SECONDS.observe(t2 - t1, 'single', 'campaign_lookup')
+            t1 = t2
+
+        if scored is None:
+            # Preprocess
+            transformed_message = transform_text(message)
+            t2 = time.perf_counter()
+
+            # Vectorize + predict: label and confidence in one pass
+            cpu = time.thread_time()
+            labels, probabilities = active.score([transformed_message])
+            shadow_sample([transformed_message], labels, probabilities, time.thread_time() - cpu, generation)
+
+            scored = campaign_result(key, signature, int(labels[0]), float(probabilities[0] * 100), generation)
+            result_cache.put((generation, key), scored)
+            t3 = time.perf_counter()
+            STAGE_SECONDS.observe(t2 - t1, 'single', 'preprocess')
+            STAGE_SECONDS.observe(t3 - t2, 'single', 'score')
+            t1 = t3
+
+        result = build_result(*scored)
+        response = jsonify(result)
+        STAGE_SECONDS.observe(time.perf_counter() - t1, 'single', 'serialize')
+        record_predictions([message], [scored], 'predict', g.request_start)
+
+        return response, 200
 
-        # Vectorize
-        vector_input = tfidf.transform([transformed_message])
+    except Exception as e:
+        return jsonify({
+            'error': str(e),
+            'prediction': None,
+            'confidence': None
+        }), 500
 
-        # Predict
-        prediction = model.predict(vector_input)[0]
 
-        # Get confidence
+@app.route('/api/predict/batch', methods=['POST'])
+@profiled
+def predict_batch():
+    """
+    API endpoint for batch spam prediction
+    Expects JSON: {"messages": ["first message", "second message", ...]}, optionally
+    with "explain": true and "top_k" as for /api/predict
+    Returns: {"results": [<same fields as /api/predict>, ...], "count": 2, "message": "success"}
+    """
+    try:
+        data = request.get_json()
+        messages = data.get('messages') if data else None
+
+        if not isinstance(messages, list) or not messages:
+            return jsonify({
+                'error': 'No messages provided',
+                'results': None
+            }), 400
+
+        if len(messages) > MAX_BATCH_SIZE:
+            return jsonify({
+                'error': f'Too many messages (max {MAX_BATCH_SIZE} per batch)',
+                'results': None
+            }), 413
+
         try:
-            confidence_array = model.predict_proba(vector_input)[0]
-            confidence = float(max(confidence_array) * 100)
-        except:
-            confidence = None
-
-        # Ensure prediction is converted to int/string for JSON serialization
-        prediction_int = int(prediction)
-        
-        # Return result
-        result = {
-            'prediction': 'spam' if prediction_int == 1 else 'ham',
-            'is_spam': bool(prediction_int == 1),
-            'confidence': round(confidence, 2) if confidence else None,
-            'message': 'success',
-            'recommendation': (
-                'Do not click any links or respond to this message. '
-                'Consider reporting it to your carrier.'
-            ) if prediction_int == 1 else (
-                'This message is safe to read and respond to.'
-            )
-        }
-
-        return jsonify(result), 200
+            top_k = explain_options(data, request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e), 'results': None}), 400
+
+        messages = [m.strip() if isinstance(m, str) else '' for m in messages]
+        valid = [i for i, m in enumerate(messages) if m]
+        if top_k:
+            scored = explain_many([messages[i] for i in valid], top_k)
+        else:
+            scored = predict_many([messages[i] for i in valid])
+        record_predictions([messages[i] for i in valid], scored, 'predict_batch', g.request_start)
+
+        results = [{
+            'error': 'No message provided',
+            'prediction': None,
+            'confidence': None
+        } for _ in messages]
+        for i, result in zip(valid, scored):
+            results[i] = build_result(*result)
+
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'message': 'success'
+        }), 200
 
     except Exception as e:
         return jsonify({
             'error': str(e),
-            'prediction': None,
-            'confidence': None
+            'results': None
         }), 500
 
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint, with the model version being served"""
     return jsonify({
         'status': 'healthy',
         'service': 'SMS Spam Detector',
-        'version': '1.0'
+        'version': '1.0',
+        'model': model_info
     }), 200
 
 
+@app.route('/api/stats', methods=['GET'])
+def stats():
+    """
+    Cache, campaign index, cascade and audit counters, for sizing
+    STEM_CACHE_SIZE, RESULT_CACHE_SIZE and CAMPAIGN_INDEX_SIZE, and the
+    shadow model comparison
+    """
+    return jsonify({
+        'cache': {
+            'stems': stem_cache_stats(),
+            'results': result_cache.stats()
+        },
+        'campaigns': campaign_index.stats(),
+        'cascade': cascade_stats(),
+        'audit': audit_log.stats(),
+        'shadow': {**shadow.stats(), 'primary': active_model_version()}
+    }), 200
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics: stage latency histograms, predictions, errors, message lengths"""
+    return metrics_registry.render(), 200, {'Content-Type': metrics_registry.content_type}
+
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
@@ -166,6 +751,12 @@ if __name__ == '__main__':
     ║   Starting server...                     ║
     ╚══════════════════════════════════════════╝
     """)
+    # The reloader re-runs this file in a child process that serves the
+    # requests; only that one loads the model and starts background work
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        warm_up()
+        start_model_watcher()
+        shadow.start()
 
     # Run the Flask app
     app.run(
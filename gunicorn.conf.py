@@ -0,0 +1,56 @@
+"""
+Production Gunicorn Configuration for SMS Spam Detector
+Serves flask_app:app with several worker processes that share one copy of
+the model.
+
+Usage: gunicorn -c gunicorn.conf.py
+Run `python nltk_setup.py` at build time first: workers do not download
+NLTK data, and missing data fails the deploy.
+
+With preload_app the master imports flask_app and runs its warm-up (NLTK,
+model, one prediction) once, before forking. Workers then share those
+memory pages copy-on-write instead of each loading their own copy.
+Without it, every worker warms up before taking requests. The
+memory-mapped artifact arrays are shared through the page cache either way.
+
+Each worker also starts a model watcher after it is ready, so a version
+activated in the model registry (python train_model.py) is swapped in
+without restarting the workers.
+"""
+
+import gc
+import multiprocessing
+import os
+
+wsgi_app = 'flask_app:app'
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# More than one thread switches gunicorn to the gthread worker
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+preload_app = os.environ.get('PRELOAD_APP', '1') != '0'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = 5
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')
+errorlog = '-'
+
+
+def when_ready(server):
+    if preload_app:
+        from flask_app import warm_up
+        warm_up()
+        # Move everything loaded so far (model, vocabulary, stopwords) into the
+        # permanent GC generation. Collections in the workers then never touch
+        # those objects' headers, so their pages stay shared after fork.
+        gc.freeze()
+    server.log.info(f"Serving {wsgi_app} with {workers} worker(s), preload_app={preload_app}")
+
+
+def post_worker_init(worker):
+    from flask_app import shadow, start_model_watcher, warm_up
+    if not preload_app:
+        warm_up()
+    # Started here rather than in the master: threads do not survive fork
+    start_model_watcher()
+    shadow.start()
@@ -0,0 +1,148 @@
+"""
+Request Metrics for SMS Spam Detector
+Minimal thread-safe counters, gauges and histograms, rendered in the
+Prometheus text exposition format for a /metrics endpoint.
+
+Values are per process: under gunicorn each worker keeps its own, so
+scrape workers individually or sum them downstream.
+"""
+
+import bisect
+import threading
+
+# Seconds; per-stage timings are tens of microseconds, whole requests milliseconds
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# Characters; a single SMS is up to 160
+LENGTH_BUCKETS = (10, 20, 40, 80, 160, 320, 640, 1280, 2560)
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, v in pairs)
+    return '{' + ','.join(f'{n}="{v}"' for (n, _), v in zip(pairs, escaped)) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class: a named metric with optional labels, one series per label tuple"""
+    kind = 'untyped'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            series = sorted(self._series.items(), key=lambda item: tuple(map(str, item[0])))
+            lines.extend(self._render_series(labels, value) for labels, value in series)
+        return '\n'.join(lines)
+
+    def _render_series(self, labels, value):
+        return f'{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}'
+
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def value(self, *labels):
+        with self._lock:
+            return self._series.get(labels, 0)
+
+
+class Gauge(Metric):
+    """Value that is set, e.g. model load time"""
+    kind = 'gauge'
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._series[labels] = value
+
+
+class Histogram(Metric):
+    """
+    Bucketed distribution of observed values with their sum and count.
+    observe() is one bisect and a few additions under a lock, cheap enough
+    for per-stage timings on the request path.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [per-bucket counts (last is +Inf), sum]
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self, *labels):
+        """Cumulative bucket counts, sum and count for one label tuple"""
+        with self._lock:
+            counts, total = self._series.get(labels, [[0] * (len(self.buckets) + 1), 0.0])
+            counts = list(counts)
+        cumulative, running = [], 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return {'buckets': dict(zip(self.buckets + (float('inf'),), cumulative)),
+                'sum': total, 'count': running}
+
+    def _render_series(self, labels, value):
+        counts, total = value
+        lines, running = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            running += count
+            label_text = format_labels(self.labelnames, labels, [('le', format_value(float(bound)))])
+            lines.append(f'{self.name}_bucket{label_text} {running}')
+        label_text = format_labels(self.labelnames, labels)
+        lines.append(f'{self.name}_sum{label_text} {format_value(total)}')
+        lines.append(f'{self.name}_count{label_text} {running}')
+        return '\n'.join(lines)
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together"""
+
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        return '\n'.join(metric.render() for metric in self.metrics) + '\n'
@@ -0,0 +1,271 @@
+"""
+Versioned Model Registry for SMS Spam Detector
+A directory of immutable model versions written by train_model.py, plus a
+CURRENT pointer naming the version the servers should serve.
+
+  models/
+    CURRENT                     active version id (one line)
+    v3-20261016T120000-1f0c9a/
+      manifest.json             version id, created, metrics, checksum, files
+      vocabulary.npy, ...       the fast-start artifact (see artifact.py)
+      vectorizer.pkl, model.pkl the fitted estimators, which --update continues from
+      prefilter.npz             cascade prefilter, when one was fitted
+
+A version is written to a staging directory and renamed into place, and
+CURRENT is replaced with os.replace, so readers never see a partial
+version or pointer. The checksum is the sha256 over the version's files.
+It is verified before a version is loaded.
+
+flask_app.py and async_server.py poll CURRENT with a ModelWatcher and hot
+swap a new version in the background (see flask_app.swap_model).
+classify.py, prefilter.py and app.py load the active version too, and use
+model_artifact/ and the pickles only while nothing has been activated.
+
+Usage: python model_registry.py                   (list versions)
+       python model_registry.py activate VERSION  (switch or roll back)
+       python model_registry.py verify VERSION
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+import threading
+import time
+import uuid
+
+REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR', 'models')
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+PREFILTER_FILE = 'prefilter.npz'
+VECTORIZER_FILE, MODEL_FILE = 'vectorizer.pkl', 'model.pkl'
+
+
+class RegistryError(Exception):
+    """A version is missing, incomplete or fails its checksum"""
+
+
+def version_checksum(path):
+    """sha256 over the names and contents of a version's files (manifest excluded)"""
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(path)):
+        if name == MANIFEST_FILE:
+            continue
+        digest.update(name.encode() + b'\0')
+        with open(os.path.join(path, name), 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def version_dir(version, registry=REGISTRY_DIR):
+    return os.path.join(registry, version)
+
+
+def read_manifest(version, registry=REGISTRY_DIR):
+    """Return a version's manifest.json as a dict"""
+    try:
+        with open(os.path.join(version_dir(version, registry), MANIFEST_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise RegistryError(f"unknown model version {version!r}") from None
+
+
+def list_versions(registry=REGISTRY_DIR):
+    """Manifests of all published versions, oldest first"""
+    if not os.path.isdir(registry):
+        return []
+    manifests = []
+    for name in os.listdir(registry):
+        if os.path.exists(os.path.join(registry, name, MANIFEST_FILE)):
+            manifests.append(read_manifest(name, registry))
+    return sorted(manifests, key=lambda manifest: manifest['created'])
+
+
+def current_version(registry=REGISTRY_DIR):
+    """The active version id, or None if nothing has been published"""
+    try:
+        with open(os.path.join(registry, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def activate(version, registry=REGISTRY_DIR):
+    """Point CURRENT at a published version (atomic)"""
+    read_manifest(version, registry)
+    staging = os.path.join(registry, f'.{CURRENT_FILE}.{os.getpid()}')
+    with open(staging, 'w') as f:
+        f.write(version + '\n')
+    os.replace(staging, os.path.join(registry, CURRENT_FILE))
+
+
+def verify(version, registry=REGISTRY_DIR):
+    """Return the manifest if the version's files match its checksum, else raise RegistryError"""
+    manifest = read_manifest(version, registry)
+    if version_checksum(version_dir(version, registry)) != manifest['checksum']:
+        raise RegistryError(f"model version {version} does not match its checksum")
+    return manifest
+
+
+def publish(vectorizer, model, metrics, model_version, registry=REGISTRY_DIR, prefilter_path=None,
+            make_active=True, quantize=None):
+    """
+    Write a fitted vectorizer + MultinomialNB pair as a new version, with
+    its evaluation metrics and (optionally) a copy of the cascade prefilter.
+    quantize ('float16' or 'int8') stores the quantized artifact.
+    The version is activated unless make_active is False.
+    Returns the new version's manifest.
+    """
+    from artifact import export_artifact
+
+    # The random suffix keeps ids unique when versions are published within the same second
+    version = f"v{model_version}-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    staging = os.path.join(registry, f'.staging-{version}')
+    os.makedirs(registry, exist_ok=True)
+    try:
+        # source_files=() : the version is self-contained, not tied to the pickles
+        export_artifact(vectorizer, model, path=staging, source_files=(), model_version=model_version,
+                        quantize=quantize)
+        if prefilter_path and os.path.exists(prefilter_path):
+            shutil.copyfile(prefilter_path, os.path.join(staging, PREFILTER_FILE))
+        # The artifact only holds log probabilities; partial_fit needs the counts
+        with open(os.path.join(staging, VECTORIZER_FILE), 'wb') as f:
+            pickle.dump(vectorizer, f)
+        with open(os.path.join(staging, MODEL_FILE), 'wb') as f:
+            pickle.dump(model, f)
+
+        manifest = {
+            'version': version,
+            'model_version': model_version,
+            'quantize': quantize,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'metrics': metrics,
+            'checksum': version_checksum(staging),
+            'files': sorted(os.listdir(staging)),
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.rename(staging, version_dir(version, registry))
+    except BaseException:
+        # Never leave a half-written version behind
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    if make_active:
+        activate(version, registry)
+    return manifest
+
+
+def load_active_models(fallback=None, registry=REGISTRY_DIR):
+    """
+    (vectorizer, model) of the active version, checksum verified, or from
+    the artifact / pickles at fallback (default model_artifact/) while
+    nothing has been activated
+    """
+    from artifact import ARTIFACT_DIR, load_artifact, load_models
+
+    version = current_version(registry)
+    if version is None:
+        return load_models(fallback or ARTIFACT_DIR)
+    verify(version, registry)
+    return load_artifact(version_dir(version, registry))
+
+
+def load_fitted_models(version, registry=REGISTRY_DIR):
+    """(vectorizer, model) as fitted for a version, checksum verified, for incremental updates"""
+    path = version_dir(version, registry)
+    verify(version, registry)
+    if not os.path.exists(os.path.join(path, MODEL_FILE)):
+        raise RegistryError(f"model version {version} has no fitted model to update "
+                            f"(published before versions stored one); retrain with python train_model.py")
+    with open(os.path.join(path, VECTORIZER_FILE), 'rb') as f:
+        vectorizer = pickle.load(f)
+    with open(os.path.join(path, MODEL_FILE), 'rb') as f:
+        model = pickle.load(f)
+    return vectorizer, model
+
+
+class ModelWatcher:
+    """
+    Daemon thread that polls the registry's CURRENT pointer every interval
+    seconds and calls on_change(version) when it names a version other than
+    the one last seen. on_change runs on the watcher thread; a version it
+    raises for is not retried until CURRENT changes again.
+    """
+
+    def __init__(self, on_change, registry=REGISTRY_DIR, interval=5.0, version=None):
+        self.on_change = on_change
+        self.registry = registry
+        self.interval = interval
+        self.seen = version
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def check(self):
+        """Poll once; returns True if on_change was called"""
+        version = current_version(self.registry)
+        if version is None or version == self.seen:
+            return False
+        self.seen = version
+        try:
+            self.on_change(version)
+        except Exception as e:
+            print(f"❌ Model version {version} not loaded: {e}")
+        return True
+
+    def _run(self):
+        # First poll right away: a gunicorn worker forked from a long-lived
+        # master may have inherited an outdated model
+        while True:
+            self.check()
+            if self._stop.wait(self.interval):
+                return
+
+
+def main(argv):
+    if argv[:1] == ['activate'] and len(argv) == 2:
+        try:
+            activate(argv[1])
+        except RegistryError as e:
+            print(f"❌ {e}")
+            return 1
+        print(f"✅ {argv[1]} is now the active model version")
+        return 0
+    if argv[:1] == ['verify'] and len(argv) == 2:
+        try:
+            verify(argv[1])
+        except RegistryError as e:
+            print(f"❌ {e}")
+            return 1
+        print(f"✅ {argv[1]} matches its checksum")
+        return 0
+    if argv:
+        print(__doc__.strip().split('\n\n')[-1])
+        return 2
+
+    active = current_version()
+    versions = list_versions()
+    if not versions:
+        print(f"No model versions in {REGISTRY_DIR}/ (run python train_model.py)")
+        return 0
+    print(f"  {'':1} {'version':<25} {'created':<19} {'accuracy':>8} {'precision':>9} {'recall':>7} {'f1':>7}")
+    for manifest in versions:
+        metrics = manifest.get('metrics', {})
+        cells = [f"{metrics[name]:.4f}" if name in metrics else '-' for name in
+                 ('accuracy', 'precision', 'recall', 'f1')]
+        print(f"  {'*' if manifest['version'] == active else '':1} {manifest['version']:<25} "
+              f"{manifest['created']:<19} {cells[0]:>8} {cells[1]:>9} {cells[2]:>7} {cells[3]:>7}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
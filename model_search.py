@@ -0,0 +1,194 @@
+"""
+Model Search for SMS Spam Detector
+Stratified k-fold comparison of vectorizer settings and linear models on the
+preprocessed training corpus, run with `python train_model.py --search`.
+
+Work is split into one task per (vectorizer, fold). A task fits the
+vectorizer on the fold's training part once and reuses that matrix for every
+model, so each vectorization is computed once per fold. Tasks run in parallel
+with joblib. Per-message inference latency is measured afterwards in this
+process, one candidate at a time, on the fold-0 fits, so parallel tasks do
+not distort it.
+"""
+
+import time
+
+import numpy as np
+
+# Default grid (override with train_model.py --max-features / --ngram / --alphas)
+MAX_FEATURES = (1000, 3000, 5000, None)
+NGRAM_RANGES = ((1, 1), (1, 2))
+NB_ALPHAS = (0.1, 0.3, 1.0)
+HASH_FEATURES = 2 ** 14
+
+
+def vectorizer_grid(max_features=MAX_FEATURES, ngram_ranges=NGRAM_RANGES):
+    """(name, spec) pairs: TF-IDF over the max_features x ngram_ranges grid plus hashing + idf"""
+    grid = []
+    for ngram_range in ngram_ranges:
+        for features in max_features:
+            name = f"tfidf-{features or 'all'}-{ngram_range[0]}{ngram_range[1]}g"
+            grid.append((name, {'kind': 'tfidf', 'max_features': features, 'ngram_range': tuple(ngram_range)}))
+    grid.append((f'hashing-{HASH_FEATURES}', {'kind': 'hashing', 'n_features': HASH_FEATURES}))
+    return grid
+
+
+def model_grid(alphas=NB_ALPHAS):
+    """(name, class, params) triples; classes rather than instances so tasks pickle cheaply"""
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+    from sklearn.naive_bayes import ComplementNB, MultinomialNB
+
+    grid = [(f'MultinomialNB(alpha={a})', MultinomialNB, {'alpha': a}) for a in alphas]
+    grid += [(f'ComplementNB(alpha={a})', ComplementNB, {'alpha': a}) for a in alphas]
+    grid += [
+        ('LogisticRegression(C=10)', LogisticRegression, {'C': 10, 'solver': 'liblinear'}),
+        ('SGDClassifier(log_loss)', SGDClassifier, {'loss': 'log_loss', 'alpha': 1e-5, 'random_state': 42}),
+        ('SGDClassifier(hinge)', SGDClassifier, {'loss': 'hinge', 'alpha': 1e-4, 'random_state': 42}),
+    ]
+    return grid
+
+
+def make_vectorizer(spec):
+    """Unfitted vectorizer for a vectorizer_grid() spec (same pipelines as train_model.py)"""
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+    from sklearn.pipeline import make_pipeline
+
+    if spec['kind'] == 'hashing':
+        return make_pipeline(
+            HashingVectorizer(n_features=spec['n_features'], alternate_sign=False, norm=None),
+            TfidfTransformer()
+        )
+    return TfidfVectorizer(max_features=spec['max_features'], ngram_range=spec['ngram_range'])
+
+
+def run_fold(texts, labels, train_index, test_index, vectorizer_name, spec, models, fold, keep_fitted):
+    """
+    Fit one vectorizer on a fold and evaluate every model on it.
+    Returns (rows, fitted): one metrics dict per model, and the fitted
+    (vectorizer, {model name: model}) when keep_fitted, else None.
+    """
+    from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+
+    train_texts, test_texts = texts[train_index], texts[test_index]
+    y_train, y_test = labels[train_index], labels[test_index]
+
+    start = time.perf_counter()
+    vectorizer = make_vectorizer(spec)
+    X_train = vectorizer.fit_transform(train_texts)
+    X_test = vectorizer.transform(test_texts)
+    vectorize_seconds = time.perf_counter() - start
+
+    rows, fitted_models = [], {}
+    for name, cls, params in models:
+        start = time.perf_counter()
+        model = cls(**params).fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - start
+        y_pred = model.predict(X_test)
+        rows.append({
+            'vectorizer': vectorizer_name,
+            'model': name,
+            'fold': fold,
+            'f1': f1_score(y_test, y_pred, zero_division=0),
+            'precision': precision_score(y_test, y_pred, zero_division=0),
+            'recall': recall_score(y_test, y_pred, zero_division=0),
+            'accuracy': accuracy_score(y_test, y_pred),
+            # The vectorizer fit is shared by all models on the fold but
+            # counted in full for each, as retraining one model would pay it
+            'train_seconds': vectorize_seconds + fit_seconds,
+        })
+        if keep_fitted:
+            fitted_models[name] = model
+    return rows, ((vectorizer, fitted_models) if keep_fitted else None)
+
+
+def measure_latency(vectorizer, model, texts, singles=100, repeats=3):
+    """
+    Inference latency in microseconds per message for vectorizer.transform +
+    model.predict: (one message per call, whole list in one call), best of repeats.
+    """
+    sample = [[text] for text in texts[:singles]]
+
+    def run_singles():
+        for text in sample:
+            model.predict(vectorizer.transform(text))
+
+    def run_batch():
+        model.predict(vectorizer.transform(texts))
+
+    single, batch = float('inf'), float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run_singles()
+        single = min(single, time.perf_counter() - start)
+        start = time.perf_counter()
+        run_batch()
+        batch = min(batch, time.perf_counter() - start)
+    return single / len(sample) * 1e6, batch / len(texts) * 1e6
+
+
+def search(texts, labels, folds=5, jobs=0, max_features=MAX_FEATURES, ngram_ranges=NGRAM_RANGES,
+           alphas=NB_ALPHAS, seed=42, verbose=True):
+    """
+    Cross-validate every vectorizer x model pair.
+    Returns the leaderboard: one dict per pair with mean (and F1 std) metrics
+    across folds, mean training seconds and latency, sorted by F1.
+    """
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import StratifiedKFold
+
+    texts = np.asarray(texts, dtype=object)
+    labels = np.asarray(labels)
+    vectorizers = vectorizer_grid(max_features, ngram_ranges)
+    models = model_grid(alphas)
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed).split(texts, labels))
+
+    tasks = [(name, spec, fold, train_index, test_index)
+             for name, spec in vectorizers
+             for fold, (train_index, test_index) in enumerate(splits)]
+    if verbose:
+        print(f"🔬 {len(vectorizers)} vectorizers x {len(models)} models x {folds} folds "
+              f"({len(tasks)} vectorizer fits, {len(tasks) * len(models)} model fits, "
+              f"{jobs or 'all'} job(s))...")
+    start = time.perf_counter()
+    outputs = Parallel(n_jobs=jobs or -1)(
+        delayed(run_fold)(texts, labels, train_index, test_index, name, spec, models, fold, fold == 0)
+        for name, spec, fold, train_index, test_index in tasks
+    )
+    if verbose:
+        print(f"✅ Cross-validation done in {time.perf_counter() - start:.1f}s\n")
+
+    rows = [row for fold_rows, _ in outputs for row in fold_rows]
+    fitted = {name: output[1] for (name, _, fold, _, _), output in zip(tasks, outputs) if fold == 0}
+    holdout = texts[splits[0][1]]
+
+    leaderboard = []
+    for vectorizer_name, _ in vectorizers:
+        vectorizer, fitted_models = fitted[vectorizer_name]
+        for model_name, _, _ in models:
+            pair = [r for r in rows if r['vectorizer'] == vectorizer_name and r['model'] == model_name]
+            single, batch = measure_latency(vectorizer, fitted_models[model_name], holdout)
+            f1 = [r['f1'] for r in pair]
+            leaderboard.append({
+                'vectorizer': vectorizer_name,
+                'model': model_name,
+                'f1': float(np.mean(f1)),
+                'f1_std': float(np.std(f1)),
+                'precision': float(np.mean([r['precision'] for r in pair])),
+                'recall': float(np.mean([r['recall'] for r in pair])),
+                'accuracy': float(np.mean([r['accuracy'] for r in pair])),
+                'train_seconds': float(np.mean([r['train_seconds'] for r in pair])),
+                'latency_single_us': single,
+                'latency_batch_us': batch,
+            })
+    leaderboard.sort(key=lambda entry: -entry['f1'])
+    return leaderboard
+
+
+def print_leaderboard(leaderboard, top=None):
+    """Print the leaderboard as a table, best F1 first"""
+    print(f"  {'#':>3}  {'vectorizer':<20} {'model':<26} {'F1':>13} {'precision':>9} {'recall':>7} "
+          f"{'train s':>8} {'µs/msg':>8} {'µs/msg@batch':>12}")
+    for rank, entry in enumerate(leaderboard[:top], 1):
+        print(f"  {rank:>3}  {entry['vectorizer']:<20} {entry['model']:<26} "
+              f"{entry['f1']:.4f}±{entry['f1_std']:.3f} {entry['precision']:>9.4f} {entry['recall']:>7.4f} "
+              f"{entry['train_seconds']:>8.3f} {entry['latency_single_us']:>8.0f} {entry['latency_batch_us']:>12.1f}")
@@ -0,0 +1,69 @@
+"""
+NLTK Data Setup for SMS Spam Detector
+Checks for (and optionally downloads) the NLTK data preprocessing.py needs:
+the Punkt tables, for abbreviation handling in the tokenizer, and the
+English stopword list.
+
+Run once at build/deploy time so servers never download at startup:
+  python nltk_setup.py
+
+Servers never download. preprocessing.load_resources() calls
+ensure_nltk_data(download=False) during warm-up, so a server that is
+missing data fails fast with a clear error instead of fetching it while
+it should be serving. CLI tools such as classify.py call
+ensure_nltk_data(), which downloads unless NLTK_DOWNLOAD=0.
+"""
+
+import os
+import sys
+
+# (nltk.data path, downloader package)
+NLTK_RESOURCES = (
+    ('tokenizers/punkt_tab', 'punkt_tab'),
+    ('corpora/stopwords', 'stopwords'),
+)
+
+
+def missing_nltk_data():
+    """Downloader package names of the resources that are not installed"""
+    import nltk
+    missing = []
+    for path, package in NLTK_RESOURCES:
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            missing.append(package)
+    return missing
+
+
+def ensure_nltk_data(download=None):
+    """
+    Make sure the NLTK data is present.
+    download defaults to the NLTK_DOWNLOAD environment variable (on unless '0').
+    Raises RuntimeError if data is missing and downloading is off or fails.
+    """
+    if download is None:
+        download = os.environ.get('NLTK_DOWNLOAD', '1') != '0'
+
+    missing = missing_nltk_data()
+    if missing and download:
+        import nltk
+        print(f"⏳ Downloading required language data: {', '.join(missing)}...")
+        for package in missing:
+            nltk.download(package, quiet=True)
+        missing = missing_nltk_data()
+
+    if missing:
+        raise RuntimeError(
+            f"NLTK data not installed: {', '.join(missing)}. "
+            f"Run `python nltk_setup.py` at build time."
+        )
+
+
+if __name__ == '__main__':
+    try:
+        ensure_nltk_data(download=True)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print("✅ NLTK data ready")
@@ -0,0 +1,255 @@
+"""
+Cascade Prefilter for SMS Spam Detector
+First stage of the two-stage cascade (CASCADE=1 in flask_app.py): a hashed
+Naive Bayes over the raw message text that answers obvious ham without NLTK
+tokenization, stemming or TF-IDF. Everything else falls through to the full
+pipeline, as does all spam.
+
+Features are the lowercased words (digits become '0', so a phone number
+keeps its shape) plus each symbol character in the message. They are hashed
+with crc32 into n_buckets. A message's score is the prior spam log-odds
+plus the per-bucket log-odds of its distinct buckets. Messages scoring
+below the threshold are short-circuited as ham.
+
+The scores rank messages well, but as probabilities they are overconfident,
+because correlated words count as independent evidence. The threshold is
+therefore calibrated on out-of-fold scores. It is set so that at most
+max_recall_loss of the training spam falls below it. The confidence
+reported for a short-circuited message is its own P(ham), from a logistic
+(Platt) fit of the labels on the same out-of-fold scores. Prefilters saved
+without that fit report the share of ham among the out-of-fold messages
+below the threshold for every message.
+
+Usage: python prefilter.py [--max-recall-loss 0.01]
+       (fits prefilter.npz on the train_model.py training split and reports
+       the cascade against the existing model on the test split)
+"""
+
+import argparse
+import functools
+import json
+import re
+import time
+import zlib
+
+import numpy as np
+
+PREFILTER_PATH = 'prefilter.npz'
+N_BUCKETS = 2 ** 17
+
+_DIGIT = re.compile(r"\d")
+_WORD = re.compile(r"[^\W_]+")
+_SYMBOL = re.compile(r"[^\w\s]")
+
+
+def features(message):
+    """Distinct words and symbol characters of a raw message"""
+    lowered = message.lower()
+    found = set(_WORD.findall(_DIGIT.sub('0', lowered)))
+    # Symbols are never word characters, so they cannot collide with words
+    found.update(_SYMBOL.findall(lowered))
+    return found
+
+
+class HamPrefilter:
+    """Hashed Naive Bayes log-odds scorer with a calibrated ham threshold"""
+
+    def __init__(self, log_odds, bias, threshold=-np.inf, confidence=None, meta=None, platt=None):
+        self.log_odds = np.asarray(log_odds, dtype=np.float32)
+        self.bias = float(bias)
+        self.threshold = float(threshold)
+        self.confidence = confidence
+        # (slope, intercept): P(spam) = sigmoid(slope * score + intercept)
+        self.platt = platt
+        self.meta = meta or {}
+        mask = len(self.log_odds) - 1
+        if len(self.log_odds) & mask:
+            raise ValueError("the number of buckets must be a power of two")
+        # Tokens repeat heavily across messages; memoize their buckets like the stem memo
+        self._bucket = functools.lru_cache(maxsize=100000)(lambda token: zlib.crc32(token.encode()) & mask)
+
+    def buckets(self, message):
+        """Distinct bucket ids of a message"""
+        return set(map(self._bucket, features(message)))
+
+    def scores(self, messages):
+        """Spam log-odds per message (higher is more spam-like)"""
+        if len(messages) == 1:
+            # Serving's common case: skip the batch bookkeeping below
+            return np.array([self.log_odds[list(self.buckets(messages[0]))].sum(dtype=np.float64) + self.bias])
+        bucket_sets = [self.buckets(message) for message in messages]
+        sizes = np.fromiter(map(len, bucket_sets), dtype=np.int64, count=len(bucket_sets))
+        flat = np.fromiter((b for buckets in bucket_sets for b in buckets), dtype=np.int64,
+                           count=int(sizes.sum()))
+        # Per-message sums without a Python loop; empty messages score the prior
+        owners = np.repeat(np.arange(len(bucket_sets)), sizes)
+        return np.bincount(owners, weights=self.log_odds[flat], minlength=len(bucket_sets)) + self.bias
+
+    def short_circuit(self, messages):
+        """Boolean mask of messages the prefilter answers as ham"""
+        return self.scores(messages) < self.threshold
+
+    def ham_confidence(self, scores):
+        """Calibrated P(ham) in percent for each score (the constant confidence without a Platt fit)"""
+        scores = np.asarray(scores, dtype=np.float64)
+        if self.platt is None:
+            return np.full(len(scores), np.nan if self.confidence is None else self.confidence)
+        slope, intercept = self.platt
+        return 100 / (1 + np.exp(slope * scores + intercept))
+
+    @classmethod
+    def fit(cls, messages, labels, n_buckets=N_BUCKETS, alpha=0.5):
+        """Fit bucket log-odds from raw messages and 0/1 labels (threshold left at -inf)"""
+        labels = np.asarray(labels)
+        model = cls(np.zeros(n_buckets), 0.0)
+        counts = np.zeros((2, n_buckets))
+        for message, label in zip(messages, labels):
+            counts[int(label), list(model.buckets(message))] += 1
+        n_ham, n_spam = int((labels == 0).sum()), int((labels == 1).sum())
+        # Smoothed per-class rate of each bucket being present in a message
+        spam_rate = (counts[1] + alpha) / (n_spam + 2 * alpha)
+        ham_rate = (counts[0] + alpha) / (n_ham + 2 * alpha)
+        model.log_odds = np.log(spam_rate / ham_rate).astype(np.float32)
+        model.bias = float(np.log(n_spam / n_ham))
+        return model
+
+    def calibrate(self, scores, labels, max_recall_loss):
+        """
+        Set the threshold from held-out scores so that at most max_recall_loss
+        of the spam in them scores below it. Returns the share of held-out
+        messages that would be short-circuited.
+        """
+        scores, labels = np.asarray(scores), np.asarray(labels)
+        spam = np.sort(scores[labels == 1])
+        lost = int(np.floor(max_recall_loss * len(spam)))
+        self.threshold = float(spam[lost]) if len(spam) else float('inf')
+        below = scores < self.threshold
+        self.confidence = float((labels[below] == 0).mean() * 100) if below.any() else None
+        if len(spam) and len(spam) < len(labels):
+            from sklearn.linear_model import LogisticRegression
+            platt = LogisticRegression(C=1e6).fit(scores.reshape(-1, 1), labels)
+            self.platt = (float(platt.coef_[0, 0]), float(platt.intercept_[0]))
+        self.meta.update({'max_recall_loss': max_recall_loss, 'calibration_messages': int(len(scores)),
+                          'calibration_short_circuit': float(below.mean())})
+        return float(below.mean())
+
+    def save(self, path=PREFILTER_PATH):
+        np.savez(path, log_odds=self.log_odds, bias=self.bias, threshold=self.threshold,
+                 confidence=np.nan if self.confidence is None else self.confidence,
+                 platt=np.full(2, np.nan) if self.platt is None else np.array(self.platt),
+                 meta=json.dumps(self.meta))
+
+    @classmethod
+    def load(cls, path=PREFILTER_PATH):
+        with np.load(path) as data:
+            confidence = float(data['confidence'])
+            # Files saved before the Platt fit have no 'platt' array
+            platt = data['platt'] if 'platt' in data.files else np.full(2, np.nan)
+            return cls(data['log_odds'], float(data['bias']), float(data['threshold']),
+                       None if np.isnan(confidence) else confidence, json.loads(str(data['meta'])),
+                       None if np.isnan(platt).any() else tuple(map(float, platt)))
+
+
+def train_prefilter(messages, labels, max_recall_loss, folds=5, seed=42):
+    """Fit on all messages and calibrate the threshold on stratified out-of-fold scores"""
+    from sklearn.model_selection import StratifiedKFold
+
+    messages, labels = np.asarray(messages, dtype=object), np.asarray(labels)
+    held_out = np.zeros(len(messages))
+    for train_index, test_index in StratifiedKFold(folds, shuffle=True, random_state=seed).split(messages, labels):
+        fold_model = HamPrefilter.fit(messages[train_index], labels[train_index])
+        held_out[test_index] = fold_model.scores(messages[test_index])
+
+    model = HamPrefilter.fit(messages, labels)
+    model.calibrate(held_out, labels, max_recall_loss)
+    model.meta['trained'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    return model
+
+
+def evaluate_cascade(prefilter, messages, labels, scorer, transform_text):
+    """
+    Score messages one at a time with the full pipeline and with the cascade.
+    Returns a dict of short-circuit share, spam recall and precision for
+    both, and mean per-message latency in microseconds.
+    """
+    labels = np.asarray(labels)
+
+    def full(message):
+        return int(scorer.score([transform_text(message)])[0][0])
+
+    def cascade(message):
+        if prefilter.short_circuit([message])[0]:
+            return 0
+        return full(message)
+
+    results = {}
+    for name, predict in (('full', full), ('cascade', cascade)):
+        # Second pass is timed, so both paths see a warm stem memo
+        [predict(message) for message in messages]
+        start = time.perf_counter()
+        predictions = np.array([predict(message) for message in messages])
+        seconds = time.perf_counter() - start
+        caught = (predictions == 1) & (labels == 1)
+        results[name] = {
+            'latency_us': seconds / len(messages) * 1e6,
+            'recall': caught.sum() / max((labels == 1).sum(), 1),
+            'precision': caught.sum() / max((predictions == 1).sum(), 1),
+        }
+    results['short_circuit'] = float(prefilter.short_circuit(list(messages)).mean())
+    return results
+
+
+def print_cascade_report(prefilter, report):
+    """Print an evaluate_cascade() report"""
+    full, cascade = report['full'], report['cascade']
+    # None when no calibration message scored below the threshold
+    precision = 'n/a' if prefilter.confidence is None else f"{prefilter.confidence:.2f}%"
+    print(f"   Threshold: log-odds < {prefilter.threshold:.2f} "
+          f"(max recall loss {prefilter.meta['max_recall_loss']:.2%}, "
+          f"ham precision below it {precision})")
+    if prefilter.platt is not None:
+        print(f"   Confidence:      per message, P(ham) = 1 - sigmoid({prefilter.platt[0]:.3f} × log-odds "
+              f"{prefilter.platt[1]:+.3f})")
+    print(f"   Short-circuited: {report['short_circuit']:.1%} of test messages")
+    print(f"   Spam recall:     {full['recall']:.4f} full → {cascade['recall']:.4f} cascade "
+          f"(loss {full['recall'] - cascade['recall']:.4f})")
+    print(f"   Spam precision:  {full['precision']:.4f} full → {cascade['precision']:.4f} cascade")
+    print(f"   Latency:         {full['latency_us']:.0f} µs → {cascade['latency_us']:.0f} µs per message "
+          f"({full['latency_us'] / cascade['latency_us']:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit the cascade prefilter for the existing model")
+    parser.add_argument('--max-recall-loss', type=float, default=0.01,
+                        help='largest share of spam the prefilter may pass as ham (default: 0.01)')
+    parser.add_argument('--output', default=PREFILTER_PATH)
+    args = parser.parse_args()
+
+    import warnings
+    warnings.filterwarnings('ignore')
+    from sklearn.model_selection import train_test_split
+    from model_registry import load_active_models
+    from preprocessing import load_resources, transform_text
+    from scoring import make_scorer
+    from train_model import load_labeled_csv
+
+    # Same columns, labels and split as train_model.py
+    df = load_labeled_csv('spam.csv')
+    texts, labels = df['text'].astype(str), df['label_encoded']
+    X_train, X_test, y_train, y_test = train_test_split(
+        texts, labels, test_size=0.2, random_state=42, stratify=labels)
+
+    print(f"🔧 Fitting prefilter on {len(X_train)} messages...")
+    prefilter = train_prefilter(X_train.tolist(), y_train.to_numpy(), args.max_recall_loss)
+    prefilter.save(args.output)
+    print(f"✅ Saved {args.output}\n")
+
+    load_resources()
+    scorer = make_scorer(*load_active_models())
+    print(f"📈 Cascade on the {len(X_test)}-message test split:")
+    print_cascade_report(prefilter, evaluate_cascade(prefilter, X_test.tolist(), y_test.to_numpy(),
+                                                     scorer, transform_text))
+
+
+if __name__ == '__main__':
+    main()
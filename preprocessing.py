@@ -0,0 +1,332 @@
+"""
+Shared Text Preprocessing for SMS Spam Detector
+Used by app.py, flask_app.py and train_model.py so that training and
+serving always clean text the same way.
+
+The pipeline is: lowercase -> tokenize -> keep alphanumeric tokens ->
+drop stopwords -> Porter stem. The tokenizer is a small set of precompiled
+regexes that reproduces the tokens `nltk.word_tokenize` + `str.isalnum`
+keep, without running the Punkt sentence splitter and the full Treebank
+regex cascade on every message.
+
+NLTK is imported on first use, not at import: `import nltk` pulls in scipy
+and sklearn and takes ~2 s. Servers call load_resources() from their
+warm-up hook so no request pays for it.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import re
+import threading
+from functools import lru_cache
+
+# Bump when the output of transform_text changes for any input
+PREPROCESSING_VERSION = 3
+
+# Message-text column names recognized in uploaded and batch files, in order of preference
+TEXT_COLUMNS = ('text', 'message', 'Message', 'v2')
+
+# Bounded memo of token -> stem; SMS vocabulary repeats heavily
+STEM_CACHE_SIZE = int(os.environ.get('STEM_CACHE_SIZE', 50000))
+
+# Process-pool defaults for transform_many / PreprocessPool
+PREPROCESS_WORKERS = int(os.environ.get('PREPROCESS_WORKERS', 1))
+PREPROCESS_CHUNK_SIZE = int(os.environ.get('PREPROCESS_CHUNK_SIZE', 1000))
+
+# Set by load_resources(): the Porter stemmer, the stopword list (a
+# frozenset, so membership tests are O(1)) and the Punkt tables.
+# LOWERCASE_STARTERS holds the word types Punkt's orthographic context has
+# seen starting a sentence in lowercase and never capitalized.
+ps = None
+STOP_WORDS = frozenset()
+ABBREVIATIONS = COLLOCATIONS = LOWERCASE_STARTERS = frozenset()
+_resources_loaded = False
+_resources_lock = threading.Lock()
+
+
+def _load_punkt_params(lang_dir=None):
+    """
+    Load the abbreviation, collocation and orthographic-context tables of
+    the English Punkt model, or of the punkt_tab directory lang_dir (an
+    nltk.data path pointer). Its frequent sentence starters only apply to
+    capitalized words, which lowercased text never has.
+    """
+    import nltk
+    if lang_dir is None:
+        try:
+            lang_dir = nltk.data.find('tokenizers/punkt_tab/english/')
+        except LookupError:
+            return frozenset(), frozenset(), frozenset()
+
+    from nltk.tokenize.punkt import _ORTHO_BEG_LC, _ORTHO_UC, load_punkt_params
+    params = load_punkt_params(lang_dir)
+    lowercase_starters = frozenset(word_type for word_type, ortho in params.ortho_context.items()
+                                   if ortho & _ORTHO_BEG_LC and not ortho & _ORTHO_UC)
+    return frozenset(params.abbrev_types), frozenset(params.collocations), lowercase_starters
+
+
+@lru_cache(maxsize=None)
+def punkt_tables_version():
+    """
+    Short sha256 of the English Punkt tables, or 'none' if they are missing.
+    Tokens depend on the tables, so caches of preprocessed text key on it.
+    """
+    import nltk
+    try:
+        lang_dir = nltk.data.find('tokenizers/punkt_tab/english/')
+    except LookupError:
+        return 'none'
+
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(lang_dir)):
+        with open(os.path.join(lang_dir, name), 'rb') as f:
+            digest.update(name.encode() + b'\0' + f.read())
+    return digest.hexdigest()[:12]
+
+
+def load_resources():
+    """
+    Import NLTK and load the stemmer, stopwords and Punkt tables, once.
+    Runs automatically on first use. Never downloads: raises RuntimeError
+    if the data is missing (install it with `python nltk_setup.py`).
+    """
+    global ps, STOP_WORDS, ABBREVIATIONS, COLLOCATIONS, LOWERCASE_STARTERS, _resources_loaded
+    if _resources_loaded:
+        return
+    with _resources_lock:
+        if _resources_loaded:
+            return
+        from nltk_setup import ensure_nltk_data
+        ensure_nltk_data(download=False)
+
+        from nltk.corpus import stopwords
+        from nltk.stem.porter import PorterStemmer
+        ps = PorterStemmer()
+        STOP_WORDS = frozenset(stopwords.words('english'))
+        ABBREVIATIONS, COLLOCATIONS, LOWERCASE_STARTERS = _load_punkt_params()
+        _resources_loaded = True
+
+# --- Sentence boundaries (stand-in for nltk.sent_tokenize) ---
+# Like Punkt, only the last [.?!] of a whitespace-delimited chunk is a
+# candidate sentence end, and only when it is followed by punctuation that
+# cannot appear inside a word or by whitespace and another token.
+_NON_WORD = r"[)\";}\]*:@'({\[‘’“”\xab\xbb?!]"
+_SENTENCE_END = re.compile(
+    r"(\S*)([.?!])(?=(" + _NON_WORD + r")|(\s+)(\S+))"
+)
+_MULTI_CHAR = r"\-{2,}|\.{2,}|(?:\.\s){2,}\."
+# Punkt's word regex, used to split the context of a candidate break
+_PUNKT_WORD = re.compile(
+    _MULTI_CHAR
+    + r"|(?=[^(\"`{\[:;&#*@)}\]\-,])\S+?(?=\s|$|" + _NON_WORD + "|" + _MULTI_CHAR
+    + r"|,(?=$|\s|" + _NON_WORD + "|" + _MULTI_CHAR + r"))"
+    r"|\S"
+)
+_SENT_END_CHARS = ('.', '?', '!')
+# Closing punctuation Punkt moves back onto the sentence before it
+_REALIGNED = re.compile(r"([\"')\]}‘’“”\xab\xbb]+?)(?:--|$)")
+_PUNKT_PUNCTUATION = (';', ':', ',', '.', '!', '?')
+_INITIAL = re.compile(r"[^\W\d]\.")
+_NUMERIC = re.compile(r"^-?[\.,]?\d[\d,\.-]*\.?$")
+
+# --- Word tokenization (stand-in for NLTKWordTokenizer) ---
+# What may follow a sentence's final period for NLTK to split it off. A
+# double quote after a space is an opening quote to NLTK, which keeps the
+# period attached
+_CLOSERS = r"(?:[\]\)}>\"'\xbb”’]| (?!\"|''))*"
+_FINAL_PERIOD = re.compile(r"([^\.])(\.)(" + _CLOSERS + r")\s*$")
+_FINAL_CLOSERS = re.compile(_CLOSERS)
+_LEADING_APOSTROPHE = re.compile(r"(?<!\w)(')(?!(?:re|ve|ll|m|t|s|d|n)\b)(?=\w)")
+_COMMA_COLON = re.compile(r"([:,])([^\d])")
+_TRAILING_COMMA_COLON = re.compile(r"([:,])$")
+_PAD = re.compile(
+    r"\.{2,}|--|''|[\xab“‘„\xbb”’`\";@#$%&?!*"
+    r"‒-―\[\](){}<>]"
+)
+_TRAILING_APOSTROPHE = re.compile(r"([^'])'(?=\s)")
+_CLITICS = re.compile(r"([^'\s])('s|'m|'d|'|'ll|'re|'ve|n't)(?=\s)")
+_CONTRACTIONS = re.compile(
+    r"\b(can)(not)\b|\b(d)('ye)\b|\b(gim)(me)\b|\b(gon)(na)\b|"
+    r"\b(got)(ta)\b|\b(lem)(me)\b|\b(more)('n)\b|\b(wan)(na)(?=\s|$)"
+)
+
+
+def _token_type(token):
+    """Punkt token type: numbers are collapsed to ##number##"""
+    return _NUMERIC.sub('##number##', token)
+
+
+def _is_abbreviation(word):
+    return word in ABBREVIATIONS or word.rsplit('-', 1)[-1] in ABBREVIATIONS
+
+
+def _next_token_type(next_token):
+    """
+    Punkt's type of the token after a candidate break, without the period
+    its first pass would mark as a sentence end (type_no_sentperiod)
+    """
+    next_type = _token_type(next_token)
+    if (len(next_type) > 1 and next_type.endswith('.') and not next_token.endswith('..')
+            and not _is_abbreviation(next_token[:-1])):
+        return next_type[:-1]
+    return next_type
+
+
+def _is_sentence_break(token, next_token):
+    """Decide whether a period-final token ends a sentence, as Punkt would"""
+    # Ellipses are never sentence ends in Punkt's first pass
+    if token.endswith('..'):
+        return False
+
+    word_type = _token_type(token)
+    if word_type.endswith('.'):
+        word_type = word_type[:-1]
+    next_type = _next_token_type(next_token)
+    if (word_type, next_type) in COLLOCATIONS:
+        return False
+
+    # An abbreviation only ends a sentence when the next word is capitalized
+    # (orthographic and sentence-starter heuristics); lowercased text never is
+    if _is_abbreviation(token[:-1]):
+        return False
+
+    # Orthographic heuristic: a number or initial is not a sentence end
+    # when the next token is punctuation, or lowercase and not a word seen
+    # starting sentences in lowercase
+    if word_type == '##number##' or _INITIAL.fullmatch(token):
+        if next_token in _PUNKT_PUNCTUATION or (
+                next_token[0].islower() and next_type not in LOWERCASE_STARTERS):
+            return False
+
+    return True
+
+
+def _context_has_break(tokens):
+    """
+    Punkt splits at a candidate when its context (the chunk before it, the
+    candidate and the next chunk) has a sentence end before its last token
+    """
+    for token, next_token in zip(tokens, tokens[1:]):
+        if token in _SENT_END_CHARS:
+            return True
+        if token.endswith('.') and _is_sentence_break(token, next_token):
+            return True
+    return False
+
+
+def _split_period(match):
+    chunk, end, after, space, next_chunk = match.groups()
+    # Ellipses are padded by the word tokenizer either way
+    if end != '.' or chunk.endswith('.'):
+        return match.group()
+
+    context = chunk + end + (after if after is not None else ' ' + next_chunk)
+    if not _context_has_break(_PUNKT_WORD.findall(context)):
+        return match.group()
+    # Closing punctuation moved back onto this sentence can keep NLTK from
+    # splitting off its final period
+    realigned = _REALIGNED.match(next_chunk) if after is None else None
+    if realigned and not _FINAL_CLOSERS.fullmatch(space + realigned.group(1)):
+        return match.group()
+    return chunk + ' . '
+
+
+def _split_contraction(match):
+    groups = [g for g in match.groups() if g is not None]
+    return ' ' + ' '.join(groups) + ' '
+
+
+def tokenize(text):
+    """
+    Lowercase and tokenize text, returning only alphanumeric tokens.
+    Matches [t for t in nltk.word_tokenize(text.lower()) if t.isalnum()].
+    """
+    if not _resources_loaded:
+        load_resources()
+    text = str(text).lower()
+    text = _SENTENCE_END.sub(_split_period, text)
+    text = _FINAL_PERIOD.sub(r"\1 \2 \3 ", text.rstrip())
+    text = _LEADING_APOSTROPHE.sub(r"\1 ", text)
+    text = _COMMA_COLON.sub(r" \1 \2", text)
+    text = _TRAILING_COMMA_COLON.sub(r" \1 ", text)
+    text = _PAD.sub(r" \g<0> ", text)
+    text = _TRAILING_APOSTROPHE.sub(r"\1 ' ", text + ' ')
+    text = _CLITICS.sub(r"\1 \2 ", text)
+    text = _CONTRACTIONS.sub(_split_contraction, text)
+    return [token for token in text.split() if token.isalnum()]
+
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(token):
+    """Porter-stem a token, memoized"""
+    if ps is None:
+        load_resources()
+    return ps.stem(token)
+
+
+def stem_cache_stats():
+    """Return hit/miss/eviction counters of the stem memo"""
+    info = stem.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        'size': info.currsize,
+        'maxsize': info.maxsize,
+        'hits': info.hits,
+        'misses': info.misses,
+        # Every miss inserts an entry and entries only leave by eviction
+        'evictions': info.misses - info.currsize,
+        'hit_rate': round(info.hits / lookups, 4) if lookups else None
+    }
+
+
+def transform_text(text):
+    """Preprocess and transform text"""
+    # Alphanumeric tokens can never be punctuation, so only stopwords are filtered
+    return " ".join([
+        stem(token) for token in tokenize(text) if token not in STOP_WORDS
+    ])
+
+
+class PreprocessPool:
+    """
+    Runs transform_text over lists of messages on a pool of worker processes.
+    Messages are dispatched in chunks of chunk_size so IPC cost is paid per
+    chunk, not per message, and results come back in input order. With one
+    worker, or for inputs of at most one chunk, everything runs in-process.
+    workers=0 uses every CPU. Keep one pool open across calls (it is a
+    context manager) so workers and their stem memos are reused.
+    """
+
+    def __init__(self, workers=PREPROCESS_WORKERS, chunk_size=PREPROCESS_CHUNK_SIZE):
+        self.workers = workers if workers > 0 else os.cpu_count()
+        self.chunk_size = max(1, chunk_size)
+        if self.workers > 1:
+            # Load before forking so workers inherit the stemmer and stopwords
+            load_resources()
+        self._pool = multiprocessing.Pool(self.workers) if self.workers > 1 else None
+
+    def map(self, texts):
+        """Return [transform_text(t) for t in texts], computed in parallel"""
+        texts = list(texts)
+        if self._pool is None or len(texts) <= self.chunk_size:
+            return [transform_text(text) for text in texts]
+        return self._pool.map(transform_text, texts, chunksize=self.chunk_size)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def transform_many(texts, workers=PREPROCESS_WORKERS, chunk_size=PREPROCESS_CHUNK_SIZE):
+    """Preprocess a list of messages with a temporary PreprocessPool"""
+    with PreprocessPool(workers, chunk_size) as pool:
+        return pool.map(texts)
@@ -0,0 +1,423 @@
+"""
+Pure-NumPy Scoring Kernel for SMS Spam Detector
+Scores preprocessed text with TF-IDF + MultinomialNB parameters directly,
+without going through sklearn's vectorizer and estimator APIs.
+
+The idf weights are folded into the Naive Bayes log-probabilities once at
+load time, so scoring a message is: map tokens to feature indices, count
+them, L2-normalize, and multiply against one (features x classes) weight
+matrix that yields every class log-probability. Label and probability come
+out of the same call.
+
+Feature indices come from either a sorted vocabulary table (TfidfVectorizer)
+or MurmurHash3 of the token (HashingVectorizer + TfidfTransformer), which
+needs no vocabulary at all.
+
+QuantizedNBScorer does the same over a quantized artifact (float16, or
+int8 with a per-class scale): the weight matrix stays quantized, and only
+the rows a message touches are dequantized.
+"""
+
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+
+# Bounded memo of token -> hashed feature index (hashing vectorizer only)
+HASH_CACHE_SIZE = int(os.environ.get('HASH_CACHE_SIZE', 100000))
+
+# Vectorizer options the kernel does not implement
+_UNSUPPORTED_DEFAULTS = [
+    ('analyzer', 'word'), ('ngram_range', (1, 1)), ('binary', False),
+    ('stop_words', None), ('tokenizer', None), ('preprocessor', None),
+    ('strip_accents', None)
+]
+
+
+def murmurhash3_32(data, seed=0):
+    """MurmurHash3 x86 32-bit of bytes, as a signed int (matches sklearn.utils.murmurhash3_32)"""
+    length = len(data)
+    h = seed & 0xffffffff
+    c1, c2 = 0xcc9e2d51, 0x1b873593
+    end = length & ~3
+    for i in range(0, end, 4):
+        k = int.from_bytes(data[i:i + 4], 'little')
+        k = (k * c1) & 0xffffffff
+        k = ((k << 15) | (k >> 17)) & 0xffffffff
+        k = (k * c2) & 0xffffffff
+        h ^= k
+        h = ((h << 13) | (h >> 19)) & 0xffffffff
+        h = (h * 5 + 0xe6546b64) & 0xffffffff
+    k = 0
+    tail = length & 3
+    if tail:
+        k = int.from_bytes(data[end:], 'little')
+        k = (k * c1) & 0xffffffff
+        k = ((k << 15) | (k >> 17)) & 0xffffffff
+        k = (k * c2) & 0xffffffff
+        h ^= k
+    h ^= length
+    h ^= h >> 16
+    h = (h * 0x85ebca6b) & 0xffffffff
+    h ^= h >> 13
+    h = (h * 0xc2b2ae35) & 0xffffffff
+    h ^= h >> 16
+    return h - (1 << 32) if h & 0x80000000 else h
+
+
+class VocabularyIndex:
+    """Feature lookup through a sorted string table (TfidfVectorizer vocabulary)"""
+
+    kind = 'vocabulary'
+
+    def __init__(self, terms):
+        self.terms = terms
+        self.n_features = len(terms)
+
+    def lookup(self, tokens):
+        """Return (feature indices, known mask) for a list of tokens"""
+        tokens = np.array(tokens, dtype=str)
+        position = np.searchsorted(self.terms, tokens)
+        position[position == self.n_features] = 0
+        return position, self.terms[position] == tokens
+
+    def names(self, positions, tokens):
+        """Term of each feature index (tokens, from the scored text, are not needed)"""
+        return [str(term) for term in self.terms[positions]]
+
+
+class HashingIndex:
+    """Feature lookup by MurmurHash3, as HashingVectorizer(alternate_sign=False) does"""
+
+    kind = 'hashing'
+
+    def __init__(self, n_features):
+        self.n_features = n_features
+        self._bucket = lru_cache(maxsize=HASH_CACHE_SIZE)(self._hash)
+
+    def _hash(self, token):
+        return abs(murmurhash3_32(token.encode('utf-8'))) % self.n_features
+
+    def lookup(self, tokens):
+        """Return (feature indices, known mask) for a list of tokens; every token is known"""
+        position = np.array([self._bucket(t) for t in tokens], dtype=np.int64)
+        return position, np.ones(len(position), dtype=bool)
+
+    def names(self, positions, tokens):
+        """
+        Name hashed feature indices by the tokens of the scored text that
+        fall in them (the hash cannot be inverted); collisions are joined by '|'
+        """
+        buckets = {}
+        for token in sorted(set(tokens)):
+            buckets.setdefault(self._bucket(token), []).append(token)
+        return ['|'.join(buckets.get(int(p), ['?'])) for p in positions]
+
+
+def feature_parameters(vectorizer):
+    """
+    Extract what the kernel needs from a fitted sklearn vectorizer: either a
+    TfidfVectorizer or a Pipeline of HashingVectorizer + TfidfTransformer.
+    Returns a dict with the feature index, idf, the column order of the
+    model arrays (None when unchanged) and the tokenizer/normalization
+    settings. Raises ValueError for configurations the kernel cannot score.
+    """
+    if hasattr(vectorizer, 'steps'):
+        if len(vectorizer.steps) != 2:
+            raise ValueError("Only HashingVectorizer + TfidfTransformer pipelines are supported")
+        hasher, weighting = vectorizer.steps[0][1], vectorizer.steps[1][1]
+        params = hasher.get_params()
+        if not hasattr(hasher, 'n_features') or not hasattr(weighting, 'use_idf'):
+            raise ValueError("Only HashingVectorizer + TfidfTransformer pipelines are supported")
+        if params['alternate_sign'] or params['norm'] is not None:
+            raise ValueError("HashingVectorizer needs alternate_sign=False and norm=None")
+        index = HashingIndex(params['n_features'])
+        order = None
+        use_idf, idf = weighting.use_idf, getattr(weighting, 'idf_', None)
+        norm, sublinear_tf = weighting.norm, weighting.sublinear_tf
+    else:
+        params = vectorizer.get_params()
+        # Sort the vocabulary so lookups are a binary search over a string table
+        terms = sorted(vectorizer.vocabulary_)
+        order = np.array([vectorizer.vocabulary_[t] for t in terms])
+        index = VocabularyIndex(np.array(terms, dtype=str))
+        use_idf, idf = params['use_idf'], getattr(vectorizer, 'idf_', None)
+        norm, sublinear_tf = params['norm'], params['sublinear_tf']
+        if idf is not None:
+            idf = idf[order]
+
+    unsupported = [name for name, default in _UNSUPPORTED_DEFAULTS if params[name] != default]
+    if unsupported:
+        raise ValueError(f"Vectorizer options not supported by the scoring kernel: {unsupported}")
+
+    return {
+        'index': index,
+        'idf': idf if use_idf else np.ones(index.n_features),
+        'order': order,
+        'token_pattern': params['token_pattern'],
+        'lowercase': params['lowercase'],
+        'norm': norm,
+        'sublinear_tf': sublinear_tf
+    }
+
+
+def term_counts(texts, index, token_re, lowercase=True):
+    """
+    Count known terms in each text, looking tokens up through a
+    VocabularyIndex or HashingIndex.
+    Returns (rows, indices, counts) sorted by row then feature index.
+    """
+    n_features = index.n_features
+    tokens = []
+    row_of_token = []
+    for row, text in enumerate(texts):
+        if lowercase:
+            text = text.lower()
+        found = token_re.findall(text)
+        tokens.extend(found)
+        row_of_token.extend([row] * len(found))
+
+    if not tokens:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+
+    position, known = index.lookup(tokens)
+
+    # Unique (row, feature) keys come back sorted, which is CSR order
+    keys = np.asarray(row_of_token)[known] * n_features + position[known]
+    keys, counts = np.unique(keys, return_counts=True)
+    return keys // n_features, keys % n_features, counts
+
+
+def row_norms(rows, values, n_rows, norm='l2'):
+    """Per-row l1/l2 norm of sparse values; empty rows get norm 1"""
+    if norm == 'l2':
+        result = np.sqrt(np.bincount(rows, weights=values * values, minlength=n_rows))
+    else:
+        result = np.bincount(rows, weights=np.abs(values), minlength=n_rows)
+    result[result == 0] = 1
+    return result
+
+
+class NBScorer:
+    """Fused TF-IDF + MultinomialNB scorer over plain numpy arrays"""
+
+    def __init__(self, index, idf, feature_log_prob, class_log_prior, classes,
+                 token_pattern=r"(?u)\b\w\w+\b", lowercase=True, norm='l2', sublinear_tf=False):
+        self.index = index
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self.class_log_prior = np.asarray(class_log_prior, dtype=np.float64)
+        self.classes = np.asarray(classes)
+        self.token_re = re.compile(token_pattern)
+        self.lowercase = lowercase
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        # (features x classes): idf folded into the class log-probabilities
+        self.weights = np.ascontiguousarray((feature_log_prob * self.idf).T)
+
+    @classmethod
+    def from_sklearn(cls, tfidf, model):
+        """Build from a fitted vectorizer (see feature_parameters) and MultinomialNB"""
+        features = feature_parameters(tfidf)
+        order = features['order']
+        feature_log_prob = model.feature_log_prob_ if order is None else model.feature_log_prob_[:, order]
+        return cls(
+            features['index'], features['idf'], feature_log_prob,
+            model.class_log_prior_, model.classes_, token_pattern=features['token_pattern'],
+            lowercase=features['lowercase'], norm=features['norm'],
+            sublinear_tf=features['sublinear_tf']
+        )
+
+    @classmethod
+    def from_artifact(cls, vectorizer, classifier):
+        """Build from the (vectorizer, classifier) pair returned by artifact.load_artifact"""
+        meta = vectorizer.meta
+        return cls(
+            vectorizer.index, vectorizer.idf, classifier.feature_log_prob_,
+            classifier.class_log_prior_, classifier.classes_,
+            token_pattern=meta['token_pattern'], lowercase=meta['lowercase'],
+            norm=meta['norm'], sublinear_tf=meta['sublinear_tf']
+        )
+
+    def nbytes(self):
+        """Bytes held by the idf and weight arrays"""
+        return self.idf.nbytes + self.weights.nbytes
+
+    def _contributions(self, texts):
+        """
+        Sparse rows of the texts as (rows, indices, contributions), where
+        contributions[i, c] = tf-idf of entry i * log P(feature | class c)
+        """
+        n_texts = len(texts)
+        rows, indices, counts = term_counts(texts, self.index, self.token_re, self.lowercase)
+        tf = np.log(counts) + 1 if self.sublinear_tf else counts.astype(np.float64)
+
+        if self.norm:
+            tf = tf / row_norms(rows, tf * self.idf[indices], n_texts, self.norm)[rows]
+
+        # One gather + multiply: every entry contributes tf * (idf * log-prob) to each class
+        # (take() is several times cheaper than fancy indexing for a message's few rows)
+        return rows, indices, tf[:, None] * self.weights.take(indices, axis=0)
+
+    def _joint_log_likelihood(self, rows, contributions, n_texts):
+        per_row = np.column_stack([
+            np.bincount(rows, weights=column, minlength=n_texts) for column in contributions.T
+        ])
+        return per_row + self.class_log_prior
+
+    def joint_log_likelihood(self, texts):
+        """Class log-likelihoods (n_texts x n_classes) for preprocessed texts"""
+        rows, _, contributions = self._contributions(texts)
+        return self._joint_log_likelihood(rows, contributions, len(texts))
+
+    def _predict(self, jll):
+        best = jll.argmax(axis=1)
+        # P(best) = 1 / sum_c exp(jll_c - jll_best)
+        probabilities = 1 / np.exp(jll - jll[np.arange(len(jll)), best][:, None]).sum(axis=1)
+        return best, probabilities
+
+    def score(self, texts):
+        """
+        Score preprocessed texts.
+        Returns (labels, probabilities): the predicted class of each text and
+        the probability of that class, matching MultinomialNB.predict and
+        max(predict_proba).
+        """
+        best, probabilities = self._predict(self.joint_log_likelihood(texts))
+        return self.classes[best], probabilities
+
+    def explain(self, texts, top_k=5):
+        """
+        Score preprocessed texts and list the features that drove each verdict.
+        Returns (labels, probabilities, explanations) where explanations[i]
+        holds up to top_k (term, weight) pairs, strongest first. A term's
+        weight is its tf-idf times log P(term | predicted class) -
+        log P(term | runner-up class): positive terms pushed the message
+        towards its verdict. Computed from the same sparse rows as the score.
+        """
+        n_texts = len(texts)
+        rows, indices, contributions = self._contributions(texts)
+        jll = self._joint_log_likelihood(rows, contributions, n_texts)
+        best, probabilities = self._predict(jll)
+
+        explanations = [[] for _ in range(n_texts)]
+        if len(self.classes) > 1 and len(rows):
+            runner_up = np.argsort(jll, axis=1)[:, -2]
+            weights = (contributions[np.arange(len(rows)), best[rows]]
+                       - contributions[np.arange(len(rows)), runner_up[rows]])
+            # Entries are sorted by row, so each row is one contiguous slice
+            bounds = np.searchsorted(rows, np.arange(n_texts + 1))
+            for row in np.unique(rows):
+                start, end = bounds[row], bounds[row + 1]
+                top = start + np.argsort(-weights[start:end], kind='stable')[:top_k]
+                tokens = self.token_re.findall(texts[row].lower() if self.lowercase else texts[row])
+                names = self.index.names(indices[top], tokens)
+                explanations[row] = list(zip(names, weights[top].tolist()))
+        return self.classes[best], probabilities, explanations
+
+
+class QuantizedNBScorer(NBScorer):
+    """
+    NBScorer over quantized arrays (see artifact.quantize_log_prob): float16
+    idf, and float16 or int8 log-probabilities with log-prob ~= value *
+    scale + offset per class. The idf cannot be folded into int8 values, so
+    it is applied per entry after the gather.
+    """
+
+    def __init__(self, index, idf, log_prob_values, log_prob_scale, log_prob_offset, class_log_prior, classes,
+                 token_pattern=r"(?u)\b\w\w+\b", lowercase=True, norm='l2', sublinear_tf=False):
+        # NBScorer.__init__ is not called: it would fold idf into float64 weights
+        self.index = index
+        self.idf = np.asarray(idf)
+        # (features x classes), so one message's rows are a few contiguous bytes each
+        self.values = np.ascontiguousarray(np.asarray(log_prob_values).T)
+        self.scale = np.asarray(log_prob_scale, dtype=np.float64)
+        self.offset = np.asarray(log_prob_offset, dtype=np.float64)
+        self.class_log_prior = np.asarray(class_log_prior, dtype=np.float64)
+        self.classes = np.asarray(classes)
+        self.token_re = re.compile(token_pattern)
+        self.lowercase = lowercase
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+
+    @classmethod
+    def from_artifact(cls, vectorizer, classifier):
+        """Build from a quantized artifact loaded by artifact.load_artifact"""
+        meta = vectorizer.meta
+        return cls(
+            vectorizer.index, vectorizer.idf, classifier.feature_log_prob_, classifier.log_prob_scale,
+            classifier.log_prob_offset, classifier.class_log_prior_, classifier.classes_,
+            token_pattern=meta['token_pattern'], lowercase=meta['lowercase'],
+            norm=meta['norm'], sublinear_tf=meta['sublinear_tf']
+        )
+
+    def nbytes(self):
+        """Bytes held by the idf and log-probability arrays"""
+        return self.idf.nbytes + self.values.nbytes
+
+    def _contributions(self, texts):
+        n_texts = len(texts)
+        rows, indices, counts = term_counts(texts, self.index, self.token_re, self.lowercase)
+        tf = np.log(counts) + 1 if self.sublinear_tf else counts.astype(np.float64)
+        tfidf = tf * self.idf.take(indices)
+        if self.norm:
+            tfidf /= row_norms(rows, tfidf, n_texts, self.norm)[rows]
+        # Dequantize only the gathered rows
+        log_prob = self.values.take(indices, axis=0).astype(np.float64)
+        log_prob *= self.scale
+        log_prob += self.offset
+        return rows, indices, tfidf[:, None] * log_prob
+
+
+class SklearnScorer:
+    """Same interface as NBScorer for models without feature_log_prob_"""
+
+    def __init__(self, tfidf, model):
+        self.tfidf = tfidf
+        self.model = model
+        self.classes = model.classes_
+
+    def score(self, texts):
+        proba = self.model.predict_proba(self.tfidf.transform(texts))
+        best = proba.argmax(axis=1)
+        return self.classes[best], proba[np.arange(len(best)), best]
+
+    def explain(self, texts, top_k=5):
+        """Same contract as NBScorer.explain; explanations are empty without feature_log_prob_"""
+        X = self.tfidf.transform(texts).tocsr()
+        proba = self.model.predict_proba(X)
+        order = np.argsort(proba, axis=1)
+        best, runner_up = order[:, -1], order[:, -2]
+
+        explanations = [[] for _ in range(len(texts))]
+        log_prob = getattr(self.model, 'feature_log_prob_', None)
+        if log_prob is not None:
+            try:
+                names = self.tfidf.get_feature_names_out()
+            except (AttributeError, ValueError):
+                names = None
+            for row in range(len(texts)):
+                start, end = X.indptr[row], X.indptr[row + 1]
+                indices = X.indices[start:end]
+                weights = X.data[start:end] * (log_prob[best[row], indices] - log_prob[runner_up[row], indices])
+                top = np.argsort(-weights, kind='stable')[:top_k]
+                explanations[row] = [
+                    (str(names[indices[i]]) if names is not None else f'#{indices[i]}', float(weights[i]))
+                    for i in top
+                ]
+        return self.classes[best], proba[np.arange(len(best)), best], explanations
+
+
+def make_scorer(tfidf, model):
+    """Pick the fastest scorer for a loaded (vectorizer, model) pair"""
+    if hasattr(tfidf, 'meta') and tfidf.meta.get('quantize'):
+        return QuantizedNBScorer.from_artifact(tfidf, model)
+    if hasattr(tfidf, 'meta') and hasattr(model, 'feature_log_prob_'):
+        return NBScorer.from_artifact(tfidf, model)
+    if hasattr(model, 'feature_log_prob_'):
+        try:
+            return NBScorer.from_sklearn(tfidf, model)
+        except (AttributeError, ValueError):
+            pass
+    return SklearnScorer(tfidf, model)
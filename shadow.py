@@ -0,0 +1,299 @@
+"""
+Shadow Model Evaluation for SMS Spam Detector
+Scores a sample of live traffic with a candidate model next to the served
+one, off the request thread, and keeps the comparison: how often the two
+disagree and in which direction, how far apart their spam probabilities
+are, and how their scoring latency compares.
+
+Enable with SHADOW_MODEL set to a registry version id (for example one
+published with train_model.py --no-activate) or to an artifact directory.
+SHADOW_SAMPLE_RATE is the share of scoring calls shadowed: a request, or
+one chunk of a batch.
+
+The request path hands over the texts it has already preprocessed, with
+the served model's labels, probabilities and scoring CPU time, and never
+waits. The candidate runs in a separate process, one per serving process,
+at a lower CPU priority (SHADOW_NICE), so it neither holds the serving
+process's GIL nor takes CPU time that requests are waiting for. A sample
+that finds the queue full is dropped and counted. Latency is compared as
+CPU time per message, which does not count time the lower-priority
+process spent waiting for a CPU.
+
+Messages answered from the result cache, the cascade prefilter or a
+campaign cluster are not scored by the served model, so they are not
+shadowed. Neither are explain=true requests.
+
+Counters are per serving process and reset when the served model is
+swapped. Samples still queued from before the swap are discarded when
+their comparison comes back, so they never count towards the new served
+model. The counters are reported in the 'shadow' section of /api/stats.
+"""
+
+import multiprocessing
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+SHADOW_MODEL = os.environ.get('SHADOW_MODEL')
+SHADOW_SAMPLE_RATE = float(os.environ.get('SHADOW_SAMPLE_RATE', 0.1))
+SHADOW_QUEUE_SIZE = int(os.environ.get('SHADOW_QUEUE_SIZE', 1000))
+# Niceness added to the shadow process (19 = only idle CPU time)
+SHADOW_NICE = int(os.environ.get('SHADOW_NICE', 10))
+# Most recent scoring calls kept for the latency percentiles
+SHADOW_LATENCY_WINDOW = int(os.environ.get('SHADOW_LATENCY_WINDOW', 10000))
+
+
+def load_candidate(candidate):
+    """Scorer for an artifact directory, or else a registry version (checksum verified)"""
+    from artifact import load_artifact
+    from model_registry import verify, version_dir
+    from scoring import make_scorer
+
+    if os.path.exists(os.path.join(candidate, 'meta.json')):
+        return make_scorer(*load_artifact(candidate))
+    verify(candidate)
+    return make_scorer(*load_artifact(version_dir(candidate)))
+
+
+def spam_probability(labels, probabilities):
+    """P(spam) from score()'s labels and the probability of each predicted label"""
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    return np.where(np.asarray(labels) == 1, probabilities, 1 - probabilities)
+
+
+def latency_summary(seconds):
+    """p50 / p99 / mean of per-message seconds, in microseconds"""
+    p50, p99 = np.percentile(seconds, [50, 99]) * 1e6
+    return {'p50': round(float(p50), 1), 'p99': round(float(p99), 1), 'mean': round(float(seconds.mean() * 1e6), 1)}
+
+
+def _shadow_process(candidate, load, nice, samples, results):
+    """
+    Body of the shadow process: load the candidate, then score each sample
+    and send back its generation with (messages, ham->spam, spam->ham, sum
+    and max of the spam-probability difference, primary and candidate CPU
+    seconds per message)
+    """
+    try:
+        os.nice(nice)
+    except OSError:
+        pass
+    try:
+        scorer = load(candidate)
+        scorer.score(['warm'])
+    except Exception as e:
+        results.put(('failed', None, str(e)))
+        return
+    results.put(('running', None, None))
+    while True:
+        sample = samples.get()
+        if sample is None:
+            return
+        generation, texts, labels, probabilities, seconds = sample
+        try:
+            start = time.thread_time()
+            candidate_labels, candidate_probabilities = scorer.score(texts)
+            candidate_seconds = time.thread_time() - start
+            labels, candidate_labels = np.asarray(labels), np.asarray(candidate_labels)
+            delta = np.abs(spam_probability(candidate_labels, candidate_probabilities)
+                           - spam_probability(labels, probabilities))
+            results.put(('compared', generation, (
+                len(texts),
+                int(((labels != 1) & (candidate_labels == 1)).sum()),
+                int(((labels == 1) & (candidate_labels != 1)).sum()),
+                float(delta.sum()), float(delta.max(initial=0)),
+                seconds / len(texts), candidate_seconds / len(texts))))
+        except Exception as e:
+            results.put(('error', generation, (len(texts), str(e))))
+
+
+class ShadowEvaluator:
+    """
+    Compares the served model with a candidate on sampled scoring calls.
+    submit() never blocks. The shadow process (spawned, not forked) and the
+    thread that collects its results are started lazily in each serving
+    process, so they survive gunicorn's fork. candidate=None or
+    sample_rate=0 disables it.
+    """
+
+    def __init__(self, candidate, sample_rate=SHADOW_SAMPLE_RATE, queue_size=SHADOW_QUEUE_SIZE,
+                 nice=SHADOW_NICE, latency_window=SHADOW_LATENCY_WINDOW, load=load_candidate):
+        self.candidate = candidate
+        self.sample_rate = sample_rate
+        self.queue_size = queue_size
+        self.nice = nice
+        self.load = load
+        self.status = 'pending' if self.enabled else 'off'
+        self.last_error = None
+        self._latency = deque(maxlen=latency_window)
+        self._pid = None
+        self._samples = None
+        self._process = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        # Samples handed to the shadow process and answers back, for flush()
+        self._sent = 0
+        self._answered = 0
+        # Set by reset(); answers for samples of another generation are discarded
+        self.reset(generation=0)
+
+    @property
+    def enabled(self):
+        return bool(self.candidate) and self.sample_rate > 0
+
+    def reset(self, generation=None):
+        """
+        Start the comparison over: the served model changed. generation
+        identifies the new one (default: one more than the last).
+        """
+        with self._stats_lock:
+            self._generation = self._generation + 1 if generation is None else generation
+            self.since = time.strftime('%Y-%m-%dT%H:%M:%S')
+            self.sampled = 0
+            self.compared = 0
+            self.ham_to_spam = 0
+            self.spam_to_ham = 0
+            self.delta_sum = 0.0
+            self.max_delta = 0.0
+            self.dropped = 0
+            self.failed = 0
+            self._latency.clear()
+
+    def start(self):
+        """Start the shadow process now rather than on the first sampled call (no-op when disabled)"""
+        if self.enabled:
+            self._ensure_started()
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            context = multiprocessing.get_context('spawn')
+            self._samples = context.Queue(maxsize=self.queue_size)
+            # Samples still queued for a shadow process that died must not block the server's exit
+            self._samples.cancel_join_thread()
+            results = context.Queue()
+            self._process = context.Process(
+                target=_shadow_process, args=(self.candidate, self.load, self.nice, self._samples, results),
+                name='shadow-model', daemon=True)
+            self._process.start()
+            threading.Thread(target=self._collect, args=(results,), name='shadow-results', daemon=True).start()
+            self._pid = os.getpid()
+
+    def submit(self, texts, labels, probabilities, seconds, generation=None):
+        """
+        Offer one scoring call of the served model: its preprocessed texts,
+        labels and probabilities, and the CPU time score() took. generation
+        identifies the served model that scored them (default: the current
+        one). Returns False if the call was sampled but dropped because the
+        queue was full.
+        """
+        if not self.enabled or self.status == 'failed' or random.random() >= self.sample_rate:
+            return True
+        self._ensure_started()
+        # Under the lock, so a concurrent reset() cannot count this call in
+        # the next model's comparison
+        with self._stats_lock:
+            if generation is None:
+                generation = self._generation
+            elif generation != self._generation:
+                # Scored by a swapped-out model; _collect would discard it
+                return True
+            try:
+                self._samples.put_nowait((generation, texts, labels, probabilities, seconds))
+            except queue.Full:
+                self.dropped += len(texts)
+                return False
+            self.sampled += 1
+            self._sent += 1
+        return True
+
+    def _fail(self, error):
+        self.status = 'failed'
+        self.last_error = error
+        print(f"❌ Shadow model {self.candidate} stopped: {error}")
+
+    def _collect(self, results):
+        while True:
+            try:
+                kind, generation, value = results.get(timeout=1)
+            except queue.Empty:
+                if not self._process.is_alive():
+                    self._fail(f"shadow process exited with code {self._process.exitcode}")
+                    return
+                continue
+            if kind == 'running':
+                self.status = 'running'
+                print(f"✓ Shadow model {self.candidate} loaded")
+                continue
+            if kind == 'failed':
+                self._fail(value)
+                return
+            with self._stats_lock:
+                self._answered += 1
+                if generation != self._generation:
+                    # Scored by the model served before the last reset()
+                    continue
+                if kind == 'compared':
+                    messages, ham_to_spam, spam_to_ham, delta_sum, max_delta, primary, candidate = value
+                    self.compared += messages
+                    self.ham_to_spam += ham_to_spam
+                    self.spam_to_ham += spam_to_ham
+                    self.delta_sum += delta_sum
+                    self.max_delta = max(self.max_delta, max_delta)
+                    self._latency.append((primary, candidate))
+                else:
+                    self.failed += value[0]
+                    self.last_error = value[1]
+
+    def flush(self, timeout=60):
+        """Wait until every sample queued so far has been compared (or the candidate failed)"""
+        if not self.enabled or self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        # The collector marks the evaluator failed if the shadow process dies
+        while self._answered < self._sent and self.status != 'failed' and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def stats(self):
+        """Agreement and latency comparison so far, as a JSON-serializable dict"""
+        with self._stats_lock:
+            disagreements = self.ham_to_spam + self.spam_to_ham
+            latency = np.array(self._latency) if self._latency else None
+            stats = {
+                'enabled': self.enabled,
+                'candidate': self.candidate,
+                'status': self.status,
+                'sample_rate': self.sample_rate,
+                'since': self.since,
+                'queued': self._sent - self._answered if self.status != 'failed' else 0,
+                'queue_size': self.queue_size,
+                'sampled_calls': self.sampled,
+                'compared': self.compared,
+                'disagreements': disagreements,
+                'disagreement_rate': round(disagreements / self.compared, 4) if self.compared else None,
+                'ham_to_spam': self.ham_to_spam,
+                'spam_to_ham': self.spam_to_ham,
+                'mean_spam_probability_delta': round(self.delta_sum / self.compared, 4) if self.compared else None,
+                'max_spam_probability_delta': round(self.max_delta, 4),
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'last_error': self.last_error
+            }
+        if latency is not None:
+            primary, candidate = latency_summary(latency[:, 0]), latency_summary(latency[:, 1])
+            stats['cpu_us_per_message'] = {
+                'calls': len(latency),
+                'primary': primary,
+                'candidate': candidate,
+                'delta_p50': round(candidate['p50'] - primary['p50'], 1),
+                'delta_p99': round(candidate['p99'] - primary['p99'], 1)
+            }
+        return stats
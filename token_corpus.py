@@ -0,0 +1,331 @@
+"""
+Memory-Mapped Token-Id Corpus for SMS Spam Detector
+An on-disk, preprocessed, labeled training corpus for data sets that do not
+fit in RAM. It is built once by streaming a CSV through transform_text in
+chunks, and read back memory-mapped, so training (train_model.py --corpus)
+only ever holds one chunk of messages plus per-stem counters.
+
+The layout follows the corpus cache (corpus_cache.py), with labels added:
+  vocabulary.txt   every distinct stem, one per line, in order of first appearance
+  token_ids.bin    int32 vocabulary index of each token, all messages concatenated
+  offsets.bin      int64 start of each message in token_ids (length n + 1)
+  labels.bin       int8 label of each message (1 = spam)
+  meta.json        counts, source file, PREPROCESSING_VERSION and Punkt tables digest
+The .bin files are raw little-endian arrays rather than .npy because their
+length is only known once the whole input has been read; they are opened
+with numpy.memmap.
+
+While building, only the stem table is held in memory. It grows with the
+number of distinct stems, not with the number of messages.
+
+Training computes term and document frequencies in one streaming pass, then
+fits MultinomialNB with partial_fit in a second, so the result matches
+vectorizer.fit_transform + model.fit on the same messages.
+
+Usage: python token_corpus.py build messages.csv [-o corpus] [--workers 0] [--chunk-size 50000]
+       python token_corpus.py info [corpus]
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+import numpy as np
+
+from preprocessing import PREPROCESSING_VERSION, punkt_tables_version
+
+TOKEN_CORPUS_DIR = os.environ.get('TOKEN_CORPUS_DIR', 'corpus')
+# Messages per streaming chunk, when building and when training
+CORPUS_CHUNK_SIZE = int(os.environ.get('CORPUS_CHUNK_SIZE', 50000))
+# (label, text) column pairs recognized in labeled CSVs, in order of preference
+LABELED_COLUMNS = [('v1', 'v2'), ('Label', 'Message'), ('label', 'text')]
+_ARRAYS = {'token_ids.bin': '<i4', 'offsets.bin': '<i8', 'labels.bin': 'i1'}
+
+
+def labeled_columns(columns):
+    """(label column, text column) of a labeled CSV header, or None if not recognized"""
+    for label, text in LABELED_COLUMNS:
+        if label in columns and text in columns:
+            return label, text
+    return None
+
+
+def encode_labels(labels):
+    """1 for 'spam'/'1' labels (any case or surrounding whitespace), else 0"""
+    return labels.astype(str).str.strip().str.lower().isin(['spam', '1']).astype(np.int8)
+
+
+def build_corpus(source_path, path=TOKEN_CORPUS_DIR, workers=1, chunk_size=CORPUS_CHUNK_SIZE, progress=None):
+    """
+    Preprocess a labeled CSV into a token-id corpus at path, chunk_size rows
+    at a time on a PreprocessPool of workers. progress(messages, tokens) is
+    called after each chunk. Returns the corpus meta dict.
+    """
+    import pandas as pd
+    from preprocessing import PreprocessPool
+
+    header = pd.read_csv(source_path, encoding='latin-1', nrows=0).columns.tolist()
+    columns = labeled_columns(header) or tuple(header[:2])
+
+    staging = path.rstrip('/') + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    vocabulary = {}
+    n_messages = n_tokens = n_spam = 0
+    files = {name: open(os.path.join(staging, name), 'wb') for name in _ARRAYS}
+    np.zeros(1, dtype=_ARRAYS['offsets.bin']).tofile(files['offsets.bin'])
+    with PreprocessPool(workers) as pool:
+        for chunk in pd.read_csv(source_path, encoding='latin-1', usecols=list(columns), chunksize=chunk_size):
+            labels = encode_labels(chunk[columns[0]])
+            token_ids = []
+            lengths = []
+            for text in pool.map(chunk[columns[1]].astype(str)):
+                stems = text.split()
+                lengths.append(len(stems))
+                token_ids.extend([vocabulary.setdefault(stem, len(vocabulary)) for stem in stems])
+            np.array(token_ids, dtype=_ARRAYS['token_ids.bin']).tofile(files['token_ids.bin'])
+            (n_tokens + np.cumsum(lengths)).astype(_ARRAYS['offsets.bin']).tofile(files['offsets.bin'])
+            labels.to_numpy().tofile(files['labels.bin'])
+            n_messages += len(chunk)
+            n_tokens += len(token_ids)
+            n_spam += int(labels.sum())
+            if progress:
+                progress(n_messages, n_tokens)
+    for f in files.values():
+        f.close()
+
+    # Stems never contain whitespace, so newline-separated text is unambiguous
+    with open(os.path.join(staging, 'vocabulary.txt'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(vocabulary))
+    meta = {
+        'source': os.path.basename(source_path),
+        'columns': list(columns),
+        'preprocessing_version': PREPROCESSING_VERSION,
+        'punkt_tables': punkt_tables_version(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'n_messages': n_messages,
+        'n_spam': n_spam,
+        'n_tokens': n_tokens,
+        'n_stems': len(vocabulary),
+    }
+    with open(os.path.join(staging, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    # Rename into place, so readers never see a partial corpus
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(staging, path)
+    return meta
+
+
+def test_rows(start, end, test_size):
+    """
+    Boolean mask of the held-out rows among start..end. Membership is a
+    fixed hash of the row number, so every streaming pass agrees on the
+    split without keeping it in memory.
+    """
+    rows = np.arange(start, end, dtype=np.uint64)
+    # Fibonacci hashing; the top 24 bits are uniform over [0, 2**24)
+    return ((rows * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(40)) < test_size * 2 ** 24
+
+
+class TokenCorpus:
+    """A built corpus, memory-mapped; see the module docstring for the layout"""
+
+    def __init__(self, path=TOKEN_CORPUS_DIR):
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                self.meta = json.load(f)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"No token corpus in {path}/ (run python token_corpus.py build)") from None
+        if self.meta['preprocessing_version'] != PREPROCESSING_VERSION:
+            raise ValueError(f"{path}/ was preprocessed with version {self.meta['preprocessing_version']}, "
+                             f"not {PREPROCESSING_VERSION}; rebuild it")
+        if self.meta.get('punkt_tables') != punkt_tables_version():
+            raise ValueError(f"{path}/ was tokenized with different Punkt tables "
+                             f"({self.meta.get('punkt_tables')}, not {punkt_tables_version()}); rebuild it")
+        self.path = path
+        arrays = {}
+        for name, dtype in _ARRAYS.items():
+            # numpy cannot memory-map an empty file
+            if os.path.getsize(os.path.join(path, name)):
+                arrays[name] = np.memmap(os.path.join(path, name), dtype=dtype, mode='r')
+            else:
+                arrays[name] = np.zeros(0, dtype=dtype)
+        self.token_ids = arrays['token_ids.bin']
+        self.offsets = arrays['offsets.bin']
+        self.labels = arrays['labels.bin']
+        self.n_stems = self.meta['n_stems']
+
+    def __len__(self):
+        return len(self.labels)
+
+    def stems(self):
+        """The stem table as a list (stem of token id i at index i)"""
+        with open(os.path.join(self.path, 'vocabulary.txt'), encoding='utf-8') as f:
+            return f.read().split('\n') if self.n_stems else []
+
+    def chunks(self, chunk_size=CORPUS_CHUNK_SIZE):
+        """
+        Yield (start, token_ids, rows, labels) for consecutive chunks of
+        messages: the chunk's tokens, the chunk-relative row of each token,
+        and the chunk's labels. Arrays are copied out of the memory map.
+        """
+        for start in range(0, len(self), chunk_size):
+            end = min(start + chunk_size, len(self))
+            offsets = np.asarray(self.offsets[start:end + 1])
+            token_ids = np.asarray(self.token_ids[offsets[0]:offsets[-1]])
+            rows = np.repeat(np.arange(end - start), np.diff(offsets))
+            yield start, token_ids, rows, np.asarray(self.labels[start:end])
+
+
+def token_statistics(corpus, columns, n_columns, test_size, chunk_size=CORPUS_CHUNK_SIZE):
+    """
+    Term frequency and document frequency of each feature column over the
+    training rows, in one pass. columns maps token id -> column (-1 for
+    tokens without one). Returns (tf, df, number of training rows).
+    """
+    tf = np.zeros(n_columns, dtype=np.int64)
+    df = np.zeros(n_columns, dtype=np.int64)
+    n_train = 0
+    for start, token_ids, rows, labels in corpus.chunks(chunk_size):
+        train = ~test_rows(start, start + len(labels), test_size)
+        n_train += int(train.sum())
+        cols = columns[token_ids]
+        keep = train[rows] & (cols >= 0)
+        cols, rows = cols[keep], rows[keep]
+        tf += np.bincount(cols, minlength=n_columns)
+        pairs = np.unique(rows * n_columns + cols)
+        df += np.bincount(pairs % n_columns, minlength=n_columns)
+    return tf, df, n_train
+
+
+def fit_vectorizer(vectorizer, corpus, test_size, chunk_size=CORPUS_CHUNK_SIZE):
+    """
+    Fit the vocabulary and idf of an unfitted train_model.build_vectorizer()
+    (TfidfVectorizer, or HashingVectorizer + TfidfTransformer) from corpus
+    statistics, as fit() on the training rows' text would. Returns the
+    token id -> column array used to vectorize the corpus.
+    """
+    stems = corpus.stems()
+    if hasattr(vectorizer, 'steps'):
+        hasher, weighting = vectorizer.steps[0][1], vectorizer.steps[1][1]
+        pattern = re.compile(hasher.token_pattern)
+        valid = np.array([pattern.fullmatch(stem) is not None for stem in stems], dtype=bool)
+        columns = np.full(len(stems), -1, dtype=np.int64)
+        if valid.any():
+            # One token per row, so each row has exactly one nonzero column
+            columns[valid] = hasher.transform([stem for stem, ok in zip(stems, valid) if ok]).indices
+        n_columns = hasher.n_features
+        _, df, n_train = token_statistics(corpus, columns, n_columns, test_size, chunk_size)
+    else:
+        params = vectorizer.get_params()
+        if params['ngram_range'] != (1, 1) or params['analyzer'] != 'word' or params['min_df'] != 1 \
+                or params['max_df'] != 1.0:
+            raise ValueError("Only single-word TfidfVectorizers without min_df/max_df can be fitted from a corpus")
+        # The vectorizer re-tokenizes the stems with token_pattern; stems are
+        # alphanumeric, so a stem either matches it whole or not at all
+        pattern = re.compile(params['token_pattern'])
+        tokens = np.array([i for i, stem in enumerate(stems) if pattern.fullmatch(stem)], dtype=np.int64)
+        identity = np.full(len(stems), -1, dtype=np.int64)
+        identity[tokens] = np.arange(len(tokens))
+        tf, df, n_train = token_statistics(corpus, identity, len(tokens), test_size, chunk_size)
+        seen = tf > 0
+        tokens, tf, df = tokens[seen], tf[seen], df[seen]
+
+        # As TfidfVectorizer: alphabetical order, then the max_features most
+        # frequent terms (same argsort over the same array, so ties agree)
+        alphabetical = np.argsort(np.array([stems[i] for i in tokens], dtype=str), kind='stable')
+        tokens, tf, df = tokens[alphabetical], tf[alphabetical], df[alphabetical]
+        if params['max_features'] is not None and params['max_features'] < len(tokens):
+            selected = np.sort((-tf).argsort()[:params['max_features']])
+            tokens, df = tokens[selected], df[selected]
+        columns = np.full(len(stems), -1, dtype=np.int64)
+        columns[tokens] = np.arange(len(tokens))
+        n_columns = len(tokens)
+        vectorizer.vocabulary_ = {stems[i]: column for column, i in enumerate(tokens.tolist())}
+        vectorizer.fixed_vocabulary_ = False
+        weighting = vectorizer
+
+    # TfidfTransformer's smoothed idf
+    smooth = int(weighting.smooth_idf)
+    idf = np.log((n_train + smooth) / (df + smooth)) + 1
+    if hasattr(vectorizer, 'steps'):
+        weighting.idf_ = idf
+        weighting.n_features_in_ = n_columns
+    else:
+        vectorizer.idf_ = idf
+        vectorizer._tfidf.n_features_in_ = n_columns
+    return columns
+
+
+def tfidf_rows(vectorizer, columns, token_ids, rows, n_rows):
+    """The rows' TF-IDF matrix, as vectorizer.transform would return it for their text"""
+    import scipy.sparse as sp
+
+    weighting = vectorizer.steps[1][1] if hasattr(vectorizer, 'steps') else vectorizer._tfidf
+    cols = columns[token_ids]
+    keep = cols >= 0
+    n_columns = len(weighting.idf_)
+    counts = sp.csr_matrix((np.ones(int(keep.sum())), (rows[keep], cols[keep])), shape=(n_rows, n_columns))
+    counts.sum_duplicates()
+    return weighting.transform(counts)
+
+
+def iter_split(vectorizer, columns, corpus, test_size, held_out, chunk_size=CORPUS_CHUNK_SIZE):
+    """Yield (X, y) per chunk for the training rows, or the held-out rows if held_out"""
+    for start, token_ids, rows, labels in corpus.chunks(chunk_size):
+        selected = test_rows(start, start + len(labels), test_size)
+        if not held_out:
+            selected = ~selected
+        if not selected.any():
+            continue
+        # Renumber the selected rows 0..k-1 and drop the other rows' tokens
+        renumber = np.cumsum(selected) - 1
+        keep = selected[rows]
+        yield (tfidf_rows(vectorizer, columns, token_ids[keep], renumber[rows[keep]], int(selected.sum())),
+               labels[selected].astype(np.int64))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='preprocess a labeled CSV into a token corpus')
+    build.add_argument('source', help='labeled CSV (spam.csv columns, Label/Message or label/text)')
+    build.add_argument('-o', '--output', default=TOKEN_CORPUS_DIR,
+                       help=f'corpus directory (default: {TOKEN_CORPUS_DIR})')
+    build.add_argument('--workers', type=int, default=1, help='preprocessing worker processes (0 = all CPUs)')
+    build.add_argument('--chunk-size', type=int, default=CORPUS_CHUNK_SIZE, help='CSV rows read at a time')
+    info = commands.add_parser('info', help='print a corpus summary')
+    info.add_argument('path', nargs='?', default=TOKEN_CORPUS_DIR)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        from nltk_setup import ensure_nltk_data
+        ensure_nltk_data(download=True)
+        started = time.perf_counter()
+
+        def progress(messages, tokens):
+            elapsed = time.perf_counter() - started
+            print(f"   {messages:,} messages, {tokens:,} tokens ({messages / elapsed:,.0f} msg/s)",
+                  file=sys.stderr)
+
+        print(f"🔄 Building {args.output}/ from {args.source} ({args.workers or 'all'} worker(s))...")
+        build_corpus(args.source, args.output, args.workers, args.chunk_size, progress)
+        print(f"✅ Built in {time.perf_counter() - started:.1f}s")
+        path = args.output
+    else:
+        path = args.path
+
+    meta = TokenCorpus(path).meta
+    size = sum(os.path.getsize(os.path.join(path, name)) for name in list(_ARRAYS) + ['vocabulary.txt'])
+    print(f"📚 {meta['source']}: {meta['n_messages']:,} messages ({meta['n_spam']:,} spam), "
+          f"{meta['n_tokens']:,} tokens, {meta['n_stems']:,} distinct stems, {size / 2 ** 20:.1f} MB on disk")
+    print(f"   Train with: python train_model.py --corpus {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,162 +3,497 @@ SMS Spam Classifier - Model Training Script
 Trains the spam detection model from spam.csv and saves model.pkl & vectorizer.pkl
 """
 
-import pandas as pd
-import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.naive_bayes import MultinomialNB
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
+# pandas, sklearn and NLTK are imported where they are used, so --help and
+# argument errors return immediately
+import argparse
+import os
 import pickle
-import string
-import nltk
-from nltk.corpus import stopwords
-from nltk.stem.porter import PorterStemmer
+import tempfile
+import time
 import warnings
 
 warnings.filterwarnings('ignore')
 
-# Download required NLTK data
-print("📚 Downloading NLTK data...")
-try:
-    nltk.data.find('tokenizers/punkt_tab')
-except LookupError:
-    nltk.download('punkt_tab', quiet=True)
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords', quiet=True)
-
-print("✅ NLTK data ready\n")
-
-# Initialize
-ps = PorterStemmer()
-stop_words = set(stopwords.words('english'))
-
-print("📖 Loading spam.csv...")
-df = pd.read_csv('spam.csv', encoding='latin-1')
-
-# Display dataset info
-print(f"Dataset loaded: {len(df)} messages")
-print(f"Columns: {df.columns.tolist()}")
-
-# Get the correct columns
-if 'v1' in df.columns and 'v2' in df.columns:
-    df = df[['v1', 'v2']]
-    df.columns = ['label', 'text']
-elif 'Label' in df.columns and 'Message' in df.columns:
-    df = df[['Label', 'Message']]
-    df.columns = ['label', 'text']
-elif 'label' in df.columns and 'text' in df.columns:
-    pass  # Already correct
-else:
-    print("⚠️  Column names not recognized. Using first two columns...")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train model.pkl & vectorizer.pkl from spam.csv")
+    parser.add_argument('--workers', type=int, default=1,
+                        help='preprocessing worker processes (0 = all CPUs, default: 1)')
+    parser.add_argument('--chunk-size', type=int, default=1000,
+                        help='messages sent to a worker at a time (default: 1000)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='ignore and do not write the preprocessed-corpus cache')
+    parser.add_argument('--vectorizer', choices=['tfidf', 'hashing'], default='tfidf',
+                        help='tfidf: TfidfVectorizer(max_features=3000); hashing: '
+                             'HashingVectorizer + idf, no vocabulary (default: tfidf)')
+    parser.add_argument('--hash-features', type=int, default=2 ** 14,
+                        help='hashed feature space size for --vectorizer hashing (default: 2**14)')
+    parser.add_argument('--alpha', type=float,
+                        help='MultinomialNB smoothing (default: 1.0 for tfidf, 0.1 for hashing)')
+    parser.add_argument('--max-recall-loss', type=float, default=0.01,
+                        help='cascade prefilter: largest share of spam it may pass as ham (default: 0.01)')
+    parser.add_argument('--no-prefilter', action='store_true',
+                        help='do not fit the cascade prefilter (prefilter.npz)')
+    parser.add_argument('--quantize', choices=['float16', 'int8'],
+                        help='also export a quantized artifact (model_artifact_<dtype>/), report its parity '
+                             'with the float64 model, and publish it as the served registry version')
+    parser.add_argument('--no-activate', action='store_true',
+                        help='publish the new model version to the registry without making it the '
+                             'one the servers use (activate later with python model_registry.py activate)')
+    parser.add_argument('--update', metavar='CSV',
+                        help='incrementally update the existing model with labeled messages '
+                             'from CSV instead of retraining from spam.csv')
+    parser.add_argument('--corpus', metavar='DIR',
+                        help='train from a token corpus built with python token_corpus.py build, in '
+                             'streaming passes with bounded memory, instead of from spam.csv')
+
+    search = parser.add_argument_group('model search (compare settings instead of training; saves nothing)')
+    search.add_argument('--search', action='store_true',
+                        help='cross-validate vectorizer settings x models and print a leaderboard')
+    search.add_argument('--folds', type=int, default=5, help='stratified k-fold splits (default: 5)')
+    search.add_argument('--jobs', type=int, default=0,
+                        help='parallel (vectorizer, fold) tasks (0 = all CPUs, default: 0)')
+    search.add_argument('--max-features', type=lambda v: None if v == 'all' else int(v), nargs='+',
+                        help='TF-IDF max_features values, "all" for no limit (default: 1000 3000 5000 all)')
+    search.add_argument('--ngram', type=int, nargs='+', metavar='N',
+                        help='largest n-gram sizes to try, e.g. 1 2 (default: 1 2)')
+    search.add_argument('--alphas', type=float, nargs='+',
+                        help='MultinomialNB/ComplementNB alpha values (default: 0.1 0.3 1.0)')
+    search.add_argument('--top', type=int, help='leaderboard rows to print (default: all)')
+    search.add_argument('--leaderboard', metavar='JSON', help='also write the leaderboard to this file')
+    return parser.parse_args()
+
+
+def load_labeled_csv(path):
+    """Read a labeled CSV, normalize its columns to label/text and add label_encoded"""
+    import pandas as pd
+    df = pd.read_csv(path, encoding='latin-1')
+
+    # Display dataset info
+    print(f"Dataset loaded: {len(df)} messages")
+    print(f"Columns: {df.columns.tolist()}")
+
+    # Get the correct columns
+    from token_corpus import encode_labels, labeled_columns
+    columns = labeled_columns(df.columns)
+    if columns:
+        df = df[list(columns)]
+    else:
+        print("⚠️  Column names not recognized. Using first two columns...")
+        df = df.iloc[:, :2]
     df.columns = ['label', 'text']
 
-print(f"✅ Using columns: label & text")
-print(f"   Labels: {df['label'].unique()}")
-print()
-
-# Text preprocessing function
-def preprocess_text(text):
-    """Preprocess and clean text"""
-    # Convert to lowercase
-    text = str(text).lower()
-    
-    # Tokenize
-    tokens = nltk.word_tokenize(text)
-    
-    # Remove non-alphanumeric characters
-    tokens = [token for token in tokens if token.isalnum()]
-    
-    # Remove stopwords and punctuation
-    tokens = [token for token in tokens if token not in stop_words and token not in string.punctuation]
-    
-    # Stemming
-    tokens = [ps.stem(token) for token in tokens]
-    
-    return ' '.join(tokens)
-
-print("🔄 Preprocessing text...")
-df['processed_text'] = df['text'].apply(preprocess_text)
-print("✅ Text preprocessed\n")
-
-# Convert labels to numeric
-df['label_encoded'] = (df['label'] == 'spam').astype(int)
-
-print(f"Label distribution:")
-print(f"  Spam:     {(df['label_encoded'] == 1).sum()} messages")
-print(f"  Legitimate: {(df['label_encoded'] == 0).sum()} messages")
-print()
-
-# Split data
-print("📊 Splitting data (80-20)...")
-X_train, X_test, y_train, y_test = train_test_split(
-    df['processed_text'],
-    df['label_encoded'],
-    test_size=0.2,
-    random_state=42,
-    stratify=df['label_encoded']
-)
-print(f"✅ Training set: {len(X_train)}, Test set: {len(X_test)}\n")
-
-# Vectorization
-print("🔢 Creating TF-IDF vectorizer...")
-vectorizer = TfidfVectorizer(max_features=3000)
-X_train_vec = vectorizer.fit_transform(X_train)
-X_test_vec = vectorizer.transform(X_test)
-print(f"✅ Vectorizer created ({len(vectorizer.get_feature_names_out())} features)\n")
-
-# Train model
-print("🤖 Training Naive Bayes classifier...")
-model = MultinomialNB()
-model.fit(X_train_vec, y_train)
-print("✅ Model trained\n")
-
-# Evaluate
-print("📈 Evaluating model...")
-y_pred = model.predict(X_test_vec)
-
-accuracy = accuracy_score(y_test, y_pred)
-precision = precision_score(y_test, y_pred)
-recall = recall_score(y_test, y_pred)
-f1 = f1_score(y_test, y_pred)
-
-print(f"Accuracy:  {accuracy:.4f} ({accuracy*100:.2f}%)")
-print(f"Precision: {precision:.4f}")
-print(f"Recall:    {recall:.4f}")
-print(f"F1 Score:  {f1:.4f}")
-print()
-
-# Confusion Matrix
-cm = confusion_matrix(y_test, y_pred)
-print("Confusion Matrix:")
-print(f"  True Negatives:  {cm[0][0]}")
-print(f"  False Positives: {cm[0][1]}")
-print(f"  False Negatives: {cm[1][0]}")
-print(f"  True Positives:  {cm[1][1]}")
-print()
-
-# Save models
-print("💾 Saving models...")
-pickle.dump(vectorizer, open('vectorizer.pkl', 'wb'))
-pickle.dump(model, open('model.pkl', 'wb'))
-print("✅ Models saved successfully!")
-print()
-
-print("=" * 60)
-print("✅ TRAINING COMPLETE!")
-print("=" * 60)
-print()
-print("Model files saved:")
-print("  ✓ vectorizer.pkl - TF-IDF vectorizer")
-print("  ✓ model.pkl - Trained Naive Bayes model")
-print()
-print("You can now use these files with:")
-print("  • app.py (Streamlit)")
-print("  • flask_app.py (Flask)")
-print()
-print("Next steps:")
-print("  1. Run: streamlit run app.py")
-print("  2. Or: python flask_app.py")
-print()
+    print(f"✅ Using columns: label & text")
+    print(f"   Labels: {df['label'].unique()}")
+    print()
+
+    # Convert labels to numeric ('spam'/'ham' or 1/0)
+    df['label_encoded'] = encode_labels(df['label']).astype(int)
+    return df
+
+
+def build_vectorizer(args):
+    """The unfitted feature pipeline selected by --vectorizer"""
+    from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer, TfidfTransformer
+    from sklearn.pipeline import make_pipeline
+    if args.vectorizer == 'hashing':
+        # Stateless token -> column mapping; only the idf vector is learned.
+        # alternate_sign/norm are off so TfidfTransformer sees raw counts,
+        # which makes this equivalent to TfidfVectorizer over hashed columns.
+        return make_pipeline(
+            HashingVectorizer(n_features=args.hash_features, alternate_sign=False, norm=None),
+            TfidfTransformer()
+        )
+    return TfidfVectorizer(max_features=3000)
+
+
+def output_paths(args):
+    """
+    (artifact directory, prefilter path, scratch) written by this run. With
+    --no-activate the candidate reaches only the registry: its artifact and
+    prefilter go to a temporary directory (removed with scratch) and the
+    pickles are not rewritten, so everything that loads the legacy files
+    keeps the active model
+    """
+    from artifact import ARTIFACT_DIR
+    from prefilter import PREFILTER_PATH
+    if not args.no_activate:
+        return ARTIFACT_DIR, PREFILTER_PATH, None
+    scratch = tempfile.TemporaryDirectory(prefix='candidate-')
+    return os.path.join(scratch.name, ARTIFACT_DIR), os.path.join(scratch.name, PREFILTER_PATH), scratch
+
+
+def next_version():
+    """Model version number after the artifact's and every published registry version's"""
+    from artifact import ARTIFACT_DIR, next_model_version
+    from model_registry import list_versions
+    return max([next_model_version(ARTIFACT_DIR)] +
+               [(manifest.get('model_version') or 0) + 1 for manifest in list_versions()])
+
+
+def save_pickles(args, vectorizer, model):
+    """Write vectorizer.pkl & model.pkl, unless this run only publishes a candidate"""
+    if args.no_activate:
+        print("   --no-activate: vectorizer.pkl, model.pkl and the artifact are left as they are")
+        return
+    pickle.dump(vectorizer, open('vectorizer.pkl', 'wb'))
+    pickle.dump(model, open('model.pkl', 'wb'))
+
+
+def incremental_update(args):
+    """Fold newly labeled messages into the existing model with partial_fit"""
+    from sklearn.metrics import accuracy_score
+    from preprocessing import transform_many
+    from artifact import SOURCE_FILES, export_artifact
+    from model_registry import PREFILTER_FILE, RegistryError, current_version, load_fitted_models, version_dir
+    from prefilter import PREFILTER_PATH
+
+    # The update continues from the active version, which need not be the
+    # one in the pickles (activate only moves CURRENT). The fitted
+    # vectorizer is reused as-is: its vocabulary and idf stay fixed, so
+    # feature columns mean the same thing before and after
+    base = current_version()
+    if base is None:
+        print("📦 Loading vectorizer.pkl & model.pkl...")
+        vectorizer = pickle.load(open('vectorizer.pkl', 'rb'))
+        model = pickle.load(open('model.pkl', 'rb'))
+        prefilter_path = PREFILTER_PATH
+    else:
+        print(f"📦 Loading the active model version {base}...")
+        try:
+            vectorizer, model = load_fitted_models(base)
+        except RegistryError as e:
+            raise SystemExit(f"❌ {e}")
+        prefilter_path = os.path.join(version_dir(base), PREFILTER_FILE)
+    if not hasattr(model, 'partial_fit'):
+        raise SystemExit(f"❌ {type(model).__name__} does not support partial_fit")
+
+    print(f"📖 Loading {args.update}...")
+    df = load_labeled_csv(args.update)
+
+    start = time.perf_counter()
+    X_new = vectorizer.transform(transform_many(df['text'].astype(str), args.workers, args.chunk_size))
+    y_new = df['label_encoded']
+    accuracy_before = accuracy_score(y_new, model.predict(X_new))
+
+    print(f"🤖 Updating model with {len(df)} messages "
+          f"({(y_new == 1).sum()} spam, {(y_new == 0).sum()} legitimate)...")
+    model.partial_fit(X_new, y_new)
+    accuracy_after = accuracy_score(y_new, model.predict(X_new))
+    print(f"✅ Model updated in {time.perf_counter() - start:.2f}s")
+    print(f"   Accuracy on the new batch: {accuracy_before:.4f} before, {accuracy_after:.4f} after\n")
+
+    print("💾 Saving vectorizer.pkl, model.pkl & artifact...")
+    artifact_dir, _, scratch = output_paths(args)
+    save_pickles(args, vectorizer, model)
+    version = next_version()
+    export_artifact(vectorizer, model, path=artifact_dir, source_files=() if scratch else SOURCE_FILES,
+                    model_version=version)
+    print(f"✅ Model version {version} saved" +
+          ("" if scratch else f" to model.pkl, vectorizer.pkl and {artifact_dir}/"))
+    print(f"   Total training messages seen: {int(model.class_count_.sum())}")
+
+    # The prefilter does not depend on the model, so the base version's is kept
+    publish_version(vectorizer, model, {
+        'update_messages': len(df),
+        'update_accuracy_before': accuracy_before,
+        'update_accuracy_after': accuracy_after,
+        'training_messages': int(model.class_count_.sum()),
+    }, version, prefilter_path, args)
+
+
+def publish_version(vectorizer, model, metrics, version, prefilter_path, args):
+    """Publish the model to the registry, where running servers pick it up"""
+    from model_registry import REGISTRY_DIR, publish
+    print("📦 Publishing to the model registry...")
+    manifest = publish(vectorizer, model, metrics, version, prefilter_path=prefilter_path,
+                       make_active=not args.no_activate, quantize=args.quantize)
+    if args.no_activate:
+        print(f"✅ Published {REGISTRY_DIR}/{manifest['version']} (not active; run: "
+              f"python model_registry.py activate {manifest['version']})")
+    else:
+        print(f"✅ Published and activated {REGISTRY_DIR}/{manifest['version']}; "
+              f"running servers swap it in within MODEL_RELOAD_INTERVAL seconds")
+    print(f"   Checksum: {manifest['checksum'][:16]}…")
+    return manifest
+
+
+def train_from_corpus(args):
+    """Train on a memory-mapped token corpus, one chunk of messages at a time"""
+    import numpy as np
+    from sklearn.naive_bayes import MultinomialNB
+    from artifact import SOURCE_FILES, export_artifact
+    from token_corpus import TokenCorpus, fit_vectorizer, iter_split
+
+    corpus = TokenCorpus(args.corpus)
+    meta = corpus.meta
+    print(f"📖 {args.corpus}/: {meta['n_messages']:,} messages ({meta['n_spam']:,} spam), "
+          f"{meta['n_tokens']:,} tokens, {meta['n_stems']:,} distinct stems\n")
+
+    # The same 80-20 proportions as the in-memory path; the split is a hash
+    # of the row number, so every pass sees the same rows
+    start = time.perf_counter()
+    print(f"🔢 Fitting {'hashing + idf' if args.vectorizer == 'hashing' else 'TF-IDF'} vectorizer "
+          f"(pass 1: term and document frequencies)...")
+    vectorizer = build_vectorizer(args)
+    columns = fit_vectorizer(vectorizer, corpus, test_size=0.2)
+    n_features = len(vectorizer.steps[1][1].idf_ if hasattr(vectorizer, 'steps') else vectorizer.idf_)
+    print(f"✅ Vectorizer fitted ({n_features} features) in {time.perf_counter() - start:.1f}s\n")
+
+    start = time.perf_counter()
+    print("🤖 Training Naive Bayes classifier (pass 2: partial_fit per chunk)...")
+    alpha = args.alpha if args.alpha is not None else (0.1 if args.vectorizer == 'hashing' else 1.0)
+    model = MultinomialNB(alpha=alpha)
+    for X, y in iter_split(vectorizer, columns, corpus, 0.2, held_out=False):
+        model.partial_fit(X, y, classes=[0, 1])
+    print(f"✅ Model trained on {int(model.class_count_.sum()):,} messages in {time.perf_counter() - start:.1f}s\n")
+
+    print("📈 Evaluating model on the held-out 20% (pass 3)...")
+    cm = np.zeros((2, 2), dtype=np.int64)
+    for X, y in iter_split(vectorizer, columns, corpus, 0.2, held_out=True):
+        np.add.at(cm, (y, model.predict(X)), 1)
+    (tn, fp), (fn, tp) = cm
+    accuracy = (tp + tn) / cm.sum()
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    print(f"Accuracy:  {accuracy:.4f} ({accuracy*100:.2f}%)")
+    print(f"Precision: {precision:.4f}")
+    print(f"Recall:    {recall:.4f}")
+    print(f"F1 Score:  {f1:.4f}")
+    print(f"Confusion Matrix: TN {tn}, FP {fp}, FN {fn}, TP {tp}\n")
+
+    print("💾 Saving model.pkl, vectorizer.pkl & artifact...")
+    artifact_dir, _, scratch = output_paths(args)
+    save_pickles(args, vectorizer, model)
+    version = next_version()
+    export_artifact(vectorizer, model, path=artifact_dir, source_files=() if scratch else SOURCE_FILES,
+                    model_version=version)
+    print(f"✅ Model version {version} saved" +
+          ("\n" if scratch else f" to model.pkl, vectorizer.pkl and {artifact_dir}/\n"))
+
+    # The corpus holds stems only, so the raw-text prefilter cannot be fitted
+    # from it; the version is published without one
+    publish_version(vectorizer, model, {
+        'accuracy': float(accuracy), 'precision': float(precision), 'recall': float(recall), 'f1': float(f1),
+        'train_messages': int(model.class_count_.sum()),
+        'test_messages': int(cm.sum()),
+        'vectorizer': args.vectorizer,
+        'alpha': alpha,
+        'corpus': meta['source'],
+    }, version, None, args)
+
+
+def load_corpus(args):
+    """spam.csv with a processed_text column, from the corpus cache when possible"""
+    # Shared with app.py and flask_app.py so training matches serving
+    from preprocessing import transform_many
+    from corpus_cache import CORPUS_CACHE_DIR, load_processed, save_processed
+
+    print("📖 Loading spam.csv...")
+    df = load_labeled_csv('spam.csv')
+
+    start = time.perf_counter()
+    processed = None if args.no_cache else load_processed('spam.csv')
+    if processed is not None and len(processed) == len(df):
+        df['processed_text'] = processed
+        print(f"⚡ Loaded preprocessed text from {CORPUS_CACHE_DIR}/ in {time.perf_counter() - start:.1f}s\n")
+    else:
+        print(f"🔄 Preprocessing text ({args.workers or 'all'} worker(s))...")
+        df['processed_text'] = transform_many(df['text'].astype(str), args.workers, args.chunk_size)
+        print(f"✅ Text preprocessed in {time.perf_counter() - start:.1f}s")
+        if not args.no_cache:
+            save_processed('spam.csv', df['processed_text'])
+            print(f"💾 Cached preprocessed text in {CORPUS_CACHE_DIR}/")
+        print()
+    return df
+
+
+def run_search(args, df):
+    """Cross-validate the search grid on the processed corpus and print the leaderboard"""
+    import json
+    import model_search as ms
+
+    leaderboard = ms.search(
+        df['processed_text'], df['label_encoded'], folds=args.folds, jobs=args.jobs,
+        max_features=args.max_features or ms.MAX_FEATURES,
+        ngram_ranges=[(1, n) for n in args.ngram] if args.ngram else ms.NGRAM_RANGES,
+        alphas=args.alphas or ms.NB_ALPHAS
+    )
+    print(f"🏆 Leaderboard (mean of {args.folds} folds; latency is vectorizer.transform + model.predict, "
+          f"one message per call and per message in one call):\n")
+    ms.print_leaderboard(leaderboard, args.top)
+    if args.leaderboard:
+        with open(args.leaderboard, 'w') as f:
+            json.dump(leaderboard, f, indent=2)
+        print(f"\n💾 Leaderboard written to {args.leaderboard}")
+
+
+def main():
+    args = parse_args()
+
+    # Download required NLTK data
+    print("📚 Downloading NLTK data...")
+    from nltk_setup import ensure_nltk_data
+    ensure_nltk_data(download=True)
+    print("✅ NLTK data ready\n")
+
+    if args.update:
+        incremental_update(args)
+        return
+    if args.corpus:
+        train_from_corpus(args)
+        return
+
+    df = load_corpus(args)
+    if args.search:
+        run_search(args, df)
+        return
+
+    from sklearn.model_selection import train_test_split
+    from sklearn.naive_bayes import MultinomialNB
+    from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
+
+    print(f"Label distribution:")
+    print(f"  Spam:     {(df['label_encoded'] == 1).sum()} messages")
+    print(f"  Legitimate: {(df['label_encoded'] == 0).sum()} messages")
+    print()
+
+    # Split data
+    print("📊 Splitting data (80-20)...")
+    X_train, X_test, y_train, y_test = train_test_split(
+        df['processed_text'],
+        df['label_encoded'],
+        test_size=0.2,
+        random_state=42,
+        stratify=df['label_encoded']
+    )
+    print(f"✅ Training set: {len(X_train)}, Test set: {len(X_test)}\n")
+
+    # Vectorization
+    print(f"🔢 Creating {'hashing + idf' if args.vectorizer == 'hashing' else 'TF-IDF'} vectorizer...")
+    vectorizer = build_vectorizer(args)
+    X_train_vec = vectorizer.fit_transform(X_train)
+    X_test_vec = vectorizer.transform(X_test)
+    print(f"✅ Vectorizer created ({X_train_vec.shape[1]} features)\n")
+
+    # Train model
+    print("🤖 Training Naive Bayes classifier...")
+    # Most hashed columns are empty, so full Laplace smoothing swamps the
+    # evidence there; a smaller alpha recovers F1 on the hashed features
+    alpha = args.alpha if args.alpha is not None else (0.1 if args.vectorizer == 'hashing' else 1.0)
+    model = MultinomialNB(alpha=alpha)
+    model.fit(X_train_vec, y_train)
+    print("✅ Model trained\n")
+
+    # Evaluate
+    print("📈 Evaluating model...")
+    y_pred = model.predict(X_test_vec)
+
+    accuracy = accuracy_score(y_test, y_pred)
+    precision = precision_score(y_test, y_pred)
+    recall = recall_score(y_test, y_pred)
+    f1 = f1_score(y_test, y_pred)
+
+    print(f"Accuracy:  {accuracy:.4f} ({accuracy*100:.2f}%)")
+    print(f"Precision: {precision:.4f}")
+    print(f"Recall:    {recall:.4f}")
+    print(f"F1 Score:  {f1:.4f}")
+    print()
+
+    # Confusion Matrix
+    cm = confusion_matrix(y_test, y_pred)
+    print("Confusion Matrix:")
+    print(f"  True Negatives:  {cm[0][0]}")
+    print(f"  False Positives: {cm[0][1]}")
+    print(f"  False Negatives: {cm[1][0]}")
+    print(f"  True Positives:  {cm[1][1]}")
+    print()
+
+    # Save models
+    print("💾 Saving models...")
+    artifact_dir, prefilter_path, scratch = output_paths(args)
+    save_pickles(args, vectorizer, model)
+    print("✅ Models saved successfully!")
+    print()
+
+    # Export the fast-start artifact (memory-mapped, loads without sklearn)
+    print("💾 Exporting fast-start model artifact...")
+    from artifact import SOURCE_FILES, export_artifact
+    version = next_version()
+    export_artifact(vectorizer, model, path=artifact_dir, source_files=() if scratch else SOURCE_FILES,
+                    model_version=version)
+    print(f"✅ Artifact saved to {artifact_dir}/ (model version {version})")
+    print()
+
+    metrics = {'accuracy': accuracy, 'precision': precision, 'recall': recall, 'f1': f1}
+    if args.quantize:
+        # Both artifacts are loaded the way the servers load them (memory-mapped)
+        from artifact import load_artifact, print_quantization_report, quantization_report, quantized_dir
+        from scoring import make_scorer
+        path = quantized_dir(args.quantize, artifact_dir)
+        print(f"🗜️  Exporting {args.quantize} artifact...")
+        export_artifact(vectorizer, model, path=path, model_version=version, quantize=args.quantize)
+        report = quantization_report(make_scorer(*load_artifact(artifact_dir)), make_scorer(*load_artifact(path)),
+                                     X_test.tolist(), y_test.to_numpy())
+        print(f"✅ Saved to {path}/. Parity with the float64 model on the test set:")
+        print_quantization_report(report, args.quantize)
+        print()
+        metrics = {name: report['quantized'][name] for name in metrics}
+        metrics.update({'float64_f1': f1, 'quantized_agreement': report['agreement']})
+
+    # Cascade first stage: answers obvious ham from the raw text (CASCADE=1)
+    if not args.no_prefilter:
+        from prefilter import evaluate_cascade, print_cascade_report, train_prefilter
+        from preprocessing import transform_text
+        from scoring import make_scorer
+        print(f"🔧 Fitting cascade prefilter (max recall loss {args.max_recall_loss:.2%})...")
+        prefilter = train_prefilter(df.loc[X_train.index, 'text'].astype(str).tolist(), y_train.to_numpy(),
+                                    args.max_recall_loss)
+        prefilter.save(prefilter_path)
+        print(f"✅ Prefilter saved to {prefilter_path}. Cascade on the test set:")
+        print_cascade_report(prefilter, evaluate_cascade(
+            prefilter, df.loc[X_test.index, 'text'].astype(str).tolist(), y_test.to_numpy(),
+            make_scorer(vectorizer, model), transform_text))
+        print()
+
+    from model_registry import REGISTRY_DIR
+    manifest = publish_version(vectorizer, model, {
+        **metrics,
+        'train_messages': len(X_train),
+        'test_messages': len(X_test),
+        'vectorizer': args.vectorizer,
+        'alpha': alpha,
+    }, version, None if args.no_prefilter else prefilter_path, args)
+    print()
+
+    print("=" * 60)
+    print("✅ TRAINING COMPLETE!")
+    print("=" * 60)
+    print()
+    print("Model files saved:")
+    if not scratch:
+        print(f"  ✓ vectorizer.pkl - {'Hashing + idf' if args.vectorizer == 'hashing' else 'TF-IDF'} vectorizer")
+        print("  ✓ model.pkl - Trained Naive Bayes model")
+        print(f"  ✓ {artifact_dir}/ - Fast-start artifact used by the apps")
+        if args.quantize:
+            print(f"  ✓ {artifact_dir}_{args.quantize}/ - Quantized ({args.quantize}) artifact")
+        if not args.no_prefilter:
+            print(f"  ✓ {prefilter_path} - Cascade prefilter (flask_app.py with CASCADE=1)")
+        print(f"  ✓ {REGISTRY_DIR}/{manifest['version']}/ - Versioned copy served by the running servers")
+    else:
+        print(f"  ✓ {REGISTRY_DIR}/{manifest['version']}/ - Candidate version only (not active)")
+    print()
+    print("You can now use these files with:")
+    print("  • app.py (Streamlit)")
+    print("  • flask_app.py (Flask)")
+    print()
+    print("Next steps:")
+    print("  1. Run: streamlit run app.py")
+    print("  2. Or: python flask_app.py")
+    print()
+
+
+# Guarded so preprocessing worker processes can import this module
+if __name__ == '__main__':
+    main()